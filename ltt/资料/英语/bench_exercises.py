@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+练习题生成器基准测试
+分别计时各排版辅助函数和每一天 × 每个版本的文档生成，输出到临时目录，
+报告吞吐量、p50/p95 延迟、峰值内存和输出字节数；结果可保存为 JSON，
+用于两次提交之间的性能对比
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import docx
+
+import generate_exercises as gen
+
+
+# ============ 计时 ============
+
+def percentile(values, q):
+    """分位数（最近秩）"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))]
+
+
+def measure(setup, op, inner=1, repeat=5, warmup=1):
+    """计时一个用例
+
+    每个样本先调用 setup() 得到状态（不计时），再连续执行 inner 次 op(state)，
+    单次耗时 = 样本耗时 / inner。返回 (单次耗时列表（秒）, 峰值内存（字节）, 最后一次的状态)。
+    峰值内存在计时之外单独跑一个样本，用 tracemalloc 测量。
+    """
+    for _ in range(warmup):
+        state = setup()
+        for _ in range(inner):
+            op(state)
+
+    timings = []
+    for _ in range(repeat):
+        state = setup()
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(inner):
+            op(state)
+        timings.append((time.perf_counter() - start) / inner)
+
+    state = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for _ in range(inner):
+            op(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return timings, peak, state
+
+
+def summarize(timings, peak, output_bytes):
+    p50 = percentile(timings, 0.50)
+    return {
+        'ops_per_sec': 1.0 / p50 if p50 else float('inf'),
+        'p50_ms': p50 * 1000,
+        'p95_ms': percentile(timings, 0.95) * 1000,
+        'peak_kb': peak / 1024,
+        'bytes': output_bytes,
+        'samples': len(timings),
+    }
+
+
+# ============ 用例 ============
+
+# 辅助函数用例中使用的文字
+SAMPLE_TEXT = '1. She _______ (go) to school by bike every day.'
+
+
+def _sample_answers():
+    """一份真实规模的参考答案（第7天充实版）"""
+    events = gen.build_paper(gen.DAY7_SPEC, '充实版')
+    return {event[1]: [entry[1] for entry in event[2]] for event in events if event[0] == 'answers'}
+
+
+def helper_cases(backend):
+    """辅助函数用例：名称 -> (setup, op, inner)"""
+    def new_doc():
+        return gen.new_document(backend=backend)
+
+    def new_run():
+        doc = gen.new_document()
+        return doc.add_paragraph().add_run(SAMPLE_TEXT)
+
+    answers = _sample_answers()
+    cases = {
+        f'helper/new_document/{backend}': (lambda: None, lambda _: new_doc(), 50),
+        f'helper/add_title/{backend}': (
+            new_doc, lambda doc: gen.add_title(doc, '小学六年级英语练习题', '第7天 - 充实版'), 200),
+        f'helper/add_section_title/{backend}': (
+            new_doc, lambda doc: gen.add_section_title(doc, '第一部分：核心语法（20分钟）'), 500),
+        f'helper/add_question_header/{backend}': (
+            new_doc, lambda doc: gen.add_question_header(doc, '一', '介词 in 的用法'), 500),
+        f'helper/add_question/{backend}': (
+            new_doc, lambda doc: gen.add_question(doc, SAMPLE_TEXT), 500),
+        f'helper/add_answer_section/{backend}': (
+            new_doc, lambda doc: gen.add_answer_section(doc, answers), 1),
+    }
+    if backend == 'docx':
+        # set_chinese_font 只作用于 python-docx 的 run
+        cases['helper/set_chinese_font/docx'] = (
+            new_run, lambda run: gen.set_chinese_font(run, '宋体', 11), 500)
+    return cases
+
+
+def generator_cases(backend, output_dir):
+    """文档生成用例：名称 -> (setup, op, inner)，state 为输出路径"""
+    cases = {}
+    for day, topic, generate in gen.DAY_DOCS:
+        for version in gen.VERSIONS:
+            path = os.path.join(output_dir, gen.output_filename(day, topic, version, backend))
+
+            def op(path, generate=generate, version=version):
+                generate(version, path, backend=backend)
+
+            cases[f'generate/day{day}/{version}/{backend}'] = (lambda path=path: path, op, 1)
+    return cases
+
+
+def run_benchmarks(backends, repeat, pattern=None, log=print):
+    """执行所有匹配的用例，返回 名称 -> 结果"""
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='bench_exercises_') as output_dir:
+        cases = {}
+        for backend in backends:
+            cases.update(helper_cases(backend))
+            cases.update(generator_cases(backend, output_dir))
+        for name, (setup, op, inner) in cases.items():
+            if pattern and not re.search(pattern, name):
+                continue
+            with open(os.devnull, 'w') as devnull:
+                stdout, sys.stdout = sys.stdout, devnull  # 屏蔽生成函数的“已生成”输出
+                try:
+                    timings, peak, state = measure(setup, op, inner, repeat)
+                finally:
+                    sys.stdout = stdout
+            output_bytes = os.path.getsize(state) if name.startswith('generate/') else None
+            results[name] = summarize(timings, peak, output_bytes)
+            log(format_row(name, results[name]))
+    return results
+
+
+# ============ 冒烟测试 ============
+
+# 冒烟测试使用的试卷
+SMOKE_DAY, SMOKE_VERSION = 7, '完整版'
+
+
+def _smoke_generator():
+    """冒烟测试试卷的 (文件名主题, 生成函数)"""
+    for day, topic, generate in gen.DAY_DOCS:
+        if day == SMOKE_DAY:
+            return topic, generate
+    raise ValueError(f'没有第{SMOKE_DAY}天的生成函数')
+
+
+def smoke_manifest(work_dir):
+    """构建清单：代码不变时全部跳过，修改只被间接调用的排版辅助函数后全部重新生成
+
+    在脚本副本上运行命令行，以输出文件的修改时间判断是否重新生成。
+    """
+    script = os.path.join(work_dir, 'generate_exercises.py')
+    shutil.copyfile(gen.__file__, script)
+    output_dir = os.path.join(work_dir, 'out')
+
+    def build():
+        subprocess.run([sys.executable, script, '--output-dir', output_dir],
+                       check=True, capture_output=True)
+        return {name: os.stat(os.path.join(output_dir, name)).st_mtime_ns
+                for name in os.listdir(output_dir) if name.endswith('.docx')}
+
+    first = build()
+    if len(first) != len(gen.DAY_DOCS) * len(gen.VERSIONS):
+        return [f'构建清单: 首次构建生成了 {len(first)} 个文档']
+    problems = []
+    if build() != first:
+        problems.append('构建清单: 代码未变，文档却重新生成了')
+    with open(script, encoding='utf-8') as f:
+        source = f.read()
+    edited = re.sub(r'^(def add_question\(.*\n)', r'\1    # 渲染代码变化\n', source,
+                    count=1, flags=re.M)
+    with open(script, 'w', encoding='utf-8') as f:
+        f.write(edited)
+    rebuilt = build()
+    stale = [name for name, mtime in first.items() if rebuilt.get(name) == mtime]
+    if stale:
+        problems.append(f'构建清单: 修改 add_question 后 {len(stale)} 个文档没有重新生成')
+    return problems
+
+
+def smoke_reproducible(work_dir):
+    """可复现模式下同一份试卷两次生成的字节完全相同（各后端；间隔超过时间戳精度）"""
+    topic, generate = _smoke_generator()
+    backends = ['docx', 'ooxml', 'stream', 'html'] + (['pdf'] if gen.pdf_canvas is not None else [])
+    outputs = []
+    for attempt in range(2):
+        if attempt:
+            time.sleep(1.1)
+        output = {}
+        for backend in backends:
+            path = os.path.join(work_dir, f'{backend}{attempt}',
+                                gen.output_filename(SMOKE_DAY, topic, SMOKE_VERSION, backend))
+            os.makedirs(os.path.dirname(path))
+            generate(SMOKE_VERSION, path, backend=backend, reproducible=True)
+            with open(path, 'rb') as f:
+                output[backend] = f.read()
+        outputs.append(output)
+    return [f'可复现输出: {backend} 后端两次生成的字节不同'
+            for backend in backends if outputs[0][backend] != outputs[1][backend]]
+
+
+def _write_submission(path, paragraphs):
+    doc = docx.Document()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    doc.save(path)
+
+
+def _smoke_report(work_dir):
+    """两名学生的作答文档（全对、全错）写入磁盘后批改，返回 (报告, 失败列表)"""
+    topic, _ = _smoke_generator()
+    submissions = os.path.join(work_dir, 'submissions')
+    os.makedirs(submissions)
+    for student, fill in (('甲', None), ('乙', lambda key: 'zzz')):
+        paragraphs = (gen.answered_paragraphs(SMOKE_DAY, SMOKE_VERSION) if fill is None
+                      else gen.answered_paragraphs(SMOKE_DAY, SMOKE_VERSION, fill))
+        name = f'第{SMOKE_DAY}天_{topic}_{SMOKE_VERSION}_{student}.docx'
+        _write_submission(os.path.join(submissions, name), paragraphs)
+    return gen.grade_directory(submissions)
+
+
+def smoke_grading(work_dir):
+    """批改：按标准答案作答的文档全对，全部答错的文档全错"""
+    report, failed = _smoke_report(work_dir)
+    problems = [f'批改: {name} 批改失败: {error}' for name, error in failed]
+    expected = len(gen.paper_grading_items(SMOKE_DAY, SMOKE_VERSION))
+    scores = {paper['student']: (paper['score'], paper['total']) for paper in report['papers']}
+    for student, score in (('甲', expected), ('乙', 0)):
+        if scores.get(student) != (score, expected):
+            problems.append(f'批改: 学生{student}得分 {scores.get(student)}，应为 {(score, expected)}')
+    return problems
+
+
+def smoke_cube(work_dir):
+    """成绩分析：保存后读回的各维度汇总（含下钻）不变，重复的批改结果不再计入"""
+    report, _ = _smoke_report(work_dir)
+    path = os.path.join(work_dir, 'cube.json')
+    cube = gen.AnalyticsCube()
+    cube.add_report(report)
+    cube.save(path)
+    loaded = gen.AnalyticsCube.load(path)
+    drill = {'day': f'第{SMOKE_DAY}天'}
+    problems = [f'成绩分析: 读回后 {dimension} 维度的汇总不同'
+                for dimension in gen.CUBE_DIMENSIONS
+                if loaded.query(dimension) != cube.query(dimension)
+                or loaded.query(dimension, drill) != cube.query(dimension, drill)]
+    if loaded.add_report(report):
+        problems.append('成绩分析: 重复的批改结果被再次计入')
+    wrong, total = cube.query('day').get(f'第{SMOKE_DAY}天', {}).get(gen.UNASSIGNED_CLASS, (0, 0))
+    if not total or wrong * 2 != total:
+        problems.append(f'成绩分析: 第{SMOKE_DAY}天做错 {wrong}/{total}，应为一半')
+    return problems
+
+
+def smoke_ir(work_dir):
+    """中间表示：序列化再读回后渲染的字节和可批改题目与原 IR 相同（json，以及 msgpack）"""
+    events = gen.paper_ir(SMOKE_DAY, SMOKE_VERSION)
+
+    def render(events, name):
+        path = os.path.join(work_dir, name)
+        doc = gen.new_document()
+        gen.render_paper(events, doc)
+        gen.save_document(doc, path, reproducible=True)
+        with open(path, 'rb') as f:
+            return f.read()
+
+    expected = render(events, 'original.docx')
+    problems = []
+    for fmt in ['json'] + (['msgpack'] if gen.msgpack is not None else []):
+        loaded = gen.loads_paper(gen.dumps_paper(events, fmt), fmt)
+        if render(loaded, f'{fmt}.docx') != expected:
+            problems.append(f'中间表示: {fmt} 读回后渲染的字节不同')
+        if gen.grading_items(loaded) != gen.grading_items(events):
+            problems.append(f'中间表示: {fmt} 读回后可批改的题目不同')
+    return problems
+
+
+SMOKE_CHECKS = {
+    '构建清单': smoke_manifest,
+    '可复现输出': smoke_reproducible,
+    '批改': smoke_grading,
+    '成绩分析': smoke_cube,
+    '中间表示': smoke_ir,
+}
+
+
+def run_smoke(log=print):
+    """运行全部冒烟测试，返回问题列表（空列表表示通过）"""
+    problems = []
+    with tempfile.TemporaryDirectory(prefix='smoke_exercises_') as work_dir:
+        for name, check in SMOKE_CHECKS.items():
+            check_dir = os.path.join(work_dir, name)
+            os.makedirs(check_dir)
+            with open(os.devnull, 'w') as devnull:
+                stdout, sys.stdout = sys.stdout, devnull  # 屏蔽生成函数的“已生成”输出
+                try:
+                    found = check(check_dir)
+                finally:
+                    sys.stdout = stdout
+            log(f'{name}: {"通过" if not found else "失败"}')
+            problems.extend(found)
+    return problems
+
+
+# ============ 报告与对比 ============
+
+def format_row(name, result):
+    output_bytes = '' if result['bytes'] is None else result['bytes']
+    return (f'{name:<44} {result["ops_per_sec"]:>11.1f} {result["p50_ms"]:>9.3f} '
+            f'{result["p95_ms"]:>9.3f} {result["peak_kb"]:>9.1f} {output_bytes:>8}')
+
+
+def header_row():
+    return (f'{"用例":<42} {"ops/s":>11} {"p50 ms":>9} {"p95 ms":>9} '
+            f'{"峰值 KB":>7} {"字节":>6}')
+
+
+def environment():
+    """记录运行环境，便于判断两份结果是否可比"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'python-docx': docx.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(baseline, results, threshold):
+    """与基线对比 p50，返回变慢超过阈值的用例 [(名称, 基线 ms, 当前 ms, 比值)]"""
+    regressions = []
+    print(f'\n与基线对比（{baseline["environment"].get("commit")} → 当前，阈值 {threshold:.0%}）：')
+    for name, result in results.items():
+        old = baseline['cases'].get(name)
+        if old is None:
+            continue
+        ratio = result['p50_ms'] / old['p50_ms'] if old['p50_ms'] else float('inf')
+        mark = ''
+        if ratio > 1 + threshold:
+            mark = '  ← 变慢'
+            regressions.append((name, old['p50_ms'], result['p50_ms'], ratio))
+        elif ratio < 1 - threshold:
+            mark = '  ← 变快'
+        print(f'{name:<44} {old["p50_ms"]:>9.3f} → {result["p50_ms"]:>9.3f} ms  {ratio:>6.2f}x{mark}')
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='练习题生成器基准测试')
+    parser.add_argument('--backend', action='append',
+                        choices=['docx', 'ooxml', 'stream', 'pdf', 'html'],
+                        help='要测试的输出后端，可重复指定（默认 docx）')
+    parser.add_argument('--repeat', type=int, default=5, help='每个用例的样本数（默认 5）')
+    parser.add_argument('--filter', metavar='REGEX', help='只运行名称匹配的用例')
+    parser.add_argument('--json', metavar='PATH', help='把结果保存为 JSON')
+    parser.add_argument('--compare', metavar='PATH', help='与之前保存的 JSON 结果对比')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='p50 变慢超过该比例视为性能回退（默认 0.10）')
+    parser.add_argument('--smoke', action='store_true',
+                        help='只运行冒烟测试（构建清单、可复现输出、批改、成绩分析、中间表示的'
+                             '正确性检查）后退出')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.smoke:
+        problems = run_smoke()
+        for problem in problems:
+            print(problem)
+        if problems:
+            print(f'冒烟测试发现 {len(problems)} 个问题')
+            return 1
+        print('冒烟测试通过')
+        return 0
+    backends = args.backend or ['docx']
+    gen.new_document()  # 预先解析模板，不计入任何用例
+
+    print(header_row())
+    results = run_benchmarks(backends, args.repeat, args.filter)
+    report = {'environment': environment(), 'cases': results}
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f'\n结果已保存: {args.json}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} 个用例性能回退超过 {args.threshold:.0%}')
+            return 1
+        print('\n没有超过阈值的性能回退')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+练习题生成器轻量客户端
+把命令行参数原样转发给常驻进程（generate_exercises.py --daemon），
+省去每次启动时加载 python-docx/lxml 和解析模板的时间；
+没有常驻进程或常驻进程的代码已过期时，直接在本进程内生成，结果相同
+"""
+
+import json
+import os
+import socket
+import stat
+import sys
+import tempfile
+
+
+DAEMON_SOCKET_ENV = 'EXERCISES_DAEMON_SOCKET'
+
+
+def daemon_socket_path():
+    """与 generate_exercises.daemon_socket_path 相同的约定"""
+    path = os.environ.get(DAEMON_SOCKET_ENV)
+    if path:
+        return path
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'generate_exercises.sock')
+    return os.path.join(tempfile.gettempdir(), f'generate_exercises-{os.getuid()}',
+                        'daemon.sock')
+
+
+def _owned_socket(path):
+    """path 是当前用户创建的套接字时返回 True；不连接其他用户放置的套接字"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+def call_daemon(message, path=None):
+    """发送一条请求并等待回复，返回 (回复, 标准输出字节)；常驻进程不可用时返回 (None, b'')
+
+    回复是一行 JSON，其后紧跟 payload 字段所示字节数的标准输出。
+    """
+    path = path or daemon_socket_path()
+    if not _owned_socket(path):
+        return None, b''
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(path)
+        conn.sendall(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+        data = b''
+        while b'\n' not in data:
+            chunk = conn.recv(65536)
+            if not chunk:
+                return None, b''
+            data += chunk
+        header, payload = data.split(b'\n', 1)
+        response = json.loads(header.decode('utf-8'))
+        while len(payload) < response.get('payload', 0):
+            chunk = conn.recv(65536)
+            if not chunk:
+                return None, b''
+            payload += chunk
+    except OSError:
+        return None, b''
+    finally:
+        conn.close()
+    return response, payload
+
+
+def run_in_process(argv):
+    """回退：在本进程内执行生成器"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import generate_exercises
+    return generate_exercises.main(argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv == ['--stop-daemon']:
+        response, _ = call_daemon({'shutdown': True})
+        print('常驻进程已退出' if response else '没有运行中的常驻进程')
+        return 0
+
+    response, output = call_daemon({'argv': argv, 'cwd': os.getcwd()})
+    if response is None or response.get('stale'):
+        return run_in_process(argv)
+    sys.stdout.flush()
+    sys.stdout.buffer.write(output)
+    sys.stdout.flush()
+    sys.stderr.write(response['stderr'])
+    return response['exit']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
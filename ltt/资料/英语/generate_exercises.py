@@ -5,78 +5,873 @@
 生成第2天（词汇基础）和第3天（句型基础）的练习题 Word 文档
 """
 
+import argparse
+import concurrent.futures
+import collections
+import collections.abc
+import contextlib
+import copy
+import functools
+import gc
+import hashlib
+import html
+import http.server
+import inspect
+import io
+import itertools
+import json
+import mmap
+import os
+import random
+import re
+import shutil
+import socket
+import sqlite3
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import tracemalloc
+import urllib.parse
+import zipfile
+from xml.sax.saxutils import escape as xml_escape
+
+import docx
 from docx import Document
 from docx.shared import Pt, RGBColor, Inches
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
+from docx.opc.part import XmlPart
+from docx.package import Package
+from docx.parts.styles import StylesPart
+from lxml import etree
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖，只有 msgpack 格式的中间表示需要
+    msgpack = None
+
+try:
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas as pdf_canvas
+except ImportError:  # 可选依赖，只有 pdf 后端需要
+    pdf_canvas = None
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖，成绩分析没有 NumPy 时用字典累加
+    np = None
+
+try:
+    import resource
+except ImportError:  # 非 POSIX 平台，内存统计不报告 RSS 峰值
+    resource = None
+
+# 自定义品牌模板路径，None 表示使用 python-docx 自带的默认模板
+BASE_TEMPLATE = None
+
+# 已解析的原型文档缓存：模板路径 -> (原型 Document, 样式部件字节)
+_PROTOTYPES = {}
+
+
+class _SharedStylesPart(StylesPart):
+    """写时复制的样式部件
+
+    在访问样式元素之前与原型共享元素，保存时直接复用原型序列化好的字节；
+    一旦访问（如 doc.styles.add_style），先深拷贝一份归本文档所有，保存时
+    重新序列化，修改不会影响原型和其他文档。
+    """
+
+    def __init__(self, partname, content_type, element, package, blob):
+        super().__init__(partname, content_type, element, package)
+        self._shared_blob = blob
+
+    @property
+    def _element(self):
+        if self._own_element is None:
+            self._own_element = copy.deepcopy(self._shared_element)
+        return self._own_element
+
+    @_element.setter
+    def _element(self, element):
+        self._shared_element = element
+        self._own_element = None
+
+    @property
+    def blob(self):
+        if self._own_element is None:
+            return self._shared_blob
+        return super().blob
+
+
+def _load_prototype(template):
+    """解析模板并缓存为原型（每个进程每个模板只解析一次）"""
+    cached = _PROTOTYPES.get(template)
+    if cached is None:
+        proto = Document(template)
+        _add_exercise_styles(proto)
+        cached = _PROTOTYPES[template] = (proto, proto.part._styles_part.blob)
+    return cached
+
+
+def _clone_document(proto, styles_blob):
+    """从原型克隆新文档：XML 部件深拷贝，二进制部件共享，样式部件写时复制"""
+    src = proto.part.package
+    pkg = Package()
+    clones = {}
+    for part in src.iter_parts():
+        if isinstance(part, StylesPart):
+            clones[part] = _SharedStylesPart(part.partname, part.content_type,
+                                             part._element, pkg, styles_blob)
+        elif isinstance(part, XmlPart):
+            clones[part] = type(part)(part.partname, part.content_type,
+                                      copy.deepcopy(part._element), pkg)
+        else:
+            clones[part] = type(part)(part.partname, part.content_type, part.blob, pkg)
+
+    def target(rel):
+        return rel.target_ref if rel.is_external else clones[rel.target_part]
+
+    for rel in src.rels.values():
+        pkg.load_rel(rel.reltype, target(rel), rel.rId, rel.is_external)
+    for part, clone in clones.items():
+        for rel in part.rels.values():
+            clone.load_rel(rel.reltype, target(rel), rel.rId, rel.is_external)
+    pkg.after_unmarshal()
+    return pkg.main_document_part.document
+
+
+def new_document(template=None, backend='docx', output_path=None):
+    """创建新文档（从缓存的原型克隆，代替直接调用 Document()）
+
+    backend='docx' 返回 python-docx 文档；backend='ooxml' 返回直接输出
+    WordprocessingML 的 OoxmlDocument；backend='stream' 返回边生成边写入
+    output_path 的 StreamingDocument；backend='pdf' 返回直接输出 PDF 的
+    PdfDocument；backend='html' 返回 HtmlDocument。它们都支持同一套 add_* 辅助函数。
+    backend 也可以是 backend(template, output_path) 形式的文档工厂。
+    """
+    template = template or BASE_TEMPLATE
+    if callable(backend):
+        return backend(template, output_path)
+    if backend == 'ooxml':
+        return OoxmlDocument(template)
+    if backend == 'stream':
+        if output_path is None:
+            raise ValueError('stream 后端需要在创建时指定 output_path')
+        return StreamingDocument(output_path, template)
+    if backend == 'pdf':
+        return PdfDocument(template)
+    if backend == 'html':
+        return HtmlDocument(template)
+    if backend != 'docx':
+        raise ValueError(f'未知的输出后端: {backend}')
+    return _clone_document(*_load_prototype(template))
+
+
+# ============ 直接 OOXML 输出后端 ============
+
+# 模板包缓存：模板路径 -> (预压缩好的静态部件 zip 字节, document.xml 正文前部分, 正文后部分)
+_PACKAGE_PARTS = {}
+
+_DOCUMENT_PART = 'word/document.xml'
+_BLANK_PARAGRAPH_XML = '<w:p/>'
+_PAGE_BREAK_XML = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+_RUN_SPECIAL_CHARS = re.compile(r'([\t\r\n])')
+
+
+def _load_package_parts(template):
+    """把原型序列化一次：静态部件预先压缩成 zip，document.xml 拆成首尾片段"""
+    cached = _PACKAGE_PARTS.get(template)
+    if cached is None:
+        buf = io.BytesIO()
+        new_document(template).save(buf)
+        static = io.BytesIO()
+        with zipfile.ZipFile(buf) as src, \
+                zipfile.ZipFile(static, 'w', zipfile.ZIP_DEFLATED) as dst:
+            for name in src.namelist():
+                if name != _DOCUMENT_PART:
+                    dst.writestr(name, src.read(name))
+            xml = src.read(_DOCUMENT_PART).decode('utf-8')
+        split = xml.rfind('<w:sectPr')
+        if split < 0:
+            split = xml.rfind('</w:body>')
+        cached = _PACKAGE_PARTS[template] = (static.getvalue(), xml[:split], xml[split:])
+    return cached
+
+
+def _run_xml(text):
+    """把文本转成 w:r 内容（制表符、换行与 python-docx 的处理方式一致）"""
+    parts = []
+    for piece in _RUN_SPECIAL_CHARS.split(text):
+        if piece == '\t':
+            parts.append('<w:tab/>')
+        elif piece in ('\r', '\n'):
+            parts.append('<w:br/>')
+        elif piece:
+            if len(piece.strip()) < len(piece):
+                parts.append(f'<w:t xml:space="preserve">{xml_escape(piece)}</w:t>')
+            else:
+                parts.append(f'<w:t>{xml_escape(piece)}</w:t>')
+    return f'<w:r>{"".join(parts)}</w:r>'
+
+
+def paragraph_xml(text, style_id=None):
+    """生成单个段落的 WordprocessingML 片段"""
+    ppr = f'<w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>' if style_id else ''
+    run = _run_xml(text) if text else ''
+    if not ppr and not run:
+        return _BLANK_PARAGRAPH_XML
+    return f'<w:p>{ppr}{run}</w:p>'
+
+
+# ============ 段落片段缓存 ============
+
+# 进程内 LRU 默认容量（段落数）
+FRAGMENT_CACHE_SIZE = 50000
+
+# 磁盘缓存每累计这么多条新片段写入一次（文档保存时也会写入）
+_FRAGMENT_COMMIT_BATCH = 1000
+
+
+class FragmentCache:
+    """段落片段缓存：进程内 LRU + 可选的磁盘存储
+
+    键为 (文本, 样式 ID)，缩进由样式 ID 决定。directory 不为 None 时启用
+    SQLite 磁盘层，可在多次运行和多个工作进程之间共享；磁盘上的片段按渲染
+    代码指纹（与构建清单相同的 renderer_digest）区分，渲染代码变化后自动失效。
+    每个进程第一次用到磁盘层时一次读入当前指纹的全部片段，之后的查找不再
+    访问数据库，新片段攒批写入。
+    """
+
+    def __init__(self, maxsize=FRAGMENT_CACHE_SIZE, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lru = collections.OrderedDict()
+        self._disk = None  # 磁盘层中当前指纹的片段：(文本, 样式 ID) -> 片段
+        self._db = None
+        self._db_pid = None
+        self._pending = []
+
+    def fragment(self, text, style_id):
+        """返回段落片段，缓存未命中时渲染并写入缓存"""
+        key = (text, style_id)
+        fragment = self._lru.get(key)
+        if fragment is not None:
+            self._lru.move_to_end(key)
+            self.hits += 1
+            return fragment
+        fragment = self._disk_fragments().get(key) if self.directory else None
+        if fragment is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            fragment = paragraph_xml(text, style_id)
+            if self.directory:
+                self._disk[key] = fragment
+                self._pending.append(key)
+                if len(self._pending) >= _FRAGMENT_COMMIT_BATCH:
+                    self.flush()
+        if self.maxsize:
+            self._lru[key] = fragment
+            if len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+        return fragment
+
+    def stats(self):
+        """命中统计"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'size': len(self._lru),
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def _disk_fragments(self):
+        # 每个进程单独打开连接（fork 出的子进程不能复用父进程的连接）
+        if self._db is None or self._db_pid != os.getpid():
+            os.makedirs(self.directory, exist_ok=True)
+            db = sqlite3.connect(os.path.join(self.directory, 'fragments.sqlite3'), timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('CREATE TABLE IF NOT EXISTS fragments ('
+                       'version TEXT, style TEXT, text TEXT, xml TEXT, '
+                       'PRIMARY KEY (version, style, text)) WITHOUT ROWID')
+            version = renderer_digest()
+            with db:  # 其他渲染代码版本的片段不会再用到
+                db.execute('DELETE FROM fragments WHERE version != ?', (version,))
+            self._disk = {(text, style or None): xml for style, text, xml in db.execute(
+                'SELECT style, text, xml FROM fragments WHERE version = ?', (version,))}
+            self._db, self._db_pid, self._pending = db, os.getpid(), []
+        return self._disk
+
+    def flush(self):
+        """把新渲染的片段写入磁盘层"""
+        if self._pending and self._db_pid == os.getpid():
+            version = renderer_digest()
+            with self._db:
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO fragments VALUES (?, ?, ?, ?)',
+                    [(version, style_id or '', text, self._disk[(text, style_id)])
+                     for text, style_id in self._pending])
+            self._pending = []
+
+
+# 当前进程的片段缓存
+fragment_cache = FragmentCache()
+
+
+def configure_fragment_cache(maxsize=FRAGMENT_CACHE_SIZE, directory=None):
+    """重新配置当前进程的片段缓存（也用作进程池的 initializer）"""
+    global fragment_cache
+    fragment_cache.flush()
+    fragment_cache = FragmentCache(maxsize, directory)
+    return fragment_cache
+
+
+class OoxmlDocument:
+    """直接拼接 WordprocessingML 片段的轻量文档，不经过 python-docx 对象模型
+
+    段落片段通过 FragmentCache 获取（默认使用当前进程的 fragment_cache），
+    同一段落在各文档、各版本之间只渲染一次。
+    """
+
+    def __init__(self, template=None, cache=None):
+        self._static_zip, self._head, self._tail = _load_package_parts(template)
+        self._body = []
+        self._cache = fragment_cache if cache is None else cache
+
+    def add_paragraph(self, text='', style=None):
+        """添加段落（style 为样式 ID）"""
+        self._body.append(self._cache.fragment(text, style))
+
+    def add_styled_paragraph(self, text, style_id):
+        self._body.append(self._cache.fragment(text, style_id))
+
+    def add_page_break(self):
+        self._body.append(_PAGE_BREAK_XML)
+
+    def save(self, path_or_stream):
+        """在预压缩的静态部件后追加 document.xml，只压缩正文"""
+        self._cache.flush()
+        document_xml = ''.join([self._head, *self._body, self._tail]).encode('utf-8')
+        buf = io.BytesIO(self._static_zip)
+        with zipfile.ZipFile(buf, 'a', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(_DOCUMENT_PART, document_xml)
+        if hasattr(path_or_stream, 'write'):
+            path_or_stream.write(buf.getvalue())
+        else:
+            with open(path_or_stream, 'wb') as f:
+                f.write(buf.getvalue())
+
+
+# 流式写入时正文缓冲区达到该字符数即压缩写出
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkedBody:
+    """正文片段缓冲区：攒够一块就编码并写入压缩流"""
+
+    def __init__(self, stream, chunk_size=STREAM_CHUNK_SIZE):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._pending = []
+        self._size = 0
+
+    def append(self, fragment):
+        self._pending.append(fragment)
+        self._size += len(fragment)
+        if self._size >= self._chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._stream.write(''.join(self._pending).encode('utf-8'))
+            self._pending = []
+            self._size = 0
+
+
+class StreamingDocument(OoxmlDocument):
+    """边生成边写入的文档：document.xml 分块压缩写入 zip，内存占用与题量无关"""
+
+    def __init__(self, output_path, template=None, cache=None):
+        super().__init__(template, cache)
+        self._path = output_path
+        self._file = open(output_path, 'w+b')
+        try:
+            self._file.write(self._static_zip)
+            self._zip = zipfile.ZipFile(self._file, 'a', zipfile.ZIP_DEFLATED)
+            self._stream = self._zip.open(_DOCUMENT_PART, 'w')
+            self._stream.write(self._head.encode('utf-8'))
+        except Exception:
+            self._file.close()
+            raise
+        self._body = _ChunkedBody(self._stream)
+
+    def save(self, path=None):
+        """写入正文结尾并关闭 zip（文件路径在创建时已确定）"""
+        if path is not None and os.path.abspath(path) != os.path.abspath(self._path):
+            raise ValueError(f'流式文档只能保存到创建时指定的路径: {self._path}')
+        self._cache.flush()
+        self._body.flush()
+        self._stream.write(self._tail.encode('utf-8'))
+        self._stream.close()
+        self._zip.close()
+        self._file.close()
+
+
+# ============ 可复现输出 ============
+
+# 未设置 SOURCE_DATE_EPOCH 时使用的固定时间（zip 能表示的最早时间 1980-01-01）
+_ZIP_EPOCH = 315532800
+
+_CORE_PROPS_PART = 'docProps/core.xml'
+_DCTERMS_NS = 'http://purl.org/dc/terms/'
+
+
+def reproducible_timestamp():
+    """可复现输出使用的固定时间戳（遵循 SOURCE_DATE_EPOCH 约定）"""
+    return int(os.environ.get('SOURCE_DATE_EPOCH', _ZIP_EPOCH))
+
+
+def _normalize_core_xml(blob, timestamp):
+    """把 core.xml 中的创建/修改时间改为固定时间"""
+    root = etree.fromstring(blob)
+    stamp = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(timestamp))
+    for tag in ('created', 'modified'):
+        for el in root.iter(f'{{{_DCTERMS_NS}}}{tag}'):
+            el.text = stamp
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+def _package_order(name):
+    """部件排序：[Content_Types].xml 在最前，其余按名称排序"""
+    return name != '[Content_Types].xml', name
+
+
+def _normalize_zip(source, target):
+    """把 source 中的 .docx 以可复现的形式写入 target（路径或文件对象）"""
+    timestamp = reproducible_timestamp()
+    date_time = time.gmtime(max(timestamp, _ZIP_EPOCH))[:6]
+    with zipfile.ZipFile(source) as src, zipfile.ZipFile(target, 'w') as dst:
+        for name in sorted(src.namelist(), key=_package_order):
+            info = zipfile.ZipInfo(name, date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.create_system = 3
+            info.external_attr = 0o644 << 16
+            if name == _CORE_PROPS_PART:
+                dst.writestr(info, _normalize_core_xml(src.read(name), timestamp))
+                continue
+            with src.open(name) as fin, dst.open(info, 'w') as fout:
+                shutil.copyfileobj(fin, fout, STREAM_CHUNK_SIZE)
+
+
+def normalize_package(path):
+    """把 .docx 改写为字节级可复现的形式：固定 zip 元数据、部件顺序和 core.xml 时间"""
+    tmp_path = f'{path}.tmp'
+    _normalize_zip(path, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def normalized_package_bytes(data):
+    """normalize_package 的内存版本：输入输出都是 .docx 字节"""
+    buf = io.BytesIO()
+    _normalize_zip(io.BytesIO(data), buf)
+    return buf.getvalue()
+
+
+def save_document(doc, output_path, reproducible=False):
+    """保存文档；reproducible=True 时相同输入总是得到相同字节"""
+    if isinstance(doc, (PdfDocument, HtmlDocument)):
+        doc.save(output_path, reproducible)
+        return
+    doc.save(output_path)
+    if reproducible:
+        normalize_package(output_path)
+
 
 def set_chinese_font(run, font_name='宋体', font_size=12):
-    """设置中文字体"""
+    """设置中文字体（run 或样式均可）"""
     run.font.name = font_name
     run.font.size = Pt(font_size)
     run._element.rPr.rFonts.set(qn('w:eastAsia'), font_name)
 
-def add_title(doc, title, subtitle):
-    """添加主标题和副标题"""
-    # 主标题
-    p = doc.add_paragraph()
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = p.add_run(title)
-    run.bold = True
-    run.font.color.rgb = RGBColor(255, 0, 0)
-    set_chinese_font(run, '黑体', 18)
 
-    # 副标题
+# ============ 段落样式 ============
+
+# 样式 ID（段落只引用样式 ID，格式统一定义在 styles.xml 中）
+STYLE_TITLE = 'PaperTitle'
+STYLE_SUBTITLE = 'PaperSubtitle'
+STYLE_SECTION = 'SectionHeader'
+STYLE_HEADER = 'QuestionHeader'
+STYLE_QUESTION = 'Question'
+STYLE_QUESTION_PLAIN = 'QuestionPlain'
+STYLE_ANSWER_TITLE = 'AnswerTitle'
+
+# 样式定义：样式名 -> (字体, 字号, 加粗, 下划线, 红色, 居中, 左缩进)
+EXERCISE_STYLES = {
+    'Paper Title': ('黑体', 18, True, False, True, True, False),
+    'Paper Subtitle': ('宋体', 14, False, False, False, True, False),
+    'Section Header': ('黑体', 14, True, True, False, False, False),
+    'Question Header': ('宋体', 12, True, False, False, False, False),
+    'Question': ('宋体', 11, False, False, False, False, True),
+    'Question Plain': ('宋体', 11, False, False, False, False, False),
+    'Answer Title': ('黑体', 16, True, False, True, True, False),
+}
+
+
+def _add_exercise_styles(doc):
+    """在 styles.xml 中创建练习题样式（已存在的同名样式保持不变）"""
+    styles = doc.styles
+    existing = {style.name for style in styles}
+    for name, (font_name, font_size, bold, underline, red, center, indent) in EXERCISE_STYLES.items():
+        if name in existing:
+            continue
+        style = styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+        style.base_style = styles['Normal']
+        set_chinese_font(style, font_name, font_size)
+        if bold:
+            style.font.bold = True
+        if underline:
+            style.font.underline = True
+        if red:
+            style.font.color.rgb = RGBColor(255, 0, 0)
+        if center:
+            style.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        if indent:
+            style.paragraph_format.left_indent = Inches(0.3)
+
+
+def add_styled_paragraph(doc, text, style_id):
+    """添加只引用样式 ID 的段落"""
+    if isinstance(doc, (OoxmlDocument, PdfDocument, HtmlDocument)):
+        return doc.add_styled_paragraph(text, style_id)
     p = doc.add_paragraph()
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = p.add_run(subtitle)
-    set_chinese_font(run, '宋体', 14)
+    p._p.get_or_add_pPr().style = style_id
+    if text:
+        p.add_run(text)
+    return p
+
+
+def add_title(doc, title, subtitle):
+    """添加主标题和副标题"""
+    add_styled_paragraph(doc, title, STYLE_TITLE)
+    add_styled_paragraph(doc, subtitle, STYLE_SUBTITLE)
     doc.add_paragraph()  # 空行
 
 def add_section_title(doc, title):
     """添加分节标题（带下划线）"""
-    p = doc.add_paragraph()
-    run = p.add_run(title)
-    run.bold = True
-    run.underline = True
-    set_chinese_font(run, '黑体', 14)
+    add_styled_paragraph(doc, title, STYLE_SECTION)
 
 def add_question_header(doc, number, title):
     """添加大题标题"""
-    p = doc.add_paragraph()
-    run = p.add_run(f'{number}、{title}')
-    run.bold = True
-    set_chinese_font(run, '宋体', 12)
+    add_styled_paragraph(doc, f'{number}、{title}', STYLE_HEADER)
 
 def add_question(doc, text, indent=True):
     """添加题目"""
-    p = doc.add_paragraph()
-    if indent:
-        p.paragraph_format.left_indent = Inches(0.3)
-    run = p.add_run(text)
-    set_chinese_font(run, '宋体', 11)
+    add_styled_paragraph(doc, text, STYLE_QUESTION if indent else STYLE_QUESTION_PLAIN)
 
 def add_answer_section(doc, answers):
     """添加参考答案部分"""
     doc.add_page_break()
-    p = doc.add_paragraph()
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = p.add_run('参考答案')
-    run.bold = True
-    run.font.color.rgb = RGBColor(255, 0, 0)
-    set_chinese_font(run, '黑体', 16)
+    add_styled_paragraph(doc, '参考答案', STYLE_ANSWER_TITLE)
     doc.add_paragraph()
 
     for section, ans_list in answers.items():
-        p = doc.add_paragraph()
-        run = p.add_run(section)
-        run.bold = True
-        set_chinese_font(run, '宋体', 12)
+        add_styled_paragraph(doc, section, STYLE_HEADER)
         for ans in ans_list:
-            p = doc.add_paragraph()
-            p.paragraph_format.left_indent = Inches(0.3)
-            run = p.add_run(ans)
-            set_chinese_font(run, '宋体', 11)
+            add_styled_paragraph(doc, ans, STYLE_QUESTION)
+
+
+# ============ PDF 输出后端 ============
+
+# 指定嵌入字体文件（TrueType .ttf/.ttc），设置后所有样式都使用该字体
+PDF_FONT_ENV = 'EXERCISES_PDF_FONT'
+
+# 样式字体 -> 候选字体文件（按顺序在 PDF_FONT_DIRS 中查找，找到的第一个嵌入 PDF）
+PDF_FONT_FILES = {
+    '宋体': ('simsun.ttc', 'simsun.ttf', 'wqy-microhei.ttc', 'wqy-zenhei.ttc',
+             'DroidSansFallbackFull.ttf', 'DroidSansFallback.ttf'),
+    '黑体': ('simhei.ttf', 'msyh.ttc', 'msyh.ttf', 'wqy-zenhei.ttc', 'wqy-microhei.ttc',
+             'DroidSansFallbackFull.ttf', 'DroidSansFallback.ttf'),
+}
+PDF_FONT_DIRS = ('/usr/share/fonts', '/usr/local/share/fonts', '~/.fonts',
+                 '~/.local/share/fonts', '/Library/Fonts', '/System/Library/Fonts',
+                 'C:/Windows/Fonts')
+
+# 找不到 TrueType 字体时使用的 CID 字体（不嵌入，字形由阅读器提供）
+PDF_FALLBACK_FONT = 'STSong-Light'
+
+# 版面（纸张大小、页边距）取自模板第一节的 sectPr，见 pdf_page_layout
+PDF_LINE_HEIGHT = 1.4  # 行高 / 字号
+PDF_INDENT = 21.6  # Question 样式的左缩进（0.3 英寸）
+
+# 样式 ID -> 样式定义（与 EXERCISE_STYLES 相同的元组）；无样式段落按正文处理
+_PDF_STYLES = {name.replace(' ', ''): style for name, style in EXERCISE_STYLES.items()}
+_PDF_BODY_STYLE = ('宋体', 11, False, False, False, False, False)
+
+# 折行单位：连续的 ASCII 可见字符（英文单词连同标点）、单个空白或单个其他字符
+_PDF_TOKEN = re.compile(r'[!-~]+|\s|.')
+
+
+@functools.lru_cache(maxsize=None)
+def _system_font_files():
+    """系统字体目录中的字体文件：小写文件名 -> 路径"""
+    found = {}
+    for root in PDF_FONT_DIRS:
+        for dirpath, _, filenames in os.walk(os.path.expanduser(root)):
+            for filename in filenames:
+                found.setdefault(filename.lower(), os.path.join(dirpath, filename))
+    return found
+
+
+@functools.lru_cache(maxsize=None)
+def pdf_font(family):
+    """注册样式字体对应的 PDF 字体并返回字体名（每个进程每种字体只注册一次）"""
+    path = os.environ.get(PDF_FONT_ENV)
+    if not path:
+        files = _system_font_files()
+        path = next((files[name.lower()] for name in PDF_FONT_FILES[family]
+                     if name.lower() in files), None)
+    if path is None:
+        pdfmetrics.registerFont(UnicodeCIDFont(PDF_FALLBACK_FONT))
+        return PDF_FALLBACK_FONT
+    name = os.path.splitext(os.path.basename(path))[0]
+    pdfmetrics.registerFont(TTFont(name, path))
+    return name
+
+
+def _wrap_line(text, font, size, width):
+    """按宽度贪心折行：英文单词不拆开，超宽的连续字符（如长下划线）逐字折行"""
+    lines, line, line_width = [], [], 0.0
+    for token in _PDF_TOKEN.findall(text):
+        token_width = pdfmetrics.stringWidth(token, font, size)
+        pieces = [(token, token_width)]
+        if token_width > width:
+            pieces = [(char, pdfmetrics.stringWidth(char, font, size)) for char in token]
+        for piece, piece_width in pieces:
+            if line and line_width + piece_width > width:
+                lines.append(''.join(line).rstrip())
+                line, line_width = [], 0.0
+                if piece.isspace():
+                    continue
+            line.append(piece)
+            line_width += piece_width
+    lines.append(''.join(line).rstrip())
+    return lines
+
+
+@functools.lru_cache(maxsize=None)
+def pdf_page_layout(template):
+    """模板第一节的 (纸宽, 纸高, 左, 右, 上, 下边距)，单位 pt，PDF 版面与 Word 输出一致"""
+    section = _load_prototype(template)[0].sections[0]
+    return (section.page_width.pt, section.page_height.pt,
+            section.left_margin.pt, section.right_margin.pt,
+            section.top_margin.pt, section.bottom_margin.pt)
+
+
+@functools.lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def pdf_lines(text, style_id, text_width):
+    """段落折行结果（按段落文字、样式和版心宽度缓存，各文档、各版本之间共享）"""
+    family, size, _, _, _, _, indent = _PDF_STYLES.get(style_id, _PDF_BODY_STYLE)
+    width = text_width - (PDF_INDENT if indent else 0)
+    font = pdf_font(family)
+    lines = []
+    for hard_line in text.expandtabs(4).splitlines() or ['']:
+        lines.extend(_wrap_line(hard_line, font, size, width))
+    return tuple(lines)
+
+
+class PdfDocument:
+    """直接输出 PDF 的文档，不经过 Word 文档和格式转换
+
+    接口与 OoxmlDocument 相同，add_* 辅助函数不需要区分后端。段落先按顺序记录，
+    保存时一次排版写出；字体按 EXERCISE_STYLES 中的字体名查找 TrueType 字体嵌入
+    （只嵌入用到的字形）。需要安装 reportlab；纸张大小和页边距取自 template。
+    """
+
+    def __init__(self, template=None):
+        if pdf_canvas is None:
+            raise RuntimeError('pdf 后端需要安装 reportlab: pip install reportlab')
+        self._layout = pdf_page_layout(template or BASE_TEMPLATE)
+        self._body = []  # (文字, 样式 ID)，分页符记为 None
+
+    def add_paragraph(self, text='', style=None):
+        """添加段落（style 为样式 ID）"""
+        self._body.append((text, style))
+
+    def add_styled_paragraph(self, text, style_id):
+        self._body.append((text, style_id))
+
+    def add_page_break(self):
+        self._body.append(None)
+
+    def save(self, path_or_stream, reproducible=False):
+        """排版并写出 PDF；reproducible=True 时固定文档时间和文件 ID"""
+        page_width, page_height, left, right, top_margin, bottom = self._layout
+        text_width = page_width - left - right
+        pdf = pdf_canvas.Canvas(path_or_stream, pagesize=(page_width, page_height),
+                                initialFontName=pdf_font(_PDF_BODY_STYLE[0]),
+                                invariant=int(reproducible))
+        top = page_height - top_margin
+        y = top
+        for paragraph in self._body:
+            if paragraph is None:
+                pdf.showPage()
+                y = top
+                continue
+            text, style_id = paragraph
+            family, size, bold, underline, red, center, indent = _PDF_STYLES.get(
+                style_id, _PDF_BODY_STYLE)
+            font = pdf_font(family)
+            leading = size * PDF_LINE_HEIGHT
+            for line in pdf_lines(text, style_id, text_width):
+                if y - leading < bottom:
+                    pdf.showPage()
+                    y = top
+                y -= leading
+                if not line:
+                    continue
+                x = left + (PDF_INDENT if indent else 0)
+                if center or underline:
+                    line_width = pdfmetrics.stringWidth(line, font, size)
+                    if center:
+                        x = left + (text_width - line_width) / 2
+                color = (1, 0, 0) if red else (0, 0, 0)
+                pdf.setFillColorRGB(*color)
+                pdf.setStrokeColorRGB(*color)
+                pdf.setLineWidth(size * 0.03)
+                # 基线位于行框底部上方约 1/4 行高处
+                baseline = y + (leading - size) / 2 + size * 0.12
+                obj = pdf.beginText(x, baseline)
+                obj.setFont(font, size)
+                if bold:
+                    obj.setTextRenderMode(2)  # 描边加粗：中文字体通常没有粗体字形
+                obj.textOut(line)
+                pdf.drawText(obj)
+                if underline:
+                    pdf.line(x, baseline - size * 0.15, x + line_width, baseline - size * 0.15)
+        pdf.save()
+
+
+# ============ HTML 输出后端 ============
+
+# 流式输出时攒够该字符数即产出一块
+HTML_CHUNK_SIZE = 16 * 1024
+
+# 样式 ID -> HTML 标签（其余样式和无样式段落都输出为 <p>）
+_HTML_TAGS = {STYLE_TITLE: 'h1', STYLE_SECTION: 'h2', STYLE_ANSWER_TITLE: 'h2', STYLE_HEADER: 'h3'}
+_HTML_FONTS = {'宋体': '"宋体", SimSun, serif', '黑体': '"黑体", SimHei, sans-serif'}
+_HTML_PAGE_BREAK = '</section>\n<section class="page">\n'
+_HTML_TAIL = '</section>\n</body>\n</html>\n'
+
+
+def html_class(style_id):
+    """样式 ID 对应的 CSS 类名：PaperTitle -> paper-title"""
+    return re.sub(r'(?<!^)(?=[A-Z])', '-', style_id).lower()
+
+
+@functools.lru_cache(maxsize=None)
+def html_stylesheet():
+    """由 EXERCISE_STYLES 生成的样式表，与 Word 文档中的段落样式一一对应"""
+    rules = [
+        f'body {{ max-width: 46em; margin: 2em auto; padding: 0 1em; '
+        f'font-family: {_HTML_FONTS["宋体"]}; font-size: 11pt; }}',
+        'h1, h2, h3, p { margin: 0; font-weight: normal; white-space: pre-wrap; }',
+        'p.blank { min-height: 1.4em; }',
+        '.page + .page { break-before: page; margin-top: 2em; border-top: 1px dashed #999; }',
+    ]
+    for name, (font_name, font_size, bold, underline, red, center, indent) in EXERCISE_STYLES.items():
+        declarations = [f'font-family: {_HTML_FONTS.get(font_name, font_name)}',
+                        f'font-size: {font_size}pt']
+        if bold:
+            declarations.append('font-weight: bold')
+        if underline:
+            declarations.append('text-decoration: underline')
+        if red:
+            declarations.append('color: #f00')
+        if center:
+            declarations.append('text-align: center')
+        if indent:
+            declarations.append('margin-left: 0.3in')
+        rules.append(f'.{html_class(name.replace(" ", ""))} {{ {"; ".join(declarations)}; }}')
+    return '\n'.join(rules)
+
+
+def html_head(title):
+    return (f'<!DOCTYPE html>\n<html lang="zh-CN">\n<head>\n<meta charset="utf-8">\n'
+            f'<title>{html.escape(title or "")}</title>\n<style>\n{html_stylesheet()}\n</style>\n'
+            f'</head>\n<body>\n<section class="page">\n')
+
+
+@functools.lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def paragraph_html(text, style_id=None):
+    """单个段落的 HTML 片段（按段落文字和样式缓存）"""
+    if not text:
+        return '<p class="blank"></p>\n'
+    tag = _HTML_TAGS.get(style_id, 'p')
+    css = f' class="{html_class(style_id)}"' if style_id else ''
+    return f'<{tag}{css}>{html.escape(text, quote=False)}</{tag}>\n'
+
+
+class HtmlDocument:
+    """输出 HTML 的文档：段落按样式输出为带类名的元素，分页符开始新的 <section class="page">
+
+    接口与 OoxmlDocument 相同，add_* 辅助函数不需要区分后端。take() 取出尚未输出的
+    部分，用于边渲染边输出。template 参数只为接口一致，不使用。
+    """
+
+    def __init__(self, template=None):
+        self.title = None
+        self.pending = 0  # 尚未取出的字符数
+        self._body = []
+        self._started = False
+
+    def _append(self, fragment):
+        self._body.append(fragment)
+        self.pending += len(fragment)
+
+    def add_paragraph(self, text='', style=None):
+        """添加段落（style 为样式 ID）"""
+        self._append(paragraph_html(text, style))
+
+    def add_styled_paragraph(self, text, style_id):
+        if self.title is None and style_id == STYLE_TITLE:
+            self.title = text
+        self._append(paragraph_html(text, style_id))
+
+    def add_page_break(self):
+        self._append(_HTML_PAGE_BREAK)
+
+    def take(self, end=False):
+        """取出尚未输出的 HTML；第一次取出时带上文档头，end=True 时带上文档尾"""
+        parts = self._body
+        if not self._started:
+            parts.insert(0, html_head(self.title))
+            self._started = True
+        if end:
+            parts.append(_HTML_TAIL)
+        self._body = []
+        self.pending = 0
+        return ''.join(parts)
+
+    def save(self, path_or_stream, reproducible=False):
+        """写出（剩余的）HTML；输出本身是确定的，reproducible 不需要额外处理"""
+        data = self.take(end=True).encode('utf-8')
+        if hasattr(path_or_stream, 'write'):
+            path_or_stream.write(data)
+        else:
+            with open(path_or_stream, 'wb') as f:
+                f.write(data)
 
 
 # ============ 第2天：词汇基础 题库 ============
@@ -1362,1102 +2157,3753 @@ DAY10_ERROR_SUMMARY = [
 ]
 
 
-# ============ 生成第2天文档函数 ============
+# ============ 性能剖析 ============
+
+class Profiler:
+    """记录计时区间（Chrome trace 的完整事件），每个进程一个"""
+
+    def __init__(self):
+        self.events = []
+        self.document = None
+
+    def record(self, name, start_ns, end_ns, **args):
+        if self.document is not None:
+            args.setdefault('doc', self.document)
+        self.events.append({
+            'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': os.getpid(),
+            'ts': start_ns / 1000, 'dur': (end_ns - start_ns) / 1000, 'args': args,
+        })
+
+
+# 当前进程的剖析器，None 表示不记录
+_profiler = None
+
+
+def enable_profiling(enabled=True):
+    global _profiler
+    _profiler = Profiler() if enabled else None
+
+
+@contextlib.contextmanager
+def profile_span(name, **args):
+    """计时区间；未开启剖析时不做任何事"""
+    if _profiler is None:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        _profiler.record(name, start, time.perf_counter_ns(), **args)
+
+
+@contextlib.contextmanager
+def profile_document(output_path):
+    """一个文档的计时区间，其中记录的区间都标注该文档"""
+    if _profiler is None:
+        yield
+        return
+    name = os.path.basename(output_path)
+    previous, _profiler.document = _profiler.document, name
+    try:
+        with profile_span('document'):
+            yield
+    finally:
+        _profiler.document = previous
+
+
+def take_profile_events():
+    """取出并清空当前进程已记录的区间"""
+    if _profiler is None:
+        return []
+    events, _profiler.events = _profiler.events, []
+    return events
+
+
+def write_chrome_trace(path, events):
+    """写出 Chrome trace-event JSON（可在 chrome://tracing 或 Perfetto 中打开）"""
+    pids = sorted({event['pid'] for event in events})
+    main_pid = os.getpid()
+    metadata = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': pid,
+                 'args': {'name': '主进程' if pid == main_pid else f'工作进程 {pid}'}}
+                for pid in pids]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'},
+                  f, ensure_ascii=False)
+
+
+# 分项表中的列：列名 -> 区间名前缀
+_PROFILE_COLUMNS = (
+    ('创建', 'new_document'),
+    ('选题', 'build '),
+    ('排版', 'render '),
+    ('答案', 'answer_section'),
+    ('保存', 'save'),
+)
+
+
+def profile_table(events):
+    """每个文档的耗时分项（毫秒），以及最慢的排版小节"""
+    docs = {}
+    for event in events:
+        doc = event['args'].get('doc')
+        if doc is None:
+            continue
+        row = docs.setdefault(doc, {'总计': 0.0, '最慢小节': ('', 0.0)})
+        ms = event['dur'] / 1000
+        if event['name'] == 'document':
+            row['总计'] += ms
+            continue
+        for column, prefix in _PROFILE_COLUMNS:
+            if event['name'].startswith(prefix):
+                row[column] = row.get(column, 0.0) + ms
+        if event['name'].startswith('render ') and ms > row['最慢小节'][1]:
+            row['最慢小节'] = (event['name'][len('render '):], ms)
+
+    columns = ['总计'] + [column for column, _ in _PROFILE_COLUMNS]
+    # 中文列名占两个字符宽，数字列宽比列名宽度多 2
+    lines = [''.join(f'{column:>8}' for column in columns) + '  文档（最慢小节）']
+    for doc, row in sorted(docs.items(), key=lambda item: -item[1]['总计']):
+        section, ms = row['最慢小节']
+        lines.append(''.join(f'{row.get(column, 0.0):>10.1f}' for column in columns)
+                     + f'  {doc}' + (f'（{section} {ms:.1f}）' if section else ''))
+    return '\n'.join(lines)
+
+
+# ============ 内存统计 ============
+
+def _proc_status_kb(field):
+    """读取 /proc/self/status 中的内存字段（KB），不支持时返回 None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _peak_rss_kb():
+    peak = _proc_status_kb('VmHWM')
+    if peak is None and resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak
+
+
+def _reset_peak_rss():
+    """把进程的 RSS 峰值重置为当前值（Linux），使峰值只反映下一个任务"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _allocation_owner(filename):
+    """分配位置归属：python-docx、lxml、生成器本身或其他（标准库等）"""
+    path = filename.replace('\\', '/')
+    if '/docx/' in path:
+        return 'python-docx'
+    if '/lxml/' in path:
+        return 'lxml'
+    if os.path.basename(path) == os.path.basename(__file__):
+        return 'generate_exercises'
+    return 'other'
+
+
+class MemoryTracker:
+    """按任务统计内存：tracemalloc 峰值与主要分配位置，以及常驻内存（RSS）峰值
+
+    tracemalloc 只能看到 Python 层的分配（python-docx 代理对象、字符串等）；
+    lxml 元素树在 C 层分配，体现在 RSS 中。
+    """
+
+    def __init__(self, top=10):
+        self.top = top
+        self._started = not tracemalloc.is_tracing()  # 由本对象开启的跟踪在 close 时关闭
+        if self._started:
+            tracemalloc.start()
+        self._filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+                         tracemalloc.Filter(False, '<frozen importlib._bootstrap>')]
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(self._filters)
+
+    def close(self):
+        """停止统计；tracemalloc 开着会拖慢之后的所有分配"""
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def begin(self):
+        gc.collect()
+        self._rss_before = _proc_status_kb('VmRSS')
+        self._peak_reset = _reset_peak_rss()
+        tracemalloc.reset_peak()
+        self._before = self._snapshot()
+        self._held = None
+
+    def checkpoint(self):
+        """文档已构建、尚未保存时（接近峰值）记录文档持有的内存"""
+        self._held = self._snapshot()
+
+    def end(self):
+        _, peak = tracemalloc.get_traced_memory()
+        gc.collect()
+        after = self._snapshot()
+        held = (self._held or after).compare_to(self._before, 'lineno')
+        by_owner = collections.Counter()
+        for stat in held:
+            by_owner[_allocation_owner(stat.traceback[0].filename)] += stat.size_diff
+        top = [{'site': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+                'size_kb': round(stat.size_diff / 1024, 1), 'count': stat.count_diff}
+               for stat in sorted(held, key=lambda stat: -stat.size_diff)[:self.top]
+               if stat.size_diff > 0]
+        retained = sum(stat.size_diff for stat in after.compare_to(self._before, 'filename'))
+        self._held = None
+        return {
+            'pid': os.getpid(),
+            'traced_peak_kb': round(peak / 1024, 1),
+            'held_kb': round(sum(by_owner.values()) / 1024, 1),
+            'retained_kb': round(retained / 1024, 1),
+            'held_by_owner_kb': {owner: round(size / 1024, 1) for owner, size in by_owner.items()},
+            'top_sites': top,
+            'rss_before_kb': self._rss_before,
+            'rss_after_kb': _proc_status_kb('VmRSS'),
+            # 无法重置峰值时为进程启动以来的峰值
+            'peak_rss_kb': _peak_rss_kb(),
+            'peak_rss_per_job': self._peak_reset,
+        }
+
+
+# 当前进程的内存统计，None 表示不统计
+_memory = None
+
+
+def enable_memory_tracking(enabled=True):
+    global _memory
+    if _memory is not None:
+        _memory.close()
+    _memory = MemoryTracker() if enabled else None
+
+
+def memory_checkpoint():
+    if _memory is not None:
+        _memory.checkpoint()
+
+
+def write_memory_report(path, jobs):
+    """写出内存报告 JSON：jobs 为 [(文档名列表, 统计)]"""
+    report = {
+        'python': sys.version.split()[0],
+        'python-docx': docx.__version__,
+        'max_peak_rss_kb': max((memory['peak_rss_kb'] or 0 for _, memory in jobs), default=0),
+        'jobs': [dict(memory, documents=documents) for documents, memory in jobs],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    return report
+
+
+# ============ 声明式题目规格与渲染引擎 ============
+#
+# 每一天的文档用一份规格描述。build_paper 按规格完成选题、编号和文字
+# 格式化，产生中间表示（IR）；render_paper 把 IR 交给任意文档后端输出。
+# 规格中的块（block）：
+#   {'section': 标题}                               分节标题
+#   {'number', 'header', 'key', 'bank', 'counts',   按题库逐题输出（默认类型）
+#    'item', 'answer', 'blanks', 'gradable',
+#    'intro', 'outro', 'answers'}
+#   {'kind': 'groups', ..., 'group'}               分组题，题号跨组连续
+#   {'kind': 'passages', ..., 'banks'}             短文 + 题目，题号跨篇连续
+#   {'kind': 'static', ..., 'paragraphs'}          固定内容
+#   {'kind': 'custom', ..., 'render'}              自定义生成函数
+# counts 为（简洁版, 完整版, 充实版）的题量，None 表示全部；item 为每题的
+# 段落模板，用 {0}、{1}… 引用题库字段，{i} 为题号；answer 为答案模板；
+# answers 为固定答案列表；blanks 为每个作答位置的标准答案模板（也可以是
+# (题目, 题号) -> 答案列表 的函数），自动批改只按 blanks 判分，没有 blanks
+# 的题目不批改；有作答位置但不适合自动批改的块（开放题、整行归纳）标记
+# 'gradable': False。题库以名称引用，生成时从模块中读取。
+# 传入随机数生成器时（学生变体），题目从题库中随机抽取并打乱顺序；
+# 'ordered' 为真的块保持原顺序，'options' 为（选项字段, 答案字段），
+# 选项同时打乱并同步答案字母。
+#
+# IR 是事件列表，只含字符串、整数、None 和列表，可以直接序列化：
+#   ('paper', 天数, 版本)
+#   ('title', 标题, 副标题)
+#   ('section', 标题)
+#   ('header', 题号, 题目说明)
+#   ('item', 题目ID, 小题号, 段落列表)      题目ID 为 '题库名:位置'，与抽题顺序无关
+#   ('text', 段落列表)                     说明、词库、短文等非题目内容
+#   ('answers', 答案标题, [(题目ID, 答案, 标准答案列表), ...])  不批改的题目标准答案为 None
+# 段落为 [文本, 是否缩进]，空段落为 None；答案统一输出在文末的参考答案中。
+
+
+class Plain(str):
+    """不缩进的段落"""
+
+
+# 空段落
+BLANK = None
+
+
+def _bank(name):
+    """按名称读取题库（可能已被快照等替换）"""
+    return globals()[name]
+
+
+def _tier(version):
+    """版本在 VERSIONS 中的序号，未知版本按充实版处理"""
+    return VERSIONS.index(version) if version in VERSIONS else len(VERSIONS) - 1
+
+
+def _paragraphs(entries):
+    """段落列表转为 IR 段落：str 缩进，Plain 不缩进，BLANK 为空段落"""
+    return [None if entry is BLANK else [str(entry), not isinstance(entry, Plain)]
+            for entry in entries]
+
+
+def _text(events, entries):
+    if entries:
+        events.append(('text', _paragraphs(entries)))
+
+
+def _format_item(templates, item, i):
+    """按模板生成一道题的 IR 段落"""
+    entries = []
+    for template in templates:
+        if callable(template):
+            entries.extend(template(item, i))
+        elif template is BLANK:
+            entries.append(BLANK)
+        else:
+            text = template.format(*item, i=i)
+            entries.append(Plain(text) if isinstance(template, Plain) else text)
+    return _paragraphs(entries)
+
+
+def _answer(template, item, i):
+    return template(item, i) if callable(template) else template.format(*item, i=i)
+
+
+def _block_gradable(block):
+    return 'blanks' in block and block.get('gradable', True)
+
+
+def _answer_entry(block, item_id, item, i):
+    """答案事件的一项：(题目ID, 参考答案, 每空的标准答案)，不批改的题目标准答案为 None"""
+    keys = None
+    if _block_gradable(block):
+        blanks = block['blanks']
+        keys = blanks(item, i) if callable(blanks) else [_answer(blank, item, i) for blank in blanks]
+    return item_id, _answer(block['answer'], item, i), keys
+
+
+def _entries(value, items, rng):
+    """intro/outro 既可以是段落列表，也可以是 (items, rng) -> 段落列表 的函数"""
+    if value is None:
+        return []
+    return value(items, rng) if callable(value) else value
+
+
+# 选择题选项：'A. go  B. goes  C. went  D. will go'
+_OPTION = re.compile(r'([A-H])\. (.*?)(?=\s{2,}[A-H]\. |$)')
+
+
+def shuffle_options(item, options_field, answer_field, rng):
+    """打乱选择题的选项顺序，并同步答案字母；无法识别的选项原样返回"""
+    options = _OPTION.findall(item[options_field])
+    letters = ''.join(letter for letter, _ in options)
+    if len(options) < 2 or letters != 'ABCDEFGH'[:len(options)] or item[answer_field] not in letters:
+        return item
+    order = list(range(len(options)))
+    rng.shuffle(order)
+    item = list(item)
+    item[options_field] = '  '.join(f'{letters[new]}. {options[old][1]}'
+                                    for new, old in enumerate(order))
+    item[answer_field] = letters[order.index(letters.index(item[answer_field]))]
+    return tuple(item)
 
-def generate_day2_doc(version, output_path):
-    """生成第2天词汇基础练习题"""
-    doc = Document()
 
-    # 根据版本确定题目数量
-    if version == '简洁版':
-        trans_count, fill_count, dist_count, comp_count = 4, 4, 2, 3
-    elif version == '完整版':
-        trans_count, fill_count, dist_count, comp_count = 8, 8, 4, 6
-    else:  # 充实版
-        trans_count, fill_count, dist_count, comp_count = 15, 15, 5, 10
+def _select(block, items, count, rng):
+    """取一个块的题目，返回 [(题库中的位置, 题目)]
 
-    add_title(doc, '小学六年级英语练习题【词汇基础】', f'（基础+提升）第2天 - {version}')
-    add_section_title(doc, '短语与固定搭配专项练习')
+    默认取前 count 道，有 rng 时随机抽取并打乱顺序。
+    """
+    if rng is None or block.get('ordered'):
+        return list(enumerate(items if count is None else items[:count]))
+    count = len(items) if count is None else min(count, len(items))
+    return [(index, items[index]) for index in rng.sample(range(len(items)), count)]
 
-    answers = {}
 
-    # 一、短语汉译英
-    add_question_header(doc, '一', '短语汉译英（根据中文写出英文短语）')
-    ans_list = []
-    for i, (cn, en) in enumerate(DAY2_PHRASES_TRANSLATE[:trans_count], 1):
-        add_question(doc, f'{i}. {cn} _______________________')
-        ans_list.append(f'{i}. {en}')
-    answers['一、短语汉译英'] = ans_list
+def _shuffle_item_options(block, picked, rng):
+    if rng is None or 'options' not in block:
+        return picked
+    return [(position, shuffle_options(item, *block['options'], rng))
+            for position, item in picked]
 
-    # 二、选词填空
-    add_question_header(doc, '二', '选词填空（从词库中选择正确短语填入句子）')
-    word_bank = ['look for', 'look after', 'get up', 'put on', 'turn off',
-                 'at night', 'in the morning', 'look at', 'wake up', 'turn on',
-                 'take off', 'on time', 'in time', 'go to bed', 'on the weekend']
-    add_question(doc, f'词库：{", ".join(word_bank[:min(fill_count+2, len(word_bank))])}')
-    doc.add_paragraph()
-    ans_list = []
-    for i, (sent, ans, _) in enumerate(DAY2_FILL_BLANKS[:fill_count], 1):
-        add_question(doc, f'{i}. {sent}')
-        ans_list.append(f'{i}. {ans}')
-    answers['二、选词填空'] = ans_list
-
-    # 三、短语辨析
-    add_question_header(doc, '三', '短语辨析（选择正确的短语填空）')
-    ans_list = []
+
+def _block_items(block, tier, rng):
+    counts = block.get('counts')
+    picked = _select(block, _bank(block['bank']), None if counts is None else counts[tier], rng)
+    return _shuffle_item_options(block, picked, rng)
+
+
+def _build_items(block, tier, rng, events):
+    picked = _block_items(block, tier, rng)
+    items = [item for _, item in picked]
+    _text(events, _entries(block.get('intro'), items, rng))
+    templates = block['item']
+    answers = []
+    for i, (position, item) in enumerate(picked, 1):
+        item_id = f'{block["bank"]}:{position}'
+        events.append(('item', item_id, i, _format_item(templates, item, i)))
+        if 'answer' in block:
+            answers.append(_answer_entry(block, item_id, item, i))
+    _text(events, _entries(block.get('outro'), items, rng))
+    return answers
+
+
+def _build_groups(block, tier, rng, events):
+    templates = block['item']
+    answers = []
     q_num = 1
-    for phrase_group, questions in DAY2_DISTINGUISH[:dist_count]:
-        add_question(doc, f'【{phrase_group}】', indent=False)
-        for sent, ans in questions:
-            add_question(doc, f'{q_num}. {sent}')
-            ans_list.append(f'{q_num}. {ans}')
+    for group_position, (group, questions) in _block_items(block, tier, rng):
+        _text(events, [Plain(block['group'].format(group))])
+        questions = list(enumerate(questions))
+        if rng is not None:
+            questions = rng.sample(questions, len(questions))
+        for position, question in questions:
+            item_id = f'{block["bank"]}:{group_position}.{position}'
+            events.append(('item', item_id, q_num, _format_item(templates, question, q_num)))
+            answers.append(_answer_entry(block, item_id, question, q_num))
             q_num += 1
-    answers['三、短语辨析'] = ans_list
+    return answers
 
-    # 四、完成句子
-    add_question_header(doc, '四', '完成句子（根据中文提示完成英文句子）')
-    ans_list = []
-    for i, (cn, en, ans) in enumerate(DAY2_COMPLETE[:comp_count], 1):
-        add_question(doc, f'{i}. {cn}')
-        add_question(doc, f'   {en}')
-        ans_list.append(f'{i}. {ans}')
-    answers['四、完成句子'] = ans_list
 
-    add_answer_section(doc, answers)
-    doc.save(output_path)
-    print(f'已生成: {output_path}')
+def _build_passages(block, tier, rng, events):
+    # 短文内的题目顺序与原文对应，只打乱篇目和选项
+    counts = block.get('counts')
+    names = block['banks']
+    passages = _select(block, [_bank(name) for name in names],
+                       None if counts is None else counts[tier], rng)
+    templates = block['item']
+    answers = []
+    q_num = 1
+    for passage_position, passage in passages:
+        _text(events, [Plain(f'【{passage["title"]}】'),
+                       *[line for line in passage['passage'].split('\n') if line.strip()],
+                       BLANK])
+        questions = _shuffle_item_options(block, list(enumerate(passage['questions'])), rng)
+        for position, question in questions:
+            item_id = f'{names[passage_position]}:{position}'
+            events.append(('item', item_id, q_num, _format_item(templates, question, q_num)))
+            answers.append(_answer_entry(block, item_id, question, q_num))
+            q_num += 1
+        if block.get('trailing_blank'):
+            _text(events, [BLANK])
+    return answers
 
 
-# ============ 生成第3天文档函数 ============
+def _build_static(block, tier, rng, events):
+    _text(events, block['paragraphs'])
+    return []
 
-def generate_day3_doc(version, output_path):
-    """生成第3天句型基础练习题"""
-    doc = Document()
 
-    # 根据版本确定题目数量
-    if version == '简洁版':
-        judge_count, quest_count, neg_count, fill_count, trans_count = 4, 4, 4, 4, 4
-    elif version == '完整版':
-        judge_count, quest_count, neg_count, fill_count, trans_count = 8, 8, 8, 8, 8
-    else:  # 充实版
-        judge_count, quest_count, neg_count, fill_count, trans_count = 15, 15, 15, 15, 15
+def _build_custom(block, tier, rng, events):
+    return block['render'](block, tier, rng, events)
 
-    add_title(doc, '小学六年级英语练习题【句型基础】', f'（基础+提升）第3天 - {version}')
-    add_section_title(doc, '陈述句、一般疑问句与否定句专项练习')
 
-    answers = {}
+_BLOCK_BUILDERS = {
+    'items': _build_items,
+    'groups': _build_groups,
+    'passages': _build_passages,
+    'static': _build_static,
+    'custom': _build_custom,
+}
 
-    # 一、句型判断
-    add_question_header(doc, '一', '句型判断（判断下列句子是"主系表"还是"主谓宾"结构）')
-    ans_list = []
-    for i, (sent, ans, reason) in enumerate(DAY3_SENTENCE_JUDGE[:judge_count], 1):
-        add_question(doc, f'{i}. {sent}  （        ）')
-        ans_list.append(f'{i}. {ans}（{reason}）')
-    answers['一、句型判断'] = ans_list
-
-    # 二、陈述句转一般疑问句
-    add_question_header(doc, '二', '陈述句转一般疑问句')
-    ans_list = []
-    for i, (sent, ans, rule) in enumerate(DAY3_TO_QUESTION[:quest_count], 1):
-        add_question(doc, f'{i}. {sent}')
-        add_question(doc, '   _______________________________________')
-        ans_list.append(f'{i}. {ans}（{rule}）')
-    answers['二、陈述句转一般疑问句'] = ans_list
-
-    # 三、陈述句转否定句
-    add_question_header(doc, '三', '陈述句转否定句')
-    ans_list = []
-    for i, (sent, ans, rule) in enumerate(DAY3_TO_NEGATIVE[:neg_count], 1):
-        add_question(doc, f'{i}. {sent}')
-        add_question(doc, '   _______________________________________')
-        ans_list.append(f'{i}. {ans}（{rule}）')
-    answers['三、陈述句转否定句'] = ans_list
-
-    # 四、be动词与do/does选择填空
-    add_question_header(doc, '四', 'be动词与do/does选择填空')
-    ans_list = []
-    for i, (sent, ans, rule) in enumerate(DAY3_BE_DO_FILL[:fill_count], 1):
-        add_question(doc, f'{i}. {sent}')
-        ans_list.append(f'{i}. {ans}（{rule}）')
-    answers['四、be动词与do/does选择填空'] = ans_list
-
-    # 五、句型转换综合练习
-    add_question_header(doc, '五', '句型转换综合练习（按要求改写句子）')
-    ans_list = []
-    for i, (sent, req, ans) in enumerate(DAY3_TRANSFORM[:trans_count], 1):
-        add_question(doc, f'{i}. {sent}（改为{req}）')
-        add_question(doc, '   _______________________________________')
-        ans_list.append(f'{i}. {ans}')
-    answers['五、句型转换综合练习'] = ans_list
 
-    add_answer_section(doc, answers)
-    doc.save(output_path)
+def _paper_head(spec, version):
+    return [('paper', spec['day'], version),
+            ('title', spec['title'], f'（基础+提升）第{spec["day"]}天 - {version}')]
+
+
+def _build_block(block, tier, rng=None):
+    """一个块的 IR 事件：[大题标题] + 题目 + 答案事件"""
+    if 'section' in block:
+        return [('section', block['section'])]
+    events = []
+    if 'header' in block:
+        events.append(('header', block['number'], block['header']))
+    with profile_span(f'build {block["number"]}、{block["key"]}'):
+        answers = _BLOCK_BUILDERS[block.get('kind', 'items')](block, tier, rng, events)
+    if 'answers' in block:
+        answers = [(None, text, None) for text in block['answers']]
+    events.append(('answers', f'{block["number"]}、{block["key"]}', answers))
+    return events
+
+
+def build_paper(spec, version, rng=None):
+    """按规格完成选题和格式化，返回 IR 事件列表；rng 为 random.Random 时生成随机变体"""
+    events = _paper_head(spec, version)
+    tier = _tier(version)
+    for block in spec['blocks']:
+        events.extend(_build_block(block, tier, rng))
+    return events
+
+
+def _block_prefix(block, events, tier):
+    """从充实版的块事件截取小版本的块事件，不能截取时返回 None
+
+    不打乱时小版本的题目是充实版的前缀：普通题取前若干道，分组题和短文题
+    取前若干组/篇（每组/篇的事件数由题库决定）；题号从 1 起连续，前缀的
+    题号不变。intro/outro 为函数或自定义块时需要重新生成。
+    """
+    kind = block.get('kind', 'items')
+    counts = block.get('counts')
+    if 'section' in block or kind == 'static' or counts is None:
+        return events
+    if kind == 'custom' or callable(block.get('intro')) or callable(block.get('outro')):
+        return None
+    head = 1 if 'header' in block else 0
+    body, answers = events[head:-1], events[-1][2]
+    if kind == 'items':
+        intro = 1 if block.get('intro') else 0
+        outro = 1 if block.get('outro') else 0
+        kept = len(_bank(block['bank'])[:counts[tier]])
+        items = body[intro:len(body) - outro]
+        body = body[:intro] + items[:kept] + body[len(body) - outro:]
+    else:
+        if kind == 'groups':
+            sizes = [len(questions) for _, questions in _bank(block['bank'])[:counts[tier]]]
+            extra = 1
+        else:
+            sizes = [len(_bank(name)['questions']) for name in block['banks'][:counts[tier]]]
+            extra = 2 if block.get('trailing_blank') else 1
+        body = body[:sum(sizes) + extra * len(sizes)]
+        kept = sum(sizes)
+    if 'answers' not in block:
+        answers = answers[:kept]
+    return events[:head] + body + [(*events[-1][:2], answers)]
+
+
+def build_tiers(spec):
+    """一次选题得到全部版本的 IR：版本 -> 事件列表
+
+    每个块只按充实版生成一次，简洁版/完整版截取其前缀（_block_prefix）；
+    各版本共用同一批事件对象，渲染时可以复用已渲染的段落。
+    """
+    tiers = {version: _paper_head(spec, version) for version in VERSIONS}
+    largest = len(VERSIONS) - 1
+    for block in spec['blocks']:
+        events = _build_block(block, largest)
+        tiers[VERSIONS[largest]].extend(events)
+        for tier, version in enumerate(VERSIONS[:largest]):
+            prefix = _block_prefix(block, events, tier)
+            tiers[version].extend(_build_block(block, tier) if prefix is None else prefix)
+    return tiers
+
+
+def _add_paragraphs(doc, paragraphs):
+    for paragraph in paragraphs:
+        if paragraph is None:
+            doc.add_paragraph()
+        else:
+            add_question(doc, paragraph[0], indent=paragraph[1])
+
+
+def _render_event(doc, event, answers):
+    """输出一个 IR 事件；答案事件只收集到 answers，最后统一输出"""
+    kind = event[0]
+    if kind == 'title':
+        add_title(doc, event[1], event[2])
+    elif kind == 'section':
+        add_section_title(doc, event[1])
+    elif kind == 'header':
+        add_question_header(doc, event[1], event[2])
+    elif kind in ('item', 'text'):
+        _add_paragraphs(doc, event[-1])
+    elif kind == 'answers':
+        answers[event[1]] = [entry[1] for entry in event[2]]
+
+
+def render_steps(events, doc):
+    """把 IR 事件逐个输出到文档的生成器，每输出一个事件 yield 一次，参考答案放在文末"""
+    answers = {}
+    mark = None  # 剖析时当前小节的 (名称, 开始时间)
+    for event in events:
+        kind = event[0]
+        if _profiler is not None and kind in ('title', 'section', 'header'):
+            now = time.perf_counter_ns()
+            if mark is not None:
+                _profiler.record(f'render {mark[0]}', mark[1], now)
+            label = {'title': '标题', 'section': event[1]}.get(
+                kind, f'{event[1]}、{event[-1].split("（")[0]}')
+            mark = (label, now)
+        _render_event(doc, event, answers)
+        yield
+    if mark is not None:
+        _profiler.record(f'render {mark[0]}', mark[1], time.perf_counter_ns())
+    with profile_span('answer_section'):
+        add_answer_section(doc, answers)
+    yield
+
+
+def render_paper(events, doc):
+    """把 IR 事件列表输出到文档（各后端通用），参考答案放在文末"""
+    for _ in render_steps(events, doc):
+        pass
+
+
+def iter_html(events, chunk_size=HTML_CHUNK_SIZE):
+    """把 IR 事件流式渲染为 HTML 的生成器，依次产出字符串块
+
+    标题输出后立即产出第一块，浏览器可以先显示首屏；之后每攒够 chunk_size
+    个字符产出一块，最后一块含参考答案和文档尾。
+    """
+    doc = HtmlDocument()
+    first = True
+    for _ in render_steps(events, doc):
+        if (first and doc.pending) or doc.pending >= chunk_size:
+            yield doc.take()
+            first = False
+    yield doc.take(end=True)
+
+
+def iter_paper_html(spec, version, rng=None, chunk_size=HTML_CHUNK_SIZE):
+    """按规格流式生成一份 HTML 试卷（题库编辑器预览用）"""
+    return iter_html(build_paper(spec, version, rng), chunk_size)
+
+
+def render_spec(spec, version, doc, rng=None):
+    """按规格渲染一天的练习题（含参考答案）"""
+    render_paper(build_paper(spec, version, rng), doc)
+
+
+def generate_from_spec(spec, version, output_path, backend='docx', reproducible=False):
+    """按规格生成一份文档"""
+    with profile_document(output_path):
+        with profile_span('new_document'):
+            doc = new_document(backend=backend, output_path=output_path)
+        events = build_paper(spec, version)
+        render_paper(events, doc)
+        memory_checkpoint()
+        with profile_span('save'):
+            save_document(doc, output_path, reproducible)
     print(f'已生成: {output_path}')
 
 
-# ============ 生成第4天文档函数 ============
+def ir_format(path):
+    """按扩展名判断 IR 文件格式"""
+    return 'msgpack' if path.endswith(('.msgpack', '.mpk')) else 'json'
 
-def generate_day4_doc(version, output_path):
-    """生成第4天特殊疑问句+情景交际练习题"""
-    doc = Document()
-
-    # 根据版本确定题目数量
-    if version == '简洁版':
-        wh_fill, wh_match, wh_order = 4, 4, 4
-        shop, way, greet = 2, 2, 2
-        make_sent, dialogue_count = 4, 2
-    elif version == '完整版':
-        wh_fill, wh_match, wh_order = 8, 8, 8
-        shop, way, greet = 4, 4, 4
-        make_sent, dialogue_count = 6, 3
-    else:  # 充实版
-        wh_fill, wh_match, wh_order = 15, 12, 15
-        shop, way, greet = 8, 8, 10
-        make_sent, dialogue_count = 12, 5
-
-    add_title(doc, '小学六年级英语练习题【特殊疑问句+情景交际】', f'（基础+提升）第4天 - {version}')
 
-    answers = {}
+def dumps_paper(events, fmt='json'):
+    """把 IR 序列化为字节串（json 或 msgpack）"""
+    if fmt == 'json':
+        return json.dumps(events, ensure_ascii=False).encode('utf-8')
+    if fmt == 'msgpack':
+        if msgpack is None:
+            raise ValueError('msgpack 格式需要安装 msgpack')
+        return msgpack.packb(events, use_bin_type=True)
+    raise ValueError(f'未知的 IR 格式: {fmt}')
 
-    # ========== 第一部分：特殊疑问词 ==========
-    add_section_title(doc, '第一部分：特殊疑问词（20分钟）')
 
-    # 一、疑问词选择填空
-    add_question_header(doc, '一', '疑问词选择填空（从 what/when/where/who/why/how 中选择）')
-    ans_list = []
-    for i, (sent, ans, rule) in enumerate(DAY4_WH_FILL[:wh_fill], 1):
-        add_question(doc, f'{i}. {sent}')
-        ans_list.append(f'{i}. {ans}（{rule}）')
-    answers['一、疑问词选择填空'] = ans_list
+def loads_paper(data, fmt='json'):
+    """从字节串读取 IR"""
+    if fmt == 'json':
+        return json.loads(data)
+    if fmt == 'msgpack':
+        if msgpack is None:
+            raise ValueError('msgpack 格式需要安装 msgpack')
+        return msgpack.unpackb(data, raw=False)
+    raise ValueError(f'未知的 IR 格式: {fmt}')
 
-    # 二、疑问词意义匹配
-    add_question_header(doc, '二', '疑问词意义匹配（将疑问词与其含义连线或填写）')
-    add_question(doc, '请将左边的疑问词与右边的含义进行匹配：', indent=False)
-    doc.add_paragraph()
-    ans_list = []
-    match_items = DAY4_WH_MATCH[:wh_match]
-    for i, (word, meaning, usage) in enumerate(match_items, 1):
-        add_question(doc, f'{i}. {word}        ______')
-        ans_list.append(f'{i}. {word} — {meaning}（{usage}）')
-    doc.add_paragraph()
-    add_question(doc, '备选含义：', indent=False)
-    meanings = [item[1] for item in match_items]
-    import random
-    shuffled = meanings.copy()
-    random.seed(42)  # 固定随机种子保证一致性
-    random.shuffle(shuffled)
-    add_question(doc, f'A. {shuffled[0]}  B. {shuffled[1]}  C. {shuffled[2]}  D. {shuffled[3]}' if len(shuffled) >= 4 else ', '.join(shuffled))
-    if len(shuffled) > 4:
-        add_question(doc, f'E. {shuffled[4]}  F. {shuffled[5]}' + (f'  G. {shuffled[6]}  H. {shuffled[7]}' if len(shuffled) >= 8 else ''))
-    answers['二、疑问词意义匹配'] = ans_list
-
-    # 三、特殊疑问句语序判断
-    add_question_header(doc, '三', '特殊疑问句语序判断（判断下列句子语序是否正确，错误的请改正）')
-    ans_list = []
-    for i, (sent, ans, rule) in enumerate(DAY4_WH_ORDER[:wh_order], 1):
-        add_question(doc, f'{i}. {sent}  （    ）')
-        ans_list.append(f'{i}. {ans}（{rule}）')
-    answers['三、特殊疑问句语序判断'] = ans_list
-
-    # ========== 第二部分：情景交际 ==========
-    add_section_title(doc, '第二部分：情景交际（15分钟）')
-
-    # 四、购物场景应答
-    add_question_header(doc, '四', '购物场景应答（根据对话情景，选择或填写合适的应答）')
-    ans_list = []
-    for i, (dialogue, ans, tip) in enumerate(DAY4_SHOPPING[:shop], 1):
-        add_question(doc, f'{i}. {dialogue}')
-        ans_list.append(f'{i}. {ans}（{tip}）')
-    answers['四、购物场景应答'] = ans_list
-
-    # 五、问路场景应答
-    add_question_header(doc, '五', '问路场景应答（根据对话情景，选择或填写合适的应答）')
-    ans_list = []
-    for i, (dialogue, ans, tip) in enumerate(DAY4_ASKING_WAY[:way], 1):
-        add_question(doc, f'{i}. {dialogue}')
-        ans_list.append(f'{i}. {ans}（{tip}）')
-    answers['五、问路场景应答'] = ans_list
-
-    # 六、问候场景应答
-    add_question_header(doc, '六', '问候场景应答（根据对话情景，选择或填写合适的应答）')
-    ans_list = []
-    for i, (dialogue, ans, tip) in enumerate(DAY4_GREETING[:greet], 1):
-        add_question(doc, f'{i}. {dialogue}')
-        ans_list.append(f'{i}. {ans}（{tip}）')
-    answers['六、问候场景应答'] = ans_list
-
-    # ========== 第三部分：综合练习 ==========
-    add_section_title(doc, '第三部分：综合练习（15分钟）')
-
-    # 七、连词成句
-    add_question_header(doc, '七', '连词成句（将打乱的单词组成正确的特殊疑问句）')
-    ans_list = []
-    for i, (words, ans, tip) in enumerate(DAY4_MAKE_SENTENCE[:make_sent], 1):
-        add_question(doc, f'{i}. {words}')
-        add_question(doc, '   _______________________________________')
-        ans_list.append(f'{i}. {ans}（{tip}）')
-    answers['七、连词成句'] = ans_list
-
-    # 八、补全对话
-    add_question_header(doc, '八', '补全对话（根据上下文，在横线处填入合适的句子）')
-    ans_list = []
-    for i, (scene, dlg_text, ans_items) in enumerate(DAY4_DIALOGUE_COMPLETE[:dialogue_count], 1):
-        add_question(doc, f'【{scene}】', indent=False)
-        for line in dlg_text.split('\n'):
-            add_question(doc, line)
-        doc.add_paragraph()
-        ans_list.append(f'{i}. {scene}：' + ' / '.join([f'({j+1}) {a}' for j, a in enumerate(ans_items)]))
-    answers['八、补全对话'] = ans_list
 
-    add_answer_section(doc, answers)
-    doc.save(output_path)
-    print(f'已生成: {output_path}')
+def spec_banks(spec):
+    """规格读取的题库名称"""
+    names = set()
+    for block in spec['blocks']:
+        if 'bank' in block:
+            names.add(block['bank'])
+        names.update(block.get('banks', ()))
+    return sorted(names)
 
 
-# ============ 生成第5天文档函数 ============
+def _fingerprint(value):
+    """规格的稳定文本表示（函数取源码），用于构建清单"""
+    if callable(value):
+        return inspect.getsource(value)
+    if isinstance(value, dict):
+        return '{' + ','.join(f'{k!r}:{_fingerprint(v)}' for k, v in value.items()) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(_fingerprint(v) for v in value) + ']'
+    if isinstance(value, Plain):
+        return f'Plain({str(value)!r})'
+    return repr(value)
 
-def generate_day5_doc(version, output_path):
-    """生成第5天语法专项（一般现在时）练习题"""
-    doc = Document()
-
-    # 根据版本确定题目数量
-    if version == '简洁版':
-        verb_change, tense_judge, verb_choose = 5, 4, 4
-        rule_count, time_words, irregular = 2, 4, 3
-        fill_blank, correct_error, complete_sent = 4, 4, 4
-    elif version == '完整版':
-        verb_change, tense_judge, verb_choose = 10, 8, 8
-        rule_count, time_words, irregular = 3, 8, 6
-        fill_blank, correct_error, complete_sent = 8, 8, 8
-    else:  # 充实版
-        verb_change, tense_judge, verb_choose = 20, 15, 15
-        rule_count, time_words, irregular = 5, 12, 10
-        fill_blank, correct_error, complete_sent = 15, 15, 15
-
-    add_title(doc, '小学六年级英语练习题【语法专项：一般现在时】', f'（基础+提升）第5天 - {version}')
 
-    answers = {}
+# 常用段落模板
+_ANSWER_LINE = '   _______________________________________'
+_ERROR_LINE = '   错误：_______ → 改正：_______'
+_WRITING_LINE = '_' * 50
 
-    # ========== 第一部分：语法精讲 ==========
-    add_section_title(doc, '第一部分：语法精讲（20分钟）')
-
-    # 一、动词变形练习
-    add_question_header(doc, '一', '动词变形练习（写出下列动词的第三人称单数形式）')
-    ans_list = []
-    for i, (verb, third, rule) in enumerate(DAY5_VERB_CHANGE[:verb_change], 1):
-        add_question(doc, f'{i}. {verb} → _______')
-        ans_list.append(f'{i}. {third}（{rule}）')
-    answers['一、动词变形练习'] = ans_list
-
-    # 二、时态判断
-    add_question_header(doc, '二', '时态判断（判断下列句子是否为一般现在时，是写"是"，否写"否"）')
-    ans_list = []
-    for i, (sent, ans, reason) in enumerate(DAY5_TENSE_JUDGE[:tense_judge], 1):
-        add_question(doc, f'{i}. {sent}  （    ）')
-        ans_list.append(f'{i}. {ans}（{reason}）')
-    answers['二、时态判断'] = ans_list
-
-    # 三、动词形式选择
-    add_question_header(doc, '三', '动词形式选择（从括号中选择正确的动词形式）')
-    ans_list = []
-    for i, (sent, ans, reason) in enumerate(DAY5_VERB_CHOOSE[:verb_choose], 1):
-        add_question(doc, f'{i}. {sent}')
-        ans_list.append(f'{i}. {ans}（{reason}）')
-    answers['三、动词形式选择'] = ans_list
-
-    # 四、变形规则分类
-    add_question_header(doc, '四', '变形规则分类（将下列动词按变形规则分类）')
-    add_question(doc, '请将动词填入对应的规则类别中：', indent=False)
-    doc.add_paragraph()
-    # 收集所有动词用于展示
+
+# ============ 第2天规格 ============
+
+def _day2_word_bank(items, rng):
+    word_bank = ['look for', 'look after', 'get up', 'put on', 'turn off',
+                 'at night', 'in the morning', 'look at', 'wake up', 'turn on',
+                 'take off', 'on time', 'in time', 'go to bed', 'on the weekend']
+    return [f'词库：{", ".join(word_bank[:min(len(items) + 2, len(word_bank))])}', BLANK]
+
+
+DAY2_SPEC = {
+    'day': 2,
+    'title': '小学六年级英语练习题【词汇基础】',
+    'blocks': [
+        {'section': '短语与固定搭配专项练习'},
+        {'number': '一', 'header': '短语汉译英（根据中文写出英文短语）', 'key': '短语汉译英',
+         'bank': 'DAY2_PHRASES_TRANSLATE', 'counts': (4, 8, 15),
+         'item': ['{i}. {0} _______________________'], 'answer': '{i}. {1}', 'blanks': ['{1}']},
+        {'number': '二', 'header': '选词填空（从词库中选择正确短语填入句子）', 'key': '选词填空',
+         'bank': 'DAY2_FILL_BLANKS', 'counts': (4, 8, 15), 'intro': _day2_word_bank,
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}', 'blanks': ['{1}']},
+        {'kind': 'groups', 'number': '三', 'header': '短语辨析（选择正确的短语填空）',
+         'key': '短语辨析', 'bank': 'DAY2_DISTINGUISH', 'counts': (2, 4, 5),
+         'group': '【{}】', 'item': ['{i}. {0}'], 'answer': '{i}. {1}', 'blanks': ['{1}']},
+        {'number': '四', 'header': '完成句子（根据中文提示完成英文句子）', 'key': '完成句子',
+         'bank': 'DAY2_COMPLETE', 'counts': (3, 6, 10),
+         'item': ['{i}. {0}', '   {1}'], 'answer': '{i}. {2}', 'blanks': ['{2}']},
+    ],
+}
+
+
+# ============ 第3天规格 ============
+
+DAY3_SPEC = {
+    'day': 3,
+    'title': '小学六年级英语练习题【句型基础】',
+    'blocks': [
+        {'section': '陈述句、一般疑问句与否定句专项练习'},
+        {'number': '一', 'header': '句型判断（判断下列句子是"主系表"还是"主谓宾"结构）',
+         'key': '句型判断', 'bank': 'DAY3_SENTENCE_JUDGE', 'counts': (4, 8, 15),
+         'item': ['{i}. {0}  （        ）'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '二', 'header': '陈述句转一般疑问句', 'key': '陈述句转一般疑问句',
+         'bank': 'DAY3_TO_QUESTION', 'counts': (4, 8, 15),
+         'item': ['{i}. {0}', _ANSWER_LINE], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '三', 'header': '陈述句转否定句', 'key': '陈述句转否定句',
+         'bank': 'DAY3_TO_NEGATIVE', 'counts': (4, 8, 15),
+         'item': ['{i}. {0}', _ANSWER_LINE], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '四', 'header': 'be动词与do/does选择填空', 'key': 'be动词与do/does选择填空',
+         'bank': 'DAY3_BE_DO_FILL', 'counts': (4, 8, 15),
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '五', 'header': '句型转换综合练习（按要求改写句子）', 'key': '句型转换综合练习',
+         'bank': 'DAY3_TRANSFORM', 'counts': (4, 8, 15),
+         'item': ['{i}. {0}（改为{1}）', _ANSWER_LINE], 'answer': '{i}. {2}', 'blanks': ['{2}']},
+    ],
+}
+
+
+# ============ 第4天规格 ============
+
+def _day4_meaning_options(items, rng):
+    meanings = [item[1] for item in items]
+    (rng or random.Random(42)).shuffle(meanings)  # 固定随机种子保证一致性
+    entries = [BLANK, Plain('备选含义：')]
+    if len(meanings) >= 4:
+        entries.append(f'A. {meanings[0]}  B. {meanings[1]}  C. {meanings[2]}  D. {meanings[3]}')
+    else:
+        entries.append(', '.join(meanings))
+    if len(meanings) > 4:
+        entries.append(f'E. {meanings[4]}  F. {meanings[5]}'
+                       + (f'  G. {meanings[6]}  H. {meanings[7]}' if len(meanings) >= 8 else ''))
+    return entries
+
+
+def _day4_dialogue(item, i):
+    scene, dialogue, _ = item
+    return [Plain(f'【{scene}】'), *dialogue.split('\n'), BLANK]
+
+
+def _day4_dialogue_answer(item, i):
+    scene, _, ans_items = item
+    return f'{i}. {scene}：' + ' / '.join([f'({j+1}) {a}' for j, a in enumerate(ans_items)])
+
+
+def _day4_dialogue_blanks(item, i):
+    return list(item[2])  # 每个空一个答案
+
+
+def _day4_order_blanks(item, i):
+    """语序判断只有一个括号：错误的句子写「错误」加改正句，或只写改正后的句子都算对"""
+    verdict, _, corrected = item[1].partition('，应为 ')
+    if not corrected:
+        return [verdict]
+    return [f'{item[1]} / {verdict} {corrected} / {corrected}']
+
+
+_DAY4_SCENE_HEADER = '场景应答（根据对话情景，选择或填写合适的应答）'
+
+DAY4_SPEC = {
+    'day': 4,
+    'title': '小学六年级英语练习题【特殊疑问句+情景交际】',
+    'blocks': [
+        {'section': '第一部分：特殊疑问词（20分钟）'},
+        {'number': '一', 'header': '疑问词选择填空（从 what/when/where/who/why/how 中选择）',
+         'key': '疑问词选择填空', 'bank': 'DAY4_WH_FILL', 'counts': (4, 8, 15),
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '二', 'header': '疑问词意义匹配（将疑问词与其含义连线或填写）',
+         'key': '疑问词意义匹配', 'bank': 'DAY4_WH_MATCH', 'counts': (4, 8, 12),
+         'intro': [Plain('请将左边的疑问词与右边的含义进行匹配：'), BLANK],
+         'item': ['{i}. {0}        ______'], 'answer': '{i}. {0} — {1}（{2}）', 'blanks': ['{1}'],
+         'outro': _day4_meaning_options},
+        {'number': '三', 'header': '特殊疑问句语序判断（判断下列句子语序是否正确，错误的请改正）',
+         'key': '特殊疑问句语序判断', 'bank': 'DAY4_WH_ORDER', 'counts': (4, 8, 15),
+         'item': ['{i}. {0}  （    ）'], 'answer': '{i}. {1}（{2}）',
+         'blanks': _day4_order_blanks},
+        {'section': '第二部分：情景交际（15分钟）'},
+        {'number': '四', 'header': '购物' + _DAY4_SCENE_HEADER, 'key': '购物场景应答',
+         'bank': 'DAY4_SHOPPING', 'counts': (2, 4, 8),
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '五', 'header': '问路' + _DAY4_SCENE_HEADER, 'key': '问路场景应答',
+         'bank': 'DAY4_ASKING_WAY', 'counts': (2, 4, 8),
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '六', 'header': '问候' + _DAY4_SCENE_HEADER, 'key': '问候场景应答',
+         'bank': 'DAY4_GREETING', 'counts': (2, 4, 10),
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'section': '第三部分：综合练习（15分钟）'},
+        {'number': '七', 'header': '连词成句（将打乱的单词组成正确的特殊疑问句）', 'key': '连词成句',
+         'bank': 'DAY4_MAKE_SENTENCE', 'counts': (4, 6, 12),
+         'item': ['{i}. {0}', _ANSWER_LINE], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '八', 'header': '补全对话（根据上下文，在横线处填入合适的句子）', 'key': '补全对话',
+         'bank': 'DAY4_DIALOGUE_COMPLETE', 'counts': (2, 3, 5),
+         'item': [_day4_dialogue], 'answer': _day4_dialogue_answer,
+         'blanks': _day4_dialogue_blanks},
+    ],
+}
+
+
+# ============ 第5天规格 ============
+
+def _day5_verb_list(items, rng):
     all_verbs = []
-    for rule, verbs in DAY5_RULE_CLASSIFY[:rule_count]:
+    for rule, verbs in items:
         all_verbs.extend(verbs[:4])  # 每类取前4个
-    add_question(doc, f'动词：{", ".join(all_verbs[:12])}')
-    doc.add_paragraph()
-    ans_list = []
-    for i, (rule, verbs) in enumerate(DAY5_RULE_CLASSIFY[:rule_count], 1):
-        add_question(doc, f'{i}. {rule}：_______________________')
-        ans_list.append(f'{i}. {rule}：{", ".join(verbs)}')
-    answers['四、变形规则分类'] = ans_list
-
-    # ========== 第二部分：答题技巧 ==========
-    add_section_title(doc, '第二部分：答题技巧（10分钟）')
-
-    # 五、时间标志词识别
-    add_question_header(doc, '五', '时间标志词识别（写出下列标志词的中文意思）')
-    ans_list = []
-    for i, (word, meaning, tip) in enumerate(DAY5_TIME_WORDS[:time_words], 1):
-        add_question(doc, f'{i}. {word} → _______')
-        ans_list.append(f'{i}. {meaning}（{tip}）')
-    answers['五、时间标志词识别'] = ans_list
-
-    # 六、不规则变化专练
-    add_question_header(doc, '六', '不规则变化专练（用括号内动词的正确形式填空）')
-    ans_list = []
-    for i, (verb, third, sent, ans) in enumerate(DAY5_IRREGULAR[:irregular], 1):
-        add_question(doc, f'{i}. {sent}')
-        ans_list.append(f'{i}. {ans}（{verb}→{third}）')
-    answers['六、不规则变化专练'] = ans_list
-
-    # ========== 第三部分：专项练习 ==========
-    add_section_title(doc, '第三部分：专项练习（20分钟）')
-
-    # 七、时态填空
-    add_question_header(doc, '七', '时态填空（用括号内动词的正确形式填空）')
-    ans_list = []
-    for i, (sent, ans, reason) in enumerate(DAY5_FILL_BLANK[:fill_blank], 1):
-        add_question(doc, f'{i}. {sent}')
-        ans_list.append(f'{i}. {ans}（{reason}）')
-    answers['七、时态填空'] = ans_list
-
-    # 八、单句改错
-    add_question_header(doc, '八', '单句改错（找出句中错误并改正）')
-    ans_list = []
-    for i, (sent, correction, reason) in enumerate(DAY5_CORRECT_ERROR[:correct_error], 1):
-        add_question(doc, f'{i}. {sent}')
-        add_question(doc, '   错误：_______ → 改正：_______')
-        ans_list.append(f'{i}. {correction}（{reason}）')
-    answers['八、单句改错'] = ans_list
-
-    # 九、句子补全
-    add_question_header(doc, '九', '句子补全（根据中文提示完成英文句子）')
-    ans_list = []
-    for i, (cn, en, ans) in enumerate(DAY5_COMPLETE_SENT[:complete_sent], 1):
-        add_question(doc, f'{i}. {cn}')
-        add_question(doc, f'   {en}')
-        ans_list.append(f'{i}. {ans}')
-    answers['九、句子补全'] = ans_list
+    return [Plain('请将动词填入对应的规则类别中：'), BLANK,
+            f'动词：{", ".join(all_verbs[:12])}', BLANK]
+
+
+def _day5_rule_answer(item, i):
+    rule, verbs = item
+    return f'{i}. {rule}：{", ".join(verbs)}'
+
+
+DAY5_SPEC = {
+    'day': 5,
+    'title': '小学六年级英语练习题【语法专项：一般现在时】',
+    'blocks': [
+        {'section': '第一部分：语法精讲（20分钟）'},
+        {'number': '一', 'header': '动词变形练习（写出下列动词的第三人称单数形式）',
+         'key': '动词变形练习', 'bank': 'DAY5_VERB_CHANGE', 'counts': (5, 10, 20),
+         'item': ['{i}. {0} → _______'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '二', 'header': '时态判断（判断下列句子是否为一般现在时，是写"是"，否写"否"）',
+         'key': '时态判断', 'bank': 'DAY5_TENSE_JUDGE', 'counts': (4, 8, 15),
+         'item': ['{i}. {0}  （    ）'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '三', 'header': '动词形式选择（从括号中选择正确的动词形式）',
+         'key': '动词形式选择', 'bank': 'DAY5_VERB_CHOOSE', 'counts': (4, 8, 15),
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '四', 'header': '变形规则分类（将下列动词按变形规则分类）',
+         'key': '变形规则分类', 'bank': 'DAY5_RULE_CLASSIFY', 'counts': (2, 3, 5),
+         'intro': _day5_verb_list,
+         'item': ['{i}. {0}：_______________________'], 'answer': _day5_rule_answer,
+         'gradable': False},
+        {'section': '第二部分：答题技巧（10分钟）'},
+        {'number': '五', 'header': '时间标志词识别（写出下列标志词的中文意思）',
+         'key': '时间标志词识别', 'bank': 'DAY5_TIME_WORDS', 'counts': (4, 8, 12),
+         'item': ['{i}. {0} → _______'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '六', 'header': '不规则变化专练（用括号内动词的正确形式填空）',
+         'key': '不规则变化专练', 'bank': 'DAY5_IRREGULAR', 'counts': (3, 6, 10),
+         'item': ['{i}. {2}'], 'answer': '{i}. {3}（{0}→{1}）', 'blanks': ['{3}']},
+        {'section': '第三部分：专项练习（20分钟）'},
+        {'number': '七', 'header': '时态填空（用括号内动词的正确形式填空）', 'key': '时态填空',
+         'bank': 'DAY5_FILL_BLANK', 'counts': (4, 8, 15),
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '八', 'header': '单句改错（找出句中错误并改正）', 'key': '单句改错',
+         'bank': 'DAY5_CORRECT_ERROR', 'counts': (4, 8, 15),
+         'item': ['{i}. {0}', _ERROR_LINE], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '九', 'header': '句子补全（根据中文提示完成英文句子）', 'key': '句子补全',
+         'bank': 'DAY5_COMPLETE_SENT', 'counts': (4, 8, 15),
+         'item': ['{i}. {0}', '   {1}'], 'answer': '{i}. {2}', 'blanks': ['{2}']},
+    ],
+}
 
-    add_answer_section(doc, answers)
-    doc.save(output_path)
-    print(f'已生成: {output_path}')
 
+# ============ 第6天规格 ============
+
+_TRANSLATE_LINE = '   翻译：_______________________'
+
+DAY6_SPEC = {
+    'day': 6,
+    'title': '小学六年级英语练习题【语法专项：一般过去时+一般将来时】',
+    'blocks': [
+        {'section': '第一部分：时态梳理（25分钟）'},
+        {'number': '一', 'header': '一般过去时标志词（写出下列标志词的中文意思）',
+         'key': '一般过去时标志词', 'bank': 'DAY6_PAST_TIME_WORDS', 'counts': (4, 8, 12),
+         'item': ['{i}. {0} → _______'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '二', 'header': '动词过去式规则变化（写出下列动词的过去式）',
+         'key': '动词过去式规则变化', 'bank': 'DAY6_PAST_REGULAR', 'counts': (6, 12, 20),
+         'item': ['{i}. {0} → _______'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '三', 'header': '动词过去式不规则变化（写出下列动词的过去式）',
+         'key': '动词过去式不规则变化', 'bank': 'DAY6_PAST_IRREGULAR', 'counts': (8, 15, 30),
+         'item': ['{i}. {0} → _______'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '四', 'header': '一般将来时标志词（写出下列标志词的中文意思）',
+         'key': '一般将来时标志词', 'bank': 'DAY6_FUTURE_TIME_WORDS', 'counts': (4, 6, 10),
+         'item': ['{i}. {0} → _______'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '五', 'header': 'will 句型练习（翻译下列句子）', 'key': 'will 句型练习',
+         'bank': 'DAY6_WILL_SENTENCES', 'counts': (4, 6, 10),
+         'item': ['{i}. {0}', _TRANSLATE_LINE], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '六', 'header': 'be going to 句型练习（翻译下列句子）',
+         'key': 'be going to 句型练习', 'bank': 'DAY6_BE_GOING_TO', 'counts': (4, 6, 10),
+         'item': ['{i}. {0}', _TRANSLATE_LINE], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '七', 'header': '三大基础时态对比（填写表格）', 'key': '三大基础时态对比',
+         'bank': 'DAY6_TENSE_COMPARE', 'counts': (3, 3, 3),
+         'intro': [Plain('请根据例句总结三大时态的用法和标志词：'), BLANK,
+                   '| 时态 | 例句 | 用法 | 常见标志词 |', '|------|------|------|------------|'],
+         'item': ['| {0} | {1} | _______ | _______ |'], 'answer': '{0}：{2}，标志词：{3}',
+         'gradable': False},
+        {'section': '第二部分：例题练习（15分钟）'},
+        {'number': '八', 'header': '时态辨析选择题（选择正确答案）', 'key': '时态辨析选择题',
+         'bank': 'DAY6_TENSE_CHOOSE', 'counts': (5, 10, 15), 'options': (1, 2),
+         'item': ['{i}. {0}', '   {1}'], 'answer': '{i}. {2}（{3}）', 'blanks': ['{2}']},
+        {'number': '九', 'header': '用所给词适当形式填空', 'key': '用所给词适当形式填空',
+         'bank': 'DAY6_FILL_TENSE', 'counts': (6, 12, 20),
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'section': '第三部分：错题复盘（10分钟）'},
+        {'number': '十', 'header': '时态易错题整理（找出错误并改正）', 'key': '时态易错题整理',
+         'bank': 'DAY6_COMMON_ERRORS', 'counts': (5, 10, 15),
+         'item': ['{i}. {0}', _ERROR_LINE], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '十一', 'header': '句子补全（根据中文提示完成英文句子）', 'key': '句子补全',
+         'bank': 'DAY6_COMPLETE_TENSE', 'counts': (5, 10, 15),
+         'item': ['{i}. {0}', '   {1}'], 'answer': '{i}. {2}', 'blanks': ['{2}']},
+    ],
+}
 
-# ============ 生成第6天文档函数 ============
 
-def generate_day6_doc(version, output_path):
-    """生成第6天语法专项（一般过去时+一般将来时）练习题"""
-    doc = Document()
-
-    # 根据版本确定题目数量
-    if version == '简洁版':
-        past_time = 4
-        past_regular, past_irregular = 6, 8
-        future_time = 4
-        will_sent, going_to = 4, 4
-        tense_compare = 3
-        tense_choose, fill_tense = 5, 6
-        common_errors, complete_tense = 5, 5
-    elif version == '完整版':
-        past_time = 8
-        past_regular, past_irregular = 12, 15
-        future_time = 6
-        will_sent, going_to = 6, 6
-        tense_compare = 3
-        tense_choose, fill_tense = 10, 12
-        common_errors, complete_tense = 10, 10
-    else:  # 充实版
-        past_time = 12
-        past_regular, past_irregular = 20, 30
-        future_time = 10
-        will_sent, going_to = 10, 10
-        tense_compare = 3
-        tense_choose, fill_tense = 15, 20
-        common_errors, complete_tense = 15, 15
-
-    add_title(doc, '小学六年级英语练习题【语法专项：一般过去时+一般将来时】', f'（基础+提升）第6天 - {version}')
+# ============ 第7天规格 ============
+
+def _day7_preposition(number, word, bank, counts):
+    return {'number': number, 'header': f'介词 {word} 的用法（写出下列短语的中文意思）',
+            'key': f'介词 {word} 的用法', 'bank': bank, 'counts': counts,
+            'item': ['{i}. {0} → _______'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']}
+
+
+DAY7_SPEC = {
+    'day': 7,
+    'title': '小学六年级英语练习题【语法专项：介词+代词+名词单复数】',
+    'blocks': [
+        {'section': '第一部分：核心语法（20分钟）'},
+        _day7_preposition('一', 'in', 'DAY7_PREPOSITION_IN', (4, 8, 12)),
+        _day7_preposition('二', 'on', 'DAY7_PREPOSITION_ON', (4, 8, 12)),
+        _day7_preposition('三', 'at', 'DAY7_PREPOSITION_AT', (4, 8, 12)),
+        _day7_preposition('四', 'by', 'DAY7_PREPOSITION_BY', (4, 6, 10)),
+        {'number': '五', 'header': '人称代词填空（选择正确的人称代词）', 'key': '人称代词填空',
+         'bank': 'DAY7_PRONOUN_FILL', 'counts': (5, 10, 15),
+         'intro': [Plain('人称代词表：I-me, you-you, he-him, she-her, it-it, we-us, they-them'),
+                   BLANK],
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '六', 'header': '物主代词填空（选择正确的物主代词）', 'key': '物主代词填空',
+         'bank': 'DAY7_POSSESSIVE_FILL', 'counts': (5, 10, 15),
+         'intro': [Plain('物主代词表：my-mine, your-yours, his-his, her-hers, its-its, '
+                         'our-ours, their-theirs'), BLANK],
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '七', 'header': '名词单复数规则变化（写出下列名词的复数形式）',
+         'key': '名词单复数规则变化', 'bank': 'DAY7_NOUN_PLURAL_REGULAR', 'counts': (8, 15, 27),
+         'item': ['{i}. {0} → _______'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '八', 'header': '名词单复数不规则变化（写出下列名词的复数形式）',
+         'key': '名词单复数不规则变化', 'bank': 'DAY7_NOUN_PLURAL_IRREGULAR', 'counts': (5, 8, 12),
+         'item': ['{i}. {0} → _______'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'section': '第二部分：易混辨析（15分钟）'},
+        {'number': '九', 'header': 'in/on/at 时间用法辨析（填入正确的介词）',
+         'key': 'in/on/at 时间用法辨析', 'bank': 'DAY7_TIME_PREPOSITION', 'counts': (5, 10, 15),
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '十', 'header': 'this/that/these/those 辨析（填入正确的指示代词）',
+         'key': 'this/that/these/those 辨析', 'bank': 'DAY7_DEMONSTRATIVE', 'counts': (4, 8, 12),
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '十一', 'header': '代词易错题（找出错误并改正）', 'key': '代词易错题',
+         'bank': 'DAY7_PRONOUN_ERRORS', 'counts': (4, 8, 12),
+         'item': ['{i}. {0}', _ERROR_LINE], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'section': '第三部分：综合练习（15分钟）'},
+        {'number': '十二', 'header': '介词填空综合练习（填入正确的介词 in/on/at/by）',
+         'key': '介词填空综合练习', 'bank': 'DAY7_PREPOSITION_FILL', 'counts': (5, 10, 15),
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'number': '十三', 'header': '代词替换练习（用代词替换划线部分）', 'key': '代词替换练习',
+         'bank': 'DAY7_PRONOUN_REPLACE', 'counts': (4, 8, 12),
+         'item': ['{i}. {0}', '   → _______________________'], 'answer': '{i}. {1}（{2}）',
+         'blanks': ['{1}']},
+        {'number': '十四', 'header': '名词单复数转换练习（写出正确的复数形式）',
+         'key': '名词单复数转换练习', 'bank': 'DAY7_NOUN_CONVERT', 'counts': (5, 10, 15),
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+    ],
+}
 
-    answers = {}
 
-    # ========== 第一部分：时态梳理 ==========
-    add_section_title(doc, '第一部分：时态梳理（25分钟）')
-
-    # 一、一般过去时标志词
-    add_question_header(doc, '一', '一般过去时标志词（写出下列标志词的中文意思）')
-    ans_list = []
-    for i, (word, meaning, tip) in enumerate(DAY6_PAST_TIME_WORDS[:past_time], 1):
-        add_question(doc, f'{i}. {word} → _______')
-        ans_list.append(f'{i}. {meaning}（{tip}）')
-    answers['一、一般过去时标志词'] = ans_list
-
-    # 二、动词过去式规则变化
-    add_question_header(doc, '二', '动词过去式规则变化（写出下列动词的过去式）')
-    ans_list = []
-    for i, (verb, past, rule) in enumerate(DAY6_PAST_REGULAR[:past_regular], 1):
-        add_question(doc, f'{i}. {verb} → _______')
-        ans_list.append(f'{i}. {past}（{rule}）')
-    answers['二、动词过去式规则变化'] = ans_list
-
-    # 三、动词过去式不规则变化
-    add_question_header(doc, '三', '动词过去式不规则变化（写出下列动词的过去式）')
-    ans_list = []
-    for i, (verb, past, rule) in enumerate(DAY6_PAST_IRREGULAR[:past_irregular], 1):
-        add_question(doc, f'{i}. {verb} → _______')
-        ans_list.append(f'{i}. {past}（{rule}）')
-    answers['三、动词过去式不规则变化'] = ans_list
-
-    # 四、一般将来时标志词
-    add_question_header(doc, '四', '一般将来时标志词（写出下列标志词的中文意思）')
-    ans_list = []
-    for i, (word, meaning, tip) in enumerate(DAY6_FUTURE_TIME_WORDS[:future_time], 1):
-        add_question(doc, f'{i}. {word} → _______')
-        ans_list.append(f'{i}. {meaning}（{tip}）')
-    answers['四、一般将来时标志词'] = ans_list
-
-    # 五、will 句型练习
-    add_question_header(doc, '五', 'will 句型练习（翻译下列句子）')
-    ans_list = []
-    for i, (en, cn, rule) in enumerate(DAY6_WILL_SENTENCES[:will_sent], 1):
-        add_question(doc, f'{i}. {en}')
-        add_question(doc, '   翻译：_______________________')
-        ans_list.append(f'{i}. {cn}（{rule}）')
-    answers['五、will 句型练习'] = ans_list
-
-    # 六、be going to 句型练习
-    add_question_header(doc, '六', 'be going to 句型练习（翻译下列句子）')
-    ans_list = []
-    for i, (en, cn, rule) in enumerate(DAY6_BE_GOING_TO[:going_to], 1):
-        add_question(doc, f'{i}. {en}')
-        add_question(doc, '   翻译：_______________________')
-        ans_list.append(f'{i}. {cn}（{rule}）')
-    answers['六、be going to 句型练习'] = ans_list
-
-    # 七、三大基础时态对比
-    add_question_header(doc, '七', '三大基础时态对比（填写表格）')
-    add_question(doc, '请根据例句总结三大时态的用法和标志词：', indent=False)
-    doc.add_paragraph()
-    add_question(doc, '| 时态 | 例句 | 用法 | 常见标志词 |')
-    add_question(doc, '|------|------|------|------------|')
-    ans_list = []
-    for tense, example, usage, words in DAY6_TENSE_COMPARE[:tense_compare]:
-        add_question(doc, f'| {tense} | {example} | _______ | _______ |')
-        ans_list.append(f'{tense}：{usage}，标志词：{words}')
-    answers['七、三大基础时态对比'] = ans_list
-
-    # ========== 第二部分：例题练习 ==========
-    add_section_title(doc, '第二部分：例题练习（15分钟）')
-
-    # 八、时态辨析选择题
-    add_question_header(doc, '八', '时态辨析选择题（选择正确答案）')
-    ans_list = []
-    for i, (sent, options, ans, reason) in enumerate(DAY6_TENSE_CHOOSE[:tense_choose], 1):
-        add_question(doc, f'{i}. {sent}')
-        add_question(doc, f'   {options}')
-        ans_list.append(f'{i}. {ans}（{reason}）')
-    answers['八、时态辨析选择题'] = ans_list
-
-    # 九、用所给词适当形式填空
-    add_question_header(doc, '九', '用所给词适当形式填空')
-    ans_list = []
-    for i, (sent, ans, reason) in enumerate(DAY6_FILL_TENSE[:fill_tense], 1):
-        add_question(doc, f'{i}. {sent}')
-        ans_list.append(f'{i}. {ans}（{reason}）')
-    answers['九、用所给词适当形式填空'] = ans_list
-
-    # ========== 第三部分：错题复盘 ==========
-    add_section_title(doc, '第三部分：错题复盘（10分钟）')
-
-    # 十、时态易错题整理
-    add_question_header(doc, '十', '时态易错题整理（找出错误并改正）')
-    ans_list = []
-    for i, (sent, correction, reason) in enumerate(DAY6_COMMON_ERRORS[:common_errors], 1):
-        add_question(doc, f'{i}. {sent}')
-        add_question(doc, '   错误：_______ → 改正：_______')
-        ans_list.append(f'{i}. {correction}（{reason}）')
-    answers['十、时态易错题整理'] = ans_list
-
-    # 十一、句子补全（三大时态综合）
-    add_question_header(doc, '十一', '句子补全（根据中文提示完成英文句子）')
-    ans_list = []
-    for i, (cn, en, ans) in enumerate(DAY6_COMPLETE_TENSE[:complete_tense], 1):
-        add_question(doc, f'{i}. {cn}')
-        add_question(doc, f'   {en}')
-        ans_list.append(f'{i}. {ans}')
-    answers['十一、句子补全'] = ans_list
+# ============ 第8天规格 ============
+
+DAY8_SPEC = {
+    'day': 8,
+    'title': '小学六年级英语练习题【阅读专项：完形填空+阅读理解】',
+    'blocks': [
+        {'section': '第一部分：阅读技巧（20分钟）'},
+        {'number': '一', 'header': '阅读技巧知识点（请认真阅读并记忆）', 'key': '阅读技巧知识点',
+         'bank': 'DAY8_READING_TIPS', 'counts': (3, 5, 7),
+         'item': ['{i}. 【{2}】{0}', '   说明：{1}'], 'answers': ['请认真阅读并记忆以上技巧'],
+         'ordered': True},
+        {'number': '二', 'header': '猜词义练习（根据上下文猜测划线单词的意思）', 'key': '猜词义练习',
+         'bank': 'DAY8_GUESS_WORD', 'counts': (3, 4, 6),
+         'item': ['{i}. {0}', '   "{1}" 的意思是：_______'], 'answer': '{i}. {2}（{3}）',
+         'blanks': ['{2}']},
+        {'section': '第二部分：题型练习（25分钟）'},
+        {'kind': 'passages', 'number': '三', 'header': '完形填空（阅读短文，选择最佳答案）',
+         'key': '完形填空', 'banks': ['DAY8_CLOZE_1', 'DAY8_CLOZE_2'], 'counts': (1, 1, 2),
+         'item': ['{i}. {0}', '   {1}'], 'answer': '{i}. {2}（{3}）', 'blanks': ['{2}'],
+         'options': (1, 2), 'trailing_blank': True},
+        {'kind': 'passages', 'number': '四', 'header': '阅读理解（阅读短文，选择最佳答案）',
+         'key': '阅读理解', 'banks': ['DAY8_READING_1', 'DAY8_READING_2'], 'counts': (1, 2, 2),
+         'item': ['{i}. {0}', '   {1}'], 'answer': '{i}. {2}（{3}）', 'blanks': ['{2}'],
+         'options': (1, 2), 'trailing_blank': True},
+        {'section': '第三部分：讲解复盘（5分钟）'},
+        {'kind': 'static', 'number': '五', 'header': '错题分析与技巧总结', 'key': '错题分析与技巧总结',
+         'paragraphs': [
+             Plain('完形填空技巧：'),
+             '1. 先通读全文，了解大意',
+             '2. 注意固定搭配和习惯用法',
+             '3. 根据上下文逻辑选择答案',
+             '4. 做完后再读一遍，检查是否通顺',
+             BLANK,
+             Plain('阅读理解技巧：'),
+             '1. 先看题目，带着问题读文章',
+             '2. 圈画关键词：时间、人物、数字、地点',
+             '3. 答案一定在原文中能找到依据',
+             '4. 注意转折词后面的内容',
+         ],
+         'answers': ['请认真阅读以上技巧总结']},
+    ],
+}
 
-    add_answer_section(doc, answers)
-    doc.save(output_path)
-    print(f'已生成: {output_path}')
 
+# ============ 第9天规格 ============
+
+def _day9_writing_topics(block, tier, rng, events):
+    names = block['banks']
+    topics = _select(block, [_bank(name) for name in names], block['counts'][tier], rng)
+    answers = []
+    for idx, (position, topic) in enumerate(topics, 7):
+        item_id = names[position]
+        events.append(('header', '七' if idx == 7 else '八', f'写作题目：{topic["title"]}'))
+        events.append(('item', item_id, idx - 6, _paragraphs([
+            Plain(f'要求：{topic["requirements"]}'),
+            Plain('提示：'),
+            *[f'• {hint}' for hint in topic['hints']],
+            Plain('写作框架：'),
+            f'• 开头：{topic["outline"]["opening"]}',
+            f'• 中间：{topic["outline"]["body"]}',
+            f'• 结尾：{topic["outline"]["ending"]}',
+            BLANK,
+            Plain('请在下面写作：'),
+            *[_WRITING_LINE] * 5,
+            BLANK,
+        ])))
+        answers.append((item_id, f'【{topic["title"]} 范文】', None))
+        answers.append((item_id, topic['sample'], None))
+    return answers
+
+
+DAY9_SPEC = {
+    'day': 9,
+    'title': '小学六年级英语练习题【写作专项：审题+句型+书写】',
+    'blocks': [
+        {'section': '第一部分：审题技巧（15分钟）'},
+        {'number': '一', 'header': '审题技巧（请认真阅读并记忆）', 'key': '审题技巧',
+         'bank': 'DAY9_WRITING_TIPS', 'counts': (3, 4, 5),
+         'item': ['{i}. 【{0}】{1}'], 'answers': ['请认真阅读并记忆以上技巧'],
+         'ordered': True},
+        {'kind': 'static', 'number': '二', 'header': '写作框架（开头-中间-结尾）', 'key': '写作框架',
+         'paragraphs': [
+             Plain('一篇好的作文应该包含三个部分：'),
+             '1. 开头（Opening）：引出话题，点明主题',
+             '2. 中间（Body）：详细描述，展开内容',
+             '3. 结尾（Ending）：总结感受，呼应开头',
+         ],
+         'answers': ['开头-中间-结尾三段式结构']},
+        {'section': '第二部分：句型积累（10分钟）'},
+        {'number': '三', 'header': '常用开头句（请背诵并仿写）', 'key': '常用开头句',
+         'bank': 'DAY9_OPENING_SENTENCES', 'counts': (4, 6, 8),
+         'item': ['{i}. {0}', '   中文：{1}（{2}）'], 'answer': '{i}. {0} - {1}'},
+        {'number': '四', 'header': '常用中间句（描述句型）', 'key': '常用中间句',
+         'bank': 'DAY9_BODY_SENTENCES', 'counts': (5, 7, 10),
+         'item': ['{i}. {0}', '   中文：{1}（{2}）'], 'answer': '{i}. {0} - {1}'},
+        {'number': '五', 'header': '常用结尾句', 'key': '常用结尾句',
+         'bank': 'DAY9_ENDING_SENTENCES', 'counts': (4, 6, 8),
+         'item': ['{i}. {0}', '   中文：{1}（{2}）'], 'answer': '{i}. {0} - {1}'},
+        {'number': '六', 'header': '写作常见错误（找出错误并改正）', 'key': '写作常见错误',
+         'bank': 'DAY9_WRITING_ERRORS', 'counts': (4, 6, 8),
+         'item': ['{i}. 错误：{0}', '   改正：_______________________'],
+         'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'section': '第三部分：写作实战（25分钟）'},
+        {'kind': 'custom', 'number': '七', 'key': '写作实战',
+         'banks': ['DAY9_WRITING_TOPIC_1', 'DAY9_WRITING_TOPIC_2'], 'counts': (1, 2, 2),
+         'render': _day9_writing_topics, 'gradable': False},
+    ],
+}
 
-# ============ 生成第7天文档函数 ============
 
-def generate_day7_doc(version, output_path):
-    """生成第7天语法专项（介词+代词+名词单复数）练习题"""
-    doc = Document()
-
-    # 根据版本确定题目数量
-    if version == '简洁版':
-        prep_in, prep_on, prep_at, prep_by = 4, 4, 4, 4
-        pronoun_fill, possessive_fill = 5, 5
-        noun_regular, noun_irregular = 8, 5
-        time_prep, demonstrative = 5, 4
-        pronoun_errors = 4
-        prep_fill, pronoun_replace, noun_convert = 5, 4, 5
-    elif version == '完整版':
-        prep_in, prep_on, prep_at, prep_by = 8, 8, 8, 6
-        pronoun_fill, possessive_fill = 10, 10
-        noun_regular, noun_irregular = 15, 8
-        time_prep, demonstrative = 10, 8
-        pronoun_errors = 8
-        prep_fill, pronoun_replace, noun_convert = 10, 8, 10
-    else:  # 充实版
-        prep_in, prep_on, prep_at, prep_by = 12, 12, 12, 10
-        pronoun_fill, possessive_fill = 15, 15
-        noun_regular, noun_irregular = 27, 12
-        time_prep, demonstrative = 15, 12
-        pronoun_errors = 12
-        prep_fill, pronoun_replace, noun_convert = 15, 12, 15
-
-    add_title(doc, '小学六年级英语练习题【语法专项：介词+代词+名词单复数】', f'（基础+提升）第7天 - {version}')
+# ============ 第10天规格 ============
+
+def _day10_writing_test(block, tier, rng, events):
+    test = _bank('DAY10_WRITING_TEST')
+    events.append(('header', block['number'], f'写作：{test["title"]}'))
+    events.append(('item', 'DAY10_WRITING_TEST', 1, _paragraphs([
+        Plain(f'要求：{test["requirements"]}'),
+        Plain('提示：'),
+        *[f'• {hint}' for hint in test['hints']],
+        BLANK,
+        Plain('请在下面写作：'),
+        *[_WRITING_LINE] * 4,
+    ])))
+    return []
+
+
+DAY10_SPEC = {
+    'day': 10,
+    'title': '小学六年级英语练习题【综合模考+错题复盘+知识梳理】',
+    'blocks': [
+        {'section': '第一部分：综合模考（30分钟）'},
+        {'number': '一', 'header': '词汇部分（填写正确的单词或短语）', 'key': '词汇部分',
+         'bank': 'DAY10_VOCAB_TEST', 'counts': (8, 12, 15),
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{3}）', 'blanks': ['{1}']},
+        {'number': '二', 'header': '语法部分（用所给词的正确形式填空或选择）', 'key': '语法部分',
+         'bank': 'DAY10_GRAMMAR_TEST', 'counts': (10, 15, 20),
+         'item': ['{i}. {0}'], 'answer': '{i}. {1}（{2}）', 'blanks': ['{1}']},
+        {'kind': 'passages', 'number': '三', 'header': '阅读理解（阅读短文，选择最佳答案）',
+         'key': '阅读理解', 'banks': ['DAY10_READING_TEST'], 'options': (1, 2),
+         'item': ['{i}. {0}', '   {1}'], 'answer': '{i}. {2}（{3}）', 'blanks': ['{2}']},
+        {'kind': 'custom', 'number': '四', 'key': '写作', 'banks': ['DAY10_WRITING_TEST'],
+         'render': _day10_writing_test, 'answers': ['请参考第9天范文格式自行评分'],
+         'gradable': False},
+        {'section': '第二部分：快速批改（10分钟）'},
+        {'kind': 'static', 'number': '五', 'header': '自批试卷（对照答案批改，标注错题类型）',
+         'key': '自批试卷',
+         'paragraphs': [
+             Plain('错题类型分类：'),
+             '• 词汇类错误：短语搭配、单词拼写、名词复数等',
+             '• 语法类错误：时态、人称代词、介词等',
+             '• 阅读类错误：理解偏差、定位不准等',
+             BLANK,
+             Plain('我的错题统计：'),
+             '词汇类错误：_______ 题',
+             '语法类错误：_______ 题',
+             '阅读类错误：_______ 题',
+         ],
+         'answers': ['请自行统计错题数量']},
+        {'section': '第三部分：复盘梳理（10分钟）'},
+        {'number': '六', 'header': '10天学习要点回顾', 'key': '10天学习要点回顾',
+         'bank': 'DAY10_REVIEW_POINTS',
+         'item': ['【{0}】{1}', '   {2}'], 'answers': ['请认真复习以上知识点'],
+         'ordered': True},
+        {'number': '七', 'header': '易错点汇总（重点巩固）', 'key': '易错点汇总',
+         'bank': 'DAY10_ERROR_SUMMARY',
+         'item': ['{i}. 【{0}】', '   例句：{1}', '   注意：{2}'], 'answer': '{i}. {0}：{2}'},
+        {'kind': 'static', 'number': '八', 'header': '后续学习建议', 'key': '后续学习建议',
+         'paragraphs': [
+             '1. 每天复习错题本，巩固薄弱知识点',
+             '2. 坚持每天背诵5-10个单词和短语',
+             '3. 每周完成1-2篇阅读理解练习',
+             '4. 每周写1篇小作文，积累常用句型',
+             '5. 多听多读，培养语感',
+         ],
+         'answers': ['请认真执行以上学习计划']},
+    ],
+}
 
-    answers = {}
 
-    # ========== 第一部分：核心语法 ==========
-    add_section_title(doc, '第一部分：核心语法（20分钟）')
-
-    # 一、介词 in 的用法
-    add_question_header(doc, '一', '介词 in 的用法（写出下列短语的中文意思）')
-    ans_list = []
-    for i, (phrase, meaning, usage) in enumerate(DAY7_PREPOSITION_IN[:prep_in], 1):
-        add_question(doc, f'{i}. {phrase} → _______')
-        ans_list.append(f'{i}. {meaning}（{usage}）')
-    answers['一、介词 in 的用法'] = ans_list
-
-    # 二、介词 on 的用法
-    add_question_header(doc, '二', '介词 on 的用法（写出下列短语的中文意思）')
-    ans_list = []
-    for i, (phrase, meaning, usage) in enumerate(DAY7_PREPOSITION_ON[:prep_on], 1):
-        add_question(doc, f'{i}. {phrase} → _______')
-        ans_list.append(f'{i}. {meaning}（{usage}）')
-    answers['二、介词 on 的用法'] = ans_list
-
-    # 三、介词 at 的用法
-    add_question_header(doc, '三', '介词 at 的用法（写出下列短语的中文意思）')
-    ans_list = []
-    for i, (phrase, meaning, usage) in enumerate(DAY7_PREPOSITION_AT[:prep_at], 1):
-        add_question(doc, f'{i}. {phrase} → _______')
-        ans_list.append(f'{i}. {meaning}（{usage}）')
-    answers['三、介词 at 的用法'] = ans_list
-
-    # 四、介词 by 的用法
-    add_question_header(doc, '四', '介词 by 的用法（写出下列短语的中文意思）')
-    ans_list = []
-    for i, (phrase, meaning, usage) in enumerate(DAY7_PREPOSITION_BY[:prep_by], 1):
-        add_question(doc, f'{i}. {phrase} → _______')
-        ans_list.append(f'{i}. {meaning}（{usage}）')
-    answers['四、介词 by 的用法'] = ans_list
-
-    # 五、人称代词填空
-    add_question_header(doc, '五', '人称代词填空（选择正确的人称代词）')
-    add_question(doc, '人称代词表：I-me, you-you, he-him, she-her, it-it, we-us, they-them', indent=False)
-    doc.add_paragraph()
-    ans_list = []
-    for i, (sent, ans, reason) in enumerate(DAY7_PRONOUN_FILL[:pronoun_fill], 1):
-        add_question(doc, f'{i}. {sent}')
-        ans_list.append(f'{i}. {ans}（{reason}）')
-    answers['五、人称代词填空'] = ans_list
-
-    # 六、物主代词填空
-    add_question_header(doc, '六', '物主代词填空（选择正确的物主代词）')
-    add_question(doc, '物主代词表：my-mine, your-yours, his-his, her-hers, its-its, our-ours, their-theirs', indent=False)
-    doc.add_paragraph()
-    ans_list = []
-    for i, (sent, ans, reason) in enumerate(DAY7_POSSESSIVE_FILL[:possessive_fill], 1):
-        add_question(doc, f'{i}. {sent}')
-        ans_list.append(f'{i}. {ans}（{reason}）')
-    answers['六、物主代词填空'] = ans_list
-
-    # 七、名词单复数规则变化
-    add_question_header(doc, '七', '名词单复数规则变化（写出下列名词的复数形式）')
-    ans_list = []
-    for i, (singular, plural, rule) in enumerate(DAY7_NOUN_PLURAL_REGULAR[:noun_regular], 1):
-        add_question(doc, f'{i}. {singular} → _______')
-        ans_list.append(f'{i}. {plural}（{rule}）')
-    answers['七、名词单复数规则变化'] = ans_list
-
-    # 八、名词单复数不规则变化
-    add_question_header(doc, '八', '名词单复数不规则变化（写出下列名词的复数形式）')
-    ans_list = []
-    for i, (singular, plural, rule) in enumerate(DAY7_NOUN_PLURAL_IRREGULAR[:noun_irregular], 1):
-        add_question(doc, f'{i}. {singular} → _______')
-        ans_list.append(f'{i}. {plural}（{rule}）')
-    answers['八、名词单复数不规则变化'] = ans_list
-
-    # ========== 第二部分：易混辨析 ==========
-    add_section_title(doc, '第二部分：易混辨析（15分钟）')
-
-    # 九、in/on/at 时间用法辨析
-    add_question_header(doc, '九', 'in/on/at 时间用法辨析（填入正确的介词）')
-    ans_list = []
-    for i, (sent, ans, reason) in enumerate(DAY7_TIME_PREPOSITION[:time_prep], 1):
-        add_question(doc, f'{i}. {sent}')
-        ans_list.append(f'{i}. {ans}（{reason}）')
-    answers['九、in/on/at 时间用法辨析'] = ans_list
-
-    # 十、this/that/these/those 辨析
-    add_question_header(doc, '十', 'this/that/these/those 辨析（填入正确的指示代词）')
-    ans_list = []
-    for i, (sent, ans, reason) in enumerate(DAY7_DEMONSTRATIVE[:demonstrative], 1):
-        add_question(doc, f'{i}. {sent}')
-        ans_list.append(f'{i}. {ans}（{reason}）')
-    answers['十、this/that/these/those 辨析'] = ans_list
-
-    # 十一、代词易错题
-    add_question_header(doc, '十一', '代词易错题（找出错误并改正）')
-    ans_list = []
-    for i, (sent, correction, reason) in enumerate(DAY7_PRONOUN_ERRORS[:pronoun_errors], 1):
-        add_question(doc, f'{i}. {sent}')
-        add_question(doc, '   错误：_______ → 改正：_______')
-        ans_list.append(f'{i}. {correction}（{reason}）')
-    answers['十一、代词易错题'] = ans_list
-
-    # ========== 第三部分：综合练习 ==========
-    add_section_title(doc, '第三部分：综合练习（15分钟）')
-
-    # 十二、介词填空综合练习
-    add_question_header(doc, '十二', '介词填空综合练习（填入正确的介词 in/on/at/by）')
-    ans_list = []
-    for i, (sent, ans, reason) in enumerate(DAY7_PREPOSITION_FILL[:prep_fill], 1):
-        add_question(doc, f'{i}. {sent}')
-        ans_list.append(f'{i}. {ans}（{reason}）')
-    answers['十二、介词填空综合练习'] = ans_list
-
-    # 十三、代词替换练习
-    add_question_header(doc, '十三', '代词替换练习（用代词替换划线部分）')
-    ans_list = []
-    for i, (original, replaced, tip) in enumerate(DAY7_PRONOUN_REPLACE[:pronoun_replace], 1):
-        add_question(doc, f'{i}. {original}')
-        add_question(doc, '   → _______________________')
-        ans_list.append(f'{i}. {replaced}（{tip}）')
-    answers['十三、代词替换练习'] = ans_list
-
-    # 十四、名词单复数转换练习
-    add_question_header(doc, '十四', '名词单复数转换练习（写出正确的复数形式）')
-    ans_list = []
-    for i, (sent, ans, rule) in enumerate(DAY7_NOUN_CONVERT[:noun_convert], 1):
-        add_question(doc, f'{i}. {sent}')
-        ans_list.append(f'{i}. {ans}（{rule}）')
-    answers['十四、名词单复数转换练习'] = ans_list
+# 天数 -> 规格
+DAY_SPECS = {spec['day']: spec for spec in (
+    DAY2_SPEC, DAY3_SPEC, DAY4_SPEC, DAY5_SPEC, DAY6_SPEC,
+    DAY7_SPEC, DAY8_SPEC, DAY9_SPEC, DAY10_SPEC,
+)}
 
-    add_answer_section(doc, answers)
-    doc.save(output_path)
-    print(f'已生成: {output_path}')
 
+# ============ 各天生成函数 ============
 
-# ============ 生成第8天文档函数 ============
+def generate_day2_doc(version, output_path, backend='docx', reproducible=False):
+    """生成第2天词汇基础练习题"""
+    generate_from_spec(DAY2_SPEC, version, output_path, backend, reproducible)
 
-def generate_day8_doc(version, output_path):
-    """生成第8天阅读专项（完形填空+阅读理解基础）练习题"""
-    doc = Document()
-
-    # 根据版本确定内容
-    if version == '简洁版':
-        tips_count = 3
-        cloze_count = 1  # 完形填空篇数
-        reading_count = 1  # 阅读理解篇数
-        guess_count = 3
-    elif version == '完整版':
-        tips_count = 5
-        cloze_count = 1
-        reading_count = 2
-        guess_count = 4
-    else:  # 充实版
-        tips_count = 7
-        cloze_count = 2
-        reading_count = 2
-        guess_count = 6
-
-    add_title(doc, '小学六年级英语练习题【阅读专项：完形填空+阅读理解】', f'（基础+提升）第8天 - {version}')
 
-    answers = {}
+def generate_day3_doc(version, output_path, backend='docx', reproducible=False):
+    """生成第3天句型基础练习题"""
+    generate_from_spec(DAY3_SPEC, version, output_path, backend, reproducible)
 
-    # ========== 第一部分：阅读技巧 ==========
-    add_section_title(doc, '第一部分：阅读技巧（20分钟）')
-
-    # 一、阅读技巧知识点
-    add_question_header(doc, '一', '阅读技巧知识点（请认真阅读并记忆）')
-    for i, (tip, explanation, category) in enumerate(DAY8_READING_TIPS[:tips_count], 1):
-        add_question(doc, f'{i}. 【{category}】{tip}')
-        add_question(doc, f'   说明：{explanation}')
-    answers['一、阅读技巧知识点'] = ['请认真阅读并记忆以上技巧']
-
-    # 二、猜词义练习
-    add_question_header(doc, '二', '猜词义练习（根据上下文猜测划线单词的意思）')
-    ans_list = []
-    for i, (sent, word, meaning, reason) in enumerate(DAY8_GUESS_WORD[:guess_count], 1):
-        add_question(doc, f'{i}. {sent}')
-        add_question(doc, f'   "{word}" 的意思是：_______')
-        ans_list.append(f'{i}. {meaning}（{reason}）')
-    answers['二、猜词义练习'] = ans_list
-
-    # ========== 第二部分：题型练习 ==========
-    add_section_title(doc, '第二部分：题型练习（25分钟）')
-
-    # 三、完形填空
-    add_question_header(doc, '三', '完形填空（阅读短文，选择最佳答案）')
-    ans_list = []
-    cloze_data = [DAY8_CLOZE_1, DAY8_CLOZE_2][:cloze_count]
-    q_num = 1
-    for cloze in cloze_data:
-        add_question(doc, f'【{cloze["title"]}】', indent=False)
-        for line in cloze['passage'].split('\n'):
-            if line.strip():
-                add_question(doc, line)
-        doc.add_paragraph()
-        for q, options, ans, reason in cloze['questions']:
-            add_question(doc, f'{q_num}. {q}')
-            add_question(doc, f'   {options}')
-            ans_list.append(f'{q_num}. {ans}（{reason}）')
-            q_num += 1
-        doc.add_paragraph()
-    answers['三、完形填空'] = ans_list
 
-    # 四、阅读理解
-    add_question_header(doc, '四', '阅读理解（阅读短文，选择最佳答案）')
-    ans_list = []
-    reading_data = [DAY8_READING_1, DAY8_READING_2][:reading_count]
-    q_num = 1
-    for reading in reading_data:
-        add_question(doc, f'【{reading["title"]}】', indent=False)
-        for line in reading['passage'].split('\n'):
-            if line.strip():
-                add_question(doc, line)
-        doc.add_paragraph()
-        for q, options, ans, reason in reading['questions']:
-            add_question(doc, f'{q_num}. {q}')
-            add_question(doc, f'   {options}')
-            ans_list.append(f'{q_num}. {ans}（{reason}）')
-            q_num += 1
-        doc.add_paragraph()
-    answers['四、阅读理解'] = ans_list
-
-    # ========== 第三部分：讲解复盘 ==========
-    add_section_title(doc, '第三部分：讲解复盘（5分钟）')
-
-    add_question_header(doc, '五', '错题分析与技巧总结')
-    add_question(doc, '完形填空技巧：', indent=False)
-    add_question(doc, '1. 先通读全文，了解大意')
-    add_question(doc, '2. 注意固定搭配和习惯用法')
-    add_question(doc, '3. 根据上下文逻辑选择答案')
-    add_question(doc, '4. 做完后再读一遍，检查是否通顺')
-    doc.add_paragraph()
-    add_question(doc, '阅读理解技巧：', indent=False)
-    add_question(doc, '1. 先看题目，带着问题读文章')
-    add_question(doc, '2. 圈画关键词：时间、人物、数字、地点')
-    add_question(doc, '3. 答案一定在原文中能找到依据')
-    add_question(doc, '4. 注意转折词后面的内容')
-    answers['五、错题分析与技巧总结'] = ['请认真阅读以上技巧总结']
+def generate_day4_doc(version, output_path, backend='docx', reproducible=False):
+    """生成第4天特殊疑问句+情景交际练习题"""
+    generate_from_spec(DAY4_SPEC, version, output_path, backend, reproducible)
 
-    add_answer_section(doc, answers)
-    doc.save(output_path)
-    print(f'已生成: {output_path}')
 
+def generate_day5_doc(version, output_path, backend='docx', reproducible=False):
+    """生成第5天语法专项（一般现在时）练习题"""
+    generate_from_spec(DAY5_SPEC, version, output_path, backend, reproducible)
 
-# ============ 生成第9天文档函数 ============
 
-def generate_day9_doc(version, output_path):
-    """生成第9天写作专项（小作文·审题+句型+书写）练习题"""
-    doc = Document()
-
-    # 根据版本确定内容
-    if version == '简洁版':
-        tips_count = 3
-        opening_count, body_count, ending_count = 4, 5, 4
-        errors_count = 4
-        topics_count = 1
-    elif version == '完整版':
-        tips_count = 4
-        opening_count, body_count, ending_count = 6, 7, 6
-        errors_count = 6
-        topics_count = 2
-    else:  # 充实版
-        tips_count = 5
-        opening_count, body_count, ending_count = 8, 10, 8
-        errors_count = 8
-        topics_count = 2
-
-    add_title(doc, '小学六年级英语练习题【写作专项：审题+句型+书写】', f'（基础+提升）第9天 - {version}')
+def generate_day6_doc(version, output_path, backend='docx', reproducible=False):
+    """生成第6天语法专项（一般过去时+一般将来时）练习题"""
+    generate_from_spec(DAY6_SPEC, version, output_path, backend, reproducible)
 
-    answers = {}
 
-    # ========== 第一部分：审题技巧 ==========
-    add_section_title(doc, '第一部分：审题技巧（15分钟）')
-
-    # 一、审题技巧
-    add_question_header(doc, '一', '审题技巧（请认真阅读并记忆）')
-    for i, (tip, explanation, category) in enumerate(DAY9_WRITING_TIPS[:tips_count], 1):
-        add_question(doc, f'{i}. 【{tip}】{explanation}')
-    answers['一、审题技巧'] = ['请认真阅读并记忆以上技巧']
-
-    # 二、写作框架
-    add_question_header(doc, '二', '写作框架（开头-中间-结尾）')
-    add_question(doc, '一篇好的作文应该包含三个部分：', indent=False)
-    add_question(doc, '1. 开头（Opening）：引出话题，点明主题')
-    add_question(doc, '2. 中间（Body）：详细描述，展开内容')
-    add_question(doc, '3. 结尾（Ending）：总结感受，呼应开头')
-    answers['二、写作框架'] = ['开头-中间-结尾三段式结构']
-
-    # ========== 第二部分：句型积累 ==========
-    add_section_title(doc, '第二部分：句型积累（10分钟）')
-
-    # 三、常用开头句
-    add_question_header(doc, '三', '常用开头句（请背诵并仿写）')
-    ans_list = []
-    for i, (en, cn, usage) in enumerate(DAY9_OPENING_SENTENCES[:opening_count], 1):
-        add_question(doc, f'{i}. {en}')
-        add_question(doc, f'   中文：{cn}（{usage}）')
-        ans_list.append(f'{i}. {en} - {cn}')
-    answers['三、常用开头句'] = ans_list
-
-    # 四、常用中间句
-    add_question_header(doc, '四', '常用中间句（描述句型）')
-    ans_list = []
-    for i, (en, cn, usage) in enumerate(DAY9_BODY_SENTENCES[:body_count], 1):
-        add_question(doc, f'{i}. {en}')
-        add_question(doc, f'   中文：{cn}（{usage}）')
-        ans_list.append(f'{i}. {en} - {cn}')
-    answers['四、常用中间句'] = ans_list
-
-    # 五、常用结尾句
-    add_question_header(doc, '五', '常用结尾句')
-    ans_list = []
-    for i, (en, cn, usage) in enumerate(DAY9_ENDING_SENTENCES[:ending_count], 1):
-        add_question(doc, f'{i}. {en}')
-        add_question(doc, f'   中文：{cn}（{usage}）')
-        ans_list.append(f'{i}. {en} - {cn}')
-    answers['五、常用结尾句'] = ans_list
-
-    # 六、写作常见错误
-    add_question_header(doc, '六', '写作常见错误（找出错误并改正）')
-    ans_list = []
-    for i, (wrong, correct, reason) in enumerate(DAY9_WRITING_ERRORS[:errors_count], 1):
-        add_question(doc, f'{i}. 错误：{wrong}')
-        add_question(doc, '   改正：_______________________')
-        ans_list.append(f'{i}. {correct}（{reason}）')
-    answers['六、写作常见错误'] = ans_list
-
-    # ========== 第三部分：写作实战 ==========
-    add_section_title(doc, '第三部分：写作实战（25分钟）')
-
-    topics = [DAY9_WRITING_TOPIC_1, DAY9_WRITING_TOPIC_2][:topics_count]
-    ans_list = []
-    for idx, topic in enumerate(topics, 7):
-        add_question_header(doc, '七' if idx == 7 else '八', f'写作题目：{topic["title"]}')
-        add_question(doc, f'要求：{topic["requirements"]}', indent=False)
-        add_question(doc, '提示：', indent=False)
-        for hint in topic['hints']:
-            add_question(doc, f'• {hint}')
-        add_question(doc, '写作框架：', indent=False)
-        add_question(doc, f'• 开头：{topic["outline"]["opening"]}')
-        add_question(doc, f'• 中间：{topic["outline"]["body"]}')
-        add_question(doc, f'• 结尾：{topic["outline"]["ending"]}')
-        doc.add_paragraph()
-        add_question(doc, '请在下面写作：', indent=False)
-        add_question(doc, '_' * 50)
-        add_question(doc, '_' * 50)
-        add_question(doc, '_' * 50)
-        add_question(doc, '_' * 50)
-        add_question(doc, '_' * 50)
-        doc.add_paragraph()
-        ans_list.append(f'【{topic["title"]} 范文】')
-        ans_list.append(topic['sample'])
-
-    answers['七、写作实战'] = ans_list
+def generate_day7_doc(version, output_path, backend='docx', reproducible=False):
+    """生成第7天语法专项（介词+代词+名词单复数）练习题"""
+    generate_from_spec(DAY7_SPEC, version, output_path, backend, reproducible)
 
-    add_answer_section(doc, answers)
-    doc.save(output_path)
-    print(f'已生成: {output_path}')
 
+def generate_day8_doc(version, output_path, backend='docx', reproducible=False):
+    """生成第8天阅读专项（完形填空+阅读理解基础）练习题"""
+    generate_from_spec(DAY8_SPEC, version, output_path, backend, reproducible)
+
+
+def generate_day9_doc(version, output_path, backend='docx', reproducible=False):
+    """生成第9天写作专项（小作文·审题+句型+书写）练习题"""
+    generate_from_spec(DAY9_SPEC, version, output_path, backend, reproducible)
 
-# ============ 生成第10天文档函数 ============
 
-def generate_day10_doc(version, output_path):
+def generate_day10_doc(version, output_path, backend='docx', reproducible=False):
     """生成第10天综合模考+错题复盘+知识梳理练习题"""
-    doc = Document()
+    generate_from_spec(DAY10_SPEC, version, output_path, backend, reproducible)
 
-    # 根据版本确定内容
-    if version == '简洁版':
-        vocab_count = 8
-        grammar_count = 10
-    elif version == '完整版':
-        vocab_count = 12
-        grammar_count = 15
-    else:  # 充实版
-        vocab_count = 15
-        grammar_count = 20
 
-    add_title(doc, '小学六年级英语练习题【综合模考+错题复盘+知识梳理】', f'（基础+提升）第10天 - {version}')
+# ============ 题库快照 ============
 
-    answers = {}
+# 题库常量名：DAY<天数>_<名称>
+_BANK_NAME = re.compile(r'DAY\d+_')
+
+_SNAPSHOT_MAGIC = b'EXBANK01'
+
+
+def question_banks(namespace=None):
+    """模块中所有列表形式的题库常量：名称 -> 列表"""
+    namespace = globals() if namespace is None else namespace
+    return {name: value for name, value in namespace.items()
+            if _BANK_NAME.match(name) and isinstance(value, list)}
+
+
+def _column_kind(values):
+    """列类型：'s' 为纯字符串列，'j' 为 JSON 编码的嵌套结构"""
+    return 's' if all(isinstance(value, str) for value in values) else 'j'
+
+
+def _as_tuple(value):
+    return tuple(map(_as_tuple, value)) if isinstance(value, list) else value
+
+
+def _decode_field(value):
+    """JSON 读回的字段还原为源码中题库的写法：字段本身是列表，其中的序列是元组"""
+    return [_as_tuple(element) for element in value] if isinstance(value, list) else value
+
+
+def _check_decodable(name, items):
+    """编译前检查题库经 JSON 读回后与原条目相同，写法不符合约定时抛出 ValueError"""
+    for position, item in enumerate(items):
+        if tuple(map(_decode_field, json.loads(json.dumps(item, ensure_ascii=False)))) != item:
+            raise ValueError(f'题库 {name} 第 {position} 条读回后与原条目不同'
+                             '（条目应为元组，嵌套的列表中应为元组）')
+
+
+def _pad4(f):
+    f.write(b'\0' * (-f.tell() % 4))
+
+
+def compile_bank_snapshot(path, banks=None):
+    """把题库编译成列式二进制快照
+
+    文件结构：魔数 | 目录偏移 | 字符串偏移数组 | 字符串数据 | 各题库各字段的
+    字符串编号列 | JSON 目录。字符串去重后统一存放，数组均为 4 字节对齐的
+    小端 uint32，可以通过 mmap 直接读取。
+    """
+    banks = question_banks() if banks is None else banks
+    strings, string_ids = [], {}
+
+    def intern(value):
+        index = string_ids.get(value)
+        if index is None:
+            index = string_ids[value] = len(strings)
+            strings.append(value)
+        return index
+
+    columns = {}
+    for name, items in banks.items():
+        width = len(items[0]) if items else 0
+        if any(len(item) != width for item in items):
+            raise ValueError(f'题库 {name} 的条目字段数不一致')
+        _check_decodable(name, items)
+        fields = [[item[i] for item in items] for i in range(width)]
+        kinds = ''.join(_column_kind(values) for values in fields)
+        ids = [[intern(value if kind == 's' else json.dumps(value, ensure_ascii=False))
+                for value in values]
+               for kind, values in zip(kinds, fields)]
+        columns[name] = (len(items), kinds, ids, _digest(repr(items)))
+
+    blob = io.BytesIO()
+    offsets = [0]
+    for value in strings:
+        blob.write(value.encode('utf-8'))
+        offsets.append(blob.tell())
+
+    directory = {'strings': {'count': len(strings)}, 'banks': {}}
+    with open(path, 'wb') as f:
+        f.write(_SNAPSHOT_MAGIC)
+        f.write(struct.pack('<Q', 0))
+        directory['strings']['offsets'] = f.tell()
+        f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        directory['strings']['blob'] = f.tell()
+        f.write(blob.getvalue())
+        for name, (count, kinds, ids, digest) in columns.items():
+            column_offsets = []
+            for column in ids:
+                _pad4(f)
+                column_offsets.append(f.tell())
+                f.write(struct.pack(f'<{count}I', *column))
+            directory['banks'][name] = {'count': count, 'kinds': kinds,
+                                        'columns': column_offsets, 'digest': digest}
+        directory_offset = f.tell()
+        f.write(json.dumps(directory, ensure_ascii=False).encode('utf-8'))
+        f.seek(len(_SNAPSHOT_MAGIC))
+        f.write(struct.pack('<Q', directory_offset))
+
+
+class BankSnapshot:
+    """通过 mmap 打开的题库快照，条目按需解码"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(_SNAPSHOT_MAGIC)] != _SNAPSHOT_MAGIC:
+            raise ValueError(f'不是题库快照文件: {path}')
+        self._view = memoryview(self._mm)
+        (directory_offset,) = struct.unpack_from('<Q', self._mm, len(_SNAPSHOT_MAGIC))
+        self._directory = json.loads(bytes(self._mm[directory_offset:]).decode('utf-8'))
+        strings = self._directory['strings']
+        self._offsets = self._u32(strings['offsets'], strings['count'] + 1)
+        self._blob = strings['blob']
+
+    def _u32(self, offset, count):
+        """零拷贝读取 uint32 数组"""
+        view = self._view[offset:offset + 4 * count]
+        if sys.byteorder == 'little':
+            return view.cast('I')
+        return struct.unpack_from(f'<{count}I', view)
+
+    def string(self, index):
+        start = self._blob + self._offsets[index]
+        end = self._blob + self._offsets[index + 1]
+        return str(self._view[start:end], 'utf-8')
+
+    def names(self):
+        return list(self._directory['banks'])
+
+    def __contains__(self, name):
+        return name in self._directory['banks']
+
+    def __getitem__(self, name):
+        return SnapshotBank(self, name, self._directory['banks'][name])
+
+
+class SnapshotBank(collections.abc.Sequence):
+    """快照中的单个题库，用法与原来的元组列表相同（支持 len、下标、切片、迭代）"""
+
+    def __init__(self, snapshot, name, meta, indices=None):
+        self._snapshot = snapshot
+        self._name = name
+        self._meta = meta
+        self._kinds = meta['kinds']
+        self._columns = [snapshot._u32(offset, meta['count']) for offset in meta['columns']]
+        self._indices = range(meta['count']) if indices is None else indices
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SnapshotBank(self._snapshot, self._name, self._meta, self._indices[index])
+        row = self._indices[index]
+        string = self._snapshot.string
+        return tuple(string(column[row]) if kind == 's'
+                     else _decode_field(json.loads(string(column[row])))
+                     for kind, column in zip(self._kinds, self._columns))
+
+    def __repr__(self):
+        # 构建清单用 repr 计算题库指纹，这里用编译时记录的内容哈希代替逐条展开
+        return (f'SnapshotBank({self._name!r}, digest={self._meta["digest"]!r}, '
+                f'rows={self._indices.start}:{self._indices.stop}:{self._indices.step})')
+
+
+# 当前进程替换题库所用的来源：[(类型, 路径)]，按加载顺序记录
+_bank_sources = []
+
+
+def use_bank_snapshot(path):
+    """用快照中的题库替换模块里的同名题库常量"""
+    snapshot = BankSnapshot(path)
+    module_globals = globals()
+    for name in snapshot.names():
+        module_globals[name] = snapshot[name]
+    _bank_sources.append(('snapshot', path))
+    return snapshot
+
+
+def use_bank_sources(sources):
+    """按顺序重新加载题库来源
+
+    用于进程池的 initializer：以 spawn 方式启动的工作进程（macOS、Windows 的
+    默认方式）不继承父进程替换过的题库，需要按父进程的 _bank_sources 重新加载。
+    """
+    for kind, path in sources:
+        if kind == 'snapshot':
+            use_bank_snapshot(path)
+        elif kind == 'db':
+            use_bank_db(path)
+
+
+# ============ 题库数据库 ============
+
+BANK_DB_SCHEMA = '''
+CREATE TABLE banks (
+    name TEXT PRIMARY KEY,
+    day INTEGER NOT NULL,
+    section TEXT,
+    count INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE items (
+    bank TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    section TEXT,
+    knowledge_point TEXT,
+    difficulty INTEGER NOT NULL,
+    fields TEXT NOT NULL,
+    PRIMARY KEY (bank, position)
+) WITHOUT ROWID;
+CREATE INDEX items_day_section ON items (day, section);
+CREATE INDEX items_knowledge_point ON items (knowledge_point, day);
+CREATE INDEX items_difficulty ON items (day, difficulty);
+'''
+
+# 答案模板中括号里的字段就是该题考查的知识点（规则说明），如 '{i}. {1}（{2}）'
+_POINT_FIELD = re.compile(r'（\{(\d+)\}）')
+
+
+def bank_metadata():
+    """从各天规格推导题库的元数据：名称 -> (小节, 知识点字段序号, 各版本题量)"""
+    meta = {}
+    for spec in DAY_SPECS.values():
+        for block in spec['blocks']:
+            if 'bank' not in block:
+                continue
+            answer = block.get('answer')
+            match = _POINT_FIELD.search(answer) if isinstance(answer, str) else None
+            meta[block['bank']] = (f'{block["number"]}、{block["key"]}',
+                                   int(match.group(1)) if match else None,
+                                   block.get('counts'))
+    return meta
+
+
+def _difficulty(position, counts):
+    """难度 1/2/3：题目最早出现在简洁版/完整版/充实版"""
+    if counts is None:
+        return 1
+    for level, count in enumerate(counts, 1):
+        if position < count:
+            return level
+    return len(counts)
+
+
+def compile_bank_db(path, banks=None):
+    """把题库写入 SQLite 数据库（已存在的文件会被替换）"""
+    banks = question_banks() if banks is None else banks
+    meta = bank_metadata()
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(BANK_DB_SCHEMA)
+        with conn:
+            for name, items in banks.items():
+                _check_decodable(name, items)
+                day = int(re.match(r'DAY(\d+)_', name).group(1))
+                section, point_field, counts = meta.get(name, (None, None, None))
+                conn.execute('INSERT INTO banks VALUES (?, ?, ?, ?, ?)',
+                             (name, day, section, len(items), _digest(repr(items))))
+                conn.executemany(
+                    'INSERT INTO items VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    ((name, position, day, section,
+                      item[point_field] if point_field is not None else None,
+                      _difficulty(position, counts),
+                      json.dumps(item, ensure_ascii=False))
+                     for position, item in enumerate(items)))
+        conn.execute('ANALYZE')
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+
+
+class BankDatabase:
+    """SQLite 题库；打开时只读取题库目录，条目按需查询"""
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f'题库数据库不存在: {path}')
+        self.path = path
+        self._conn = None
+        self._pid = None
+        rows = self._execute('SELECT name, count, digest FROM banks')
+        self._banks = {name: (count, digest) for name, count, digest in rows}
+
+    def _execute(self, sql, params=()):
+        # 每个进程使用自己的连接（fork 出的子进程不能复用父进程的连接）
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('PRAGMA query_only = 1')
+            self._pid = os.getpid()
+        return self._conn.execute(sql, params)
+
+    def names(self):
+        return list(self._banks)
+
+    def __contains__(self, name):
+        return name in self._banks
+
+    def __getitem__(self, name):
+        count, digest = self._banks[name]
+        return DatabaseBank(self, name, digest, range(count))
+
+    def rows(self, name, start, stop):
+        """按位置区间读取条目（走主键索引）"""
+        cursor = self._execute(
+            'SELECT fields FROM items WHERE bank = ? AND position >= ? AND position < ? '
+            'ORDER BY position', (name, start, stop))
+        return [tuple(map(_decode_field, json.loads(fields))) for (fields,) in cursor]
+
+    def select(self, bank=None, day=None, section=None, knowledge_point=None,
+               difficulty=None, limit=None):
+        """按条件查询条目，返回 (题库名, 位置, 条目) 列表；difficulty 为最高难度"""
+        conditions, params = [], []
+        for column, value in (('bank', bank), ('day', day), ('section', section),
+                              ('knowledge_point', knowledge_point)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        if difficulty is not None:
+            conditions.append('difficulty <= ?')
+            params.append(difficulty)
+        sql = 'SELECT bank, position, fields FROM items'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY day, bank, position'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [(name, position, tuple(map(_decode_field, json.loads(fields))))
+                for name, position, fields in self._execute(sql, params)]
+
+
+class DatabaseBank(collections.abc.Sequence):
+    """数据库中的单个题库，用法与原来的元组列表相同；切片不查询，迭代时一次读取区间"""
+
+    def __init__(self, db, name, digest, positions):
+        self._db = db
+        self._name = name
+        self._digest = digest
+        self._positions = positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return DatabaseBank(self._db, self._name, self._digest, self._positions[index])
+        position = self._positions[index]
+        return self._db.rows(self._name, position, position + 1)[0]
+
+    def __iter__(self):
+        positions = self._positions
+        if not positions:
+            return iter(())
+        if positions.step == 1:
+            return iter(self._db.rows(self._name, positions.start, positions.stop))
+        return (self[i] for i in range(len(positions)))
+
+    def __repr__(self):
+        # 与快照题库相同，构建清单用内容哈希代替逐条展开
+        return (f'DatabaseBank({self._name!r}, digest={self._digest!r}, '
+                f'rows={self._positions.start}:{self._positions.stop}:{self._positions.step})')
+
+
+def use_bank_db(path):
+    """用数据库中的题库替换模块里的同名题库常量"""
+    db = BankDatabase(path)
+    module_globals = globals()
+    for name in db.names():
+        module_globals[name] = db[name]
+    _bank_sources.append(('db', path))
+    return db
+
+
+# ============ 主函数 ============
+
+VERSIONS = ['简洁版', '完整版', '充实版']
+
+# 每天的文档：(天数, 文件名主题, 生成函数)
+DAY_DOCS = [
+    (2, '词汇基础', generate_day2_doc),
+    (3, '句型基础', generate_day3_doc),
+    (4, '特殊疑问句与情景交际', generate_day4_doc),
+    (5, '语法专项_一般现在时', generate_day5_doc),
+    (6, '语法专项_一般过去时与将来时', generate_day6_doc),
+    (7, '语法专项_介词代词名词单复数', generate_day7_doc),
+    (8, '阅读专项_完形填空与阅读理解', generate_day8_doc),
+    (9, '写作专项_审题句型书写', generate_day9_doc),
+    (10, '综合模考与知识梳理', generate_day10_doc),
+]
+
+
+# 输出后端 -> 文件扩展名（其余后端都输出 .docx）
+DOCUMENT_EXTENSIONS = {'pdf': '.pdf', 'html': '.html'}
+
+
+def document_extension(backend):
+    """输出后端对应的文件扩展名"""
+    return DOCUMENT_EXTENSIONS.get(backend, '.docx')
+
+
+def output_filename(day, topic, version, backend='docx'):
+    """文档文件名"""
+    return f'第{day}天_{topic}_{version}{document_extension(backend)}'
+
+
+def _run_captured(func, *args):
+    """执行任务并捕获输出，错误不向外抛出
+
+    返回 (日志, 错误信息, 片段缓存统计增量, 剖析区间, 内存统计)。
+    """
+    log = io.StringIO()
+    error = None
+    if _memory is not None:
+        _memory.begin()
+    before = fragment_cache.stats()
+    with contextlib.redirect_stdout(log):
+        try:
+            func(*args)
+        except Exception:
+            error = traceback.format_exc()
+    after = fragment_cache.stats()
+    stats = {key: after[key] - before[key] for key in ('hits', 'disk_hits', 'misses')}
+    memory = _memory.end() if _memory is not None else None
+    return log.getvalue(), error, stats, take_profile_events(), memory
+
+
+def _init_worker(cache_size, cache_dir=None, bank_sources=(), profile=False, memory=False):
+    """工作进程初始化：片段缓存配置、题库来源、剖析与内存统计开关"""
+    configure_fragment_cache(cache_size, cache_dir)
+    use_bank_sources(bank_sources)
+    enable_profiling(profile)
+    enable_memory_tracking(memory)
+
+
+def _generate_one(generate, version, output_path, backend, reproducible):
+    generate(version, output_path, backend=backend, reproducible=reproducible)
+
+
+def run_job(generate, version, output_path, backend='docx', reproducible=False):
+    """执行单个生成任务"""
+    return _run_captured(_generate_one, generate, version, output_path, backend, reproducible)
+
+
+# ============ 增量构建清单 ============
+
+MANIFEST_NAME = '.build_manifest.json'
+
+
+def _digest(*parts):
+    """对若干字符串计算 sha256"""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _code_names(code):
+    """收集函数（含内部推导式等嵌套代码）引用的全局名"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+    return names
+
+
+def generator_spec(generate):
+    """生成函数使用的规格，没有时返回 None"""
+    for name in _code_names(generate.__code__):
+        if name.endswith('_SPEC') and name in generate.__globals__:
+            return generate.__globals__[name]
+    return None
+
+
+def bank_names(generate):
+    """生成函数（及其规格）读取的题库常量名"""
+    module_globals = generate.__globals__
+    names = _code_names(generate.__code__)
+    spec = generator_spec(generate)
+    if spec is not None:
+        names.update(spec_banks(spec))
+    return sorted(name for name in names if _BANK_NAME.match(name)
+                  and not name.endswith('_SPEC') and name in module_globals)
+
+
+# 作为常量计入渲染代码指纹的值类型（可变容器只在其中查找函数，缓存等运行时状态不计入）
+_CONSTANT_TYPES = (str, bytes, int, float, bool, type(None), tuple, frozenset)
+
+
+def renderer_code(roots):
+    """roots 传递引用的本模块函数、类和常量：[(名称, 源码或常量表示)]
+
+    从生成函数出发，沿函数（含类的方法和基类）引用的全局名逐个展开；全局
+    字典/列表（如块类型分派表、规格）中的函数也一并展开。题库数据由清单
+    按题库单独记录，不计入。
+    """
+    module_globals = globals()
+    code, seen = set(), set()
+    stack = list(roots)
+    while stack:
+        obj = inspect.unwrap(stack.pop())
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, (dict, list, tuple)):
+            values = obj.values() if isinstance(obj, dict) else obj
+            stack.extend(value for value in values
+                         if callable(value) or isinstance(value, (dict, list, tuple)))
+            continue
+        if getattr(obj, '__module__', None) != __name__:
+            continue
+        code.add((obj.__qualname__, inspect.getsource(obj)))
+        if inspect.isclass(obj):
+            stack.extend(obj.__bases__)
+            members = [inspect.unwrap(getattr(member, 'fget', None) or getattr(
+                member, '__func__', member)) for member in vars(obj).values()]
+            codes = [member.__code__ for member in members if inspect.isfunction(member)]
+        elif inspect.isfunction(obj):
+            codes = [obj.__code__]
+        else:
+            continue
+        for name in set().union(*map(_code_names, codes)):
+            if name not in module_globals or (_BANK_NAME.match(name) and not name.endswith('_SPEC')):
+                continue
+            value = module_globals[name]
+            if isinstance(value, re.Pattern):
+                code.add((name, repr(value.pattern)))
+            elif isinstance(value, _CONSTANT_TYPES):
+                code.add((name, repr(value)))
+            elif callable(value) or isinstance(value, (dict, list)):
+                stack.append(value)
+    return sorted(code)
+
+
+@functools.lru_cache(maxsize=None)
+def renderer_digest():
+    """渲染代码、样式定义和模板内容的哈希（各天生成函数和多版本渲染传递引用的全部代码）"""
+    roots = [generate for _, _, generate in DAY_DOCS] + [generate_tiers, normalize_package]
+    parts = [f'{name}\n{source}' for name, source in renderer_code(roots)]
+    parts.append(repr(EXERCISE_STYLES))
+    if BASE_TEMPLATE:
+        with open(BASE_TEMPLATE, 'rb') as f:
+            parts.append(hashlib.sha256(f.read()).hexdigest())
+    return _digest(*parts)
+
+
+def job_inputs(generate, backend, reproducible=False):
+    """单个文档的全部输入指纹（规格里包含各版本的题量与模板）"""
+    module_globals = generate.__globals__
+    spec = generator_spec(generate)
+    return {
+        'banks': {name: _digest(repr(module_globals[name])) for name in bank_names(generate)},
+        'generator': _digest(inspect.getsource(generate),
+                             _fingerprint(spec) if spec is not None else ''),
+        'renderer': renderer_digest(),
+        'python-docx': docx.__version__,
+        'backend': backend,
+        'reproducible': reproducible,
+        'timestamp': reproducible_timestamp() if reproducible else None,
+    }
+
+
+# 清单字段 -> 变化时的说明
+_INPUT_LABELS = {
+    'generator': '生成函数或规格（题量/模板）变化',
+    'renderer': '渲染代码变化',
+    'python-docx': 'python-docx 版本变化',
+    'backend': '输出后端变化',
+    'reproducible': '可复现模式变化',
+    'timestamp': '可复现时间戳（SOURCE_DATE_EPOCH）变化',
+}
 
-    # ========== 第一部分：综合模考 ==========
-    add_section_title(doc, '第一部分：综合模考（30分钟）')
-
-    # 一、词汇部分
-    add_question_header(doc, '一', '词汇部分（填写正确的单词或短语）')
-    ans_list = []
-    for i, (question, ans, q_type, tip) in enumerate(DAY10_VOCAB_TEST[:vocab_count], 1):
-        add_question(doc, f'{i}. {question}')
-        ans_list.append(f'{i}. {ans}（{tip}）')
-    answers['一、词汇部分'] = ans_list
-
-    # 二、语法部分
-    add_question_header(doc, '二', '语法部分（用所给词的正确形式填空或选择）')
-    ans_list = []
-    for i, (question, ans, tip) in enumerate(DAY10_GRAMMAR_TEST[:grammar_count], 1):
-        add_question(doc, f'{i}. {question}')
-        ans_list.append(f'{i}. {ans}（{tip}）')
-    answers['二、语法部分'] = ans_list
-
-    # 三、阅读理解
-    add_question_header(doc, '三', '阅读理解（阅读短文，选择最佳答案）')
-    reading = DAY10_READING_TEST
-    add_question(doc, f'【{reading["title"]}】', indent=False)
-    for line in reading['passage'].split('\n'):
-        if line.strip():
-            add_question(doc, line)
-    doc.add_paragraph()
-    ans_list = []
-    for i, (q, options, ans, reason) in enumerate(reading['questions'], 1):
-        add_question(doc, f'{i}. {q}')
-        add_question(doc, f'   {options}')
-        ans_list.append(f'{i}. {ans}（{reason}）')
-    answers['三、阅读理解'] = ans_list
-
-    # 四、写作
-    add_question_header(doc, '四', f'写作：{DAY10_WRITING_TEST["title"]}')
-    add_question(doc, f'要求：{DAY10_WRITING_TEST["requirements"]}', indent=False)
-    add_question(doc, '提示：', indent=False)
-    for hint in DAY10_WRITING_TEST['hints']:
-        add_question(doc, f'• {hint}')
-    doc.add_paragraph()
-    add_question(doc, '请在下面写作：', indent=False)
-    add_question(doc, '_' * 50)
-    add_question(doc, '_' * 50)
-    add_question(doc, '_' * 50)
-    add_question(doc, '_' * 50)
-    answers['四、写作'] = ['请参考第9天范文格式自行评分']
-
-    # ========== 第二部分：快速批改 ==========
-    add_section_title(doc, '第二部分：快速批改（10分钟）')
-
-    add_question_header(doc, '五', '自批试卷（对照答案批改，标注错题类型）')
-    add_question(doc, '错题类型分类：', indent=False)
-    add_question(doc, '• 词汇类错误：短语搭配、单词拼写、名词复数等')
-    add_question(doc, '• 语法类错误：时态、人称代词、介词等')
-    add_question(doc, '• 阅读类错误：理解偏差、定位不准等')
-    doc.add_paragraph()
-    add_question(doc, '我的错题统计：', indent=False)
-    add_question(doc, '词汇类错误：_______ 题')
-    add_question(doc, '语法类错误：_______ 题')
-    add_question(doc, '阅读类错误：_______ 题')
-    answers['五、自批试卷'] = ['请自行统计错题数量']
-
-    # ========== 第三部分：复盘梳理 ==========
-    add_section_title(doc, '第三部分：复盘梳理（10分钟）')
-
-    # 六、10天学习要点回顾
-    add_question_header(doc, '六', '10天学习要点回顾')
-    for day, topic, content in DAY10_REVIEW_POINTS:
-        add_question(doc, f'【{day}】{topic}')
-        add_question(doc, f'   {content}')
-    answers['六、10天学习要点回顾'] = ['请认真复习以上知识点']
-
-    # 七、易错点汇总
-    add_question_header(doc, '七', '易错点汇总（重点巩固）')
-    ans_list = []
-    for i, (error_type, example, tip) in enumerate(DAY10_ERROR_SUMMARY, 1):
-        add_question(doc, f'{i}. 【{error_type}】')
-        add_question(doc, f'   例句：{example}')
-        add_question(doc, f'   注意：{tip}')
-        ans_list.append(f'{i}. {error_type}：{tip}')
-    answers['七、易错点汇总'] = ans_list
-
-    # 八、后续学习建议
-    add_question_header(doc, '八', '后续学习建议')
-    add_question(doc, '1. 每天复习错题本，巩固薄弱知识点')
-    add_question(doc, '2. 坚持每天背诵5-10个单词和短语')
-    add_question(doc, '3. 每周完成1-2篇阅读理解练习')
-    add_question(doc, '4. 每周写1篇小作文，积累常用句型')
-    add_question(doc, '5. 多听多读，培养语感')
-    answers['八、后续学习建议'] = ['请认真执行以上学习计划']
 
+def rebuild_reason(entry, inputs, output_path):
+    """返回需要重新生成的原因，无需重新生成时返回 None"""
+    if not os.path.exists(output_path):
+        return '输出文件不存在'
+    if entry is None:
+        return '清单中没有记录'
+    changed = [name for name, digest in inputs['banks'].items()
+               if entry['banks'].get(name) != digest]
+    changed += [name for name in entry['banks'] if name not in inputs['banks']]
+    reasons = [f'题库变化: {", ".join(changed)}'] if changed else []
+    reasons += [label for key, label in _INPUT_LABELS.items() if entry.get(key) != inputs[key]]
+    return '；'.join(reasons) or None
+
+
+def load_manifest(path):
+    """读取构建清单，不存在或损坏时返回空清单"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    """原子地写入构建清单"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+# ============ 多版本一次渲染 ============
+
+def _render_reusing(events, doc, rendered):
+    """同 render_paper，但 rendered（id(事件) -> 正文片段）中已有的事件直接复用片段"""
+    answers = {}
+    for event in events:
+        fragments = rendered.get(id(event))
+        if fragments is not None:
+            doc._body.extend(fragments)
+            continue
+        start = len(doc._body)
+        _render_event(doc, event, answers)
+        if event[0] in ('section', 'header', 'item', 'text'):
+            rendered[id(event)] = doc._body[start:]
     add_answer_section(doc, answers)
-    doc.save(output_path)
+
+
+def generate_tiers(spec, output_paths, backend='ooxml', reproducible=False):
+    """一次生成同一天的全部版本
+
+    选题只做一次（build_tiers），小版本的事件是充实版事件的前缀；ooxml 后端
+    先渲染充实版，其余版本直接拼接已渲染的段落片段，只重新输出标题和参考答案。
+    output_paths 为 版本 -> 输出路径。
+    """
+    if backend not in ('ooxml', 'stream'):
+        raise ValueError(f'多版本渲染只支持 ooxml/stream 后端: {backend}')
+    tiers = build_tiers(spec)
+    rendered = {}
+    for version in reversed(VERSIONS):
+        output_path = output_paths[version]
+        with profile_document(output_path):
+            doc = new_document(backend=backend, output_path=output_path)
+            if backend == 'ooxml':
+                _render_reusing(tiers[version], doc, rendered)
+            else:
+                render_paper(tiers[version], doc)
+            memory_checkpoint()
+            with profile_span('save'):
+                save_document(doc, output_path, reproducible)
+        print(f'已生成: {output_path}')
+
+
+def run_tiers_job(spec, output_paths, backend='ooxml', reproducible=False):
+    """执行单天多版本生成任务"""
+    return _run_captured(generate_tiers, spec, output_paths, backend, reproducible)
+
+
+# ============ 学生变体 ============
+
+def variant_seed(base_seed, student):
+    """学生的变体种子：只由基础种子和学生标识决定，与名单顺序、进程无关"""
+    digest = hashlib.sha256(f'{base_seed}:{student}'.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def load_roster(path):
+    """读取学生名单：每行一个学生（CSV 取第一列），忽略空行和 # 注释，重复的只保留一次"""
+    students = []
+    with open(path, encoding='utf-8-sig') as f:
+        for line in f:
+            student = line.split(',', 1)[0].strip()
+            if student and not student.startswith('#'):
+                students.append(student)
+    return list(dict.fromkeys(students))
+
+
+def safe_filename(text):
+    """把学生姓名等转为可用作文件名的形式"""
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', text)
+
+
+def variant_filename(day, topic, version, student, backend='docx'):
+    """学生变体的文件名"""
+    return f'第{day}天_{topic}_{version}_{safe_filename(student)}{document_extension(backend)}'
+
+
+def generate_variant(day, version, output_path, seed, backend='ooxml', reproducible=False):
+    """生成一份随机变体：题目抽取、题目顺序和选项顺序都由 seed 决定"""
+    doc = new_document(backend=backend, output_path=output_path)
+    render_spec(DAY_SPECS[day], version, doc, random.Random(seed))
+    save_document(doc, output_path, reproducible)
+
+
+def _variant_task(task):
+    """进程池任务，返回错误信息（成功时为 None）"""
+    try:
+        generate_variant(*task)
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+
+def generate_variants(day, version, roster, base_seed, output_dir, backend='ooxml',
+                      reproducible=False, jobs=1):
+    """为名单中的每个学生生成一份变体，并写出变体索引
+
+    返回 (索引, 失败列表)。索引记录每个学生的种子和文件名，之后可以据此
+    重新生成同一份试卷或答案。
+    """
+    topic = {d: t for d, t, _ in DAY_DOCS}[day]
+    students, tasks = {}, []
+    for student in roster:
+        seed = variant_seed(base_seed, student)
+        filename = variant_filename(day, topic, version, student, backend)
+        students[student] = {'seed': seed, 'file': filename}
+        tasks.append((day, version, os.path.join(output_dir, filename), seed,
+                      backend, reproducible))
+
+    if jobs > 1 and len(tasks) > 1:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=jobs, initializer=_init_worker,
+                initargs=(fragment_cache.maxsize, fragment_cache.directory,
+                          list(_bank_sources))) as pool:
+            errors = list(pool.map(_variant_task, tasks,
+                                   chunksize=max(1, len(tasks) // (jobs * 8))))
+    else:
+        errors = [_variant_task(task) for task in tasks]
+    failed = [(student, error) for student, error in zip(students, errors) if error]
+
+    index = {'day': day, 'version': version, 'base_seed': base_seed, 'students': students}
+    index_path = os.path.join(output_dir, f'第{day}天_{version}_变体索引.json')
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    return index, failed
+
+
+def run_variants(args):
+    """--roster 批量变体模式"""
+    roster = load_roster(args.roster)
+    os.makedirs(args.output_dir, exist_ok=True)
+    new_document()
+    configure_fragment_cache(args.fragment_cache_size, args.fragment_cache_dir)
+    start = time.perf_counter()
+    _, failed = generate_variants(args.day, args.version, roster, args.seed, args.output_dir,
+                                  args.backend, args.reproducible, args.jobs)
+    elapsed = time.perf_counter() - start
+    for student, error in failed:
+        print(f'生成失败: {student}\n{error}')
+    print(f'已生成 {len(roster) - len(failed)} 份第{args.day}天{args.version}变体，'
+          f'用时 {elapsed:.1f} 秒')
+    return 1 if failed else 0
+
+
+# ============ 中间表示文件 ============
+
+def paper_ir(day, version, seed=None):
+    """某天某版本试卷的 IR；给出 seed 时为对应的随机变体"""
+    return build_paper(DAY_SPECS[day], version, None if seed is None else random.Random(seed))
+
+
+def write_paper_ir(events, path):
+    """写出 IR 文件（.msgpack/.mpk 为 msgpack，其余为 JSON；'-' 为标准输出）"""
+    data = dumps_paper(events, ir_format(path))
+    if path == '-':
+        sys.stdout.buffer.write(data)
+        return
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def read_paper_ir(path):
+    with open(path, 'rb') as f:
+        return loads_paper(f.read(), ir_format(path))
+
+
+def render_ir_file(ir_path, output_path, backend='docx', reproducible=False):
+    """按 IR 文件生成文档，不重新选题"""
+    doc = new_document(backend=backend, output_path=output_path)
+    render_paper(read_paper_ir(ir_path), doc)
+    save_document(doc, output_path, reproducible)
     print(f'已生成: {output_path}')
 
 
-# ============ 主函数 ============
+# ============ 快速读取 .docx ============
+
+_W_BODY, _W_P, _W_TBL, _W_SDT = qn('w:body'), qn('w:p'), qn('w:tbl'), qn('w:sdt')
+_W_R, _W_HYPERLINK, _W_T, _W_BR = qn('w:r'), qn('w:hyperlink'), qn('w:t'), qn('w:br')
+_W_PPR, _W_PSTYLE, _W_TYPE, _W_VAL = qn('w:pPr'), qn('w:pStyle'), qn('w:type'), qn('w:val')
+
+# run 内其他元素对应的文字（与 python-docx 的 Run.text 一致）
+_RUN_TEXT = {qn('w:tab'): '\t', qn('w:ptab'): '\t', qn('w:cr'): '\n', qn('w:noBreakHyphen'): '-'}
+
+
+def _paragraph_content(p):
+    """段落的 (样式 ID, 文字)
+
+    文字取段落及超链接中 run 的文字，制表符、换行按 python-docx 的方式转换。
+    只遍历一遍子元素，不用路径查找（逐段调用时路径解析的开销比解析 XML 还大）。
+    """
+    style, parts = None, []
+    for child in p:
+        if child.tag == _W_R:
+            runs = (child,)
+        elif child.tag == _W_HYPERLINK:
+            runs = child.iterchildren(_W_R)
+        elif child.tag == _W_PPR:
+            for prop in child:
+                if prop.tag == _W_PSTYLE:
+                    style = prop.get(_W_VAL)
+                    break
+            continue
+        else:
+            continue
+        for run in runs:
+            for element in run:
+                if element.tag == _W_T:
+                    parts.append(element.text or '')
+                elif element.tag == _W_BR:
+                    if element.get(_W_TYPE, 'textWrapping') == 'textWrapping':
+                        parts.append('\n')
+                elif element.tag in _RUN_TEXT:
+                    parts.append(_RUN_TEXT[element.tag])
+    return style, ''.join(parts)
+
+
+def iter_docx_paragraphs(path_or_stream):
+    """流式读取 .docx 的正文段落，依次产出 (段落序号, 样式 ID, 文字)
+
+    直接从 zip 中用 iterparse 解析 word/document.xml，处理完的元素随即清除，
+    内存占用与文档长度无关。只读取正文顶层段落（与 python-docx 的
+    Document.paragraphs 相同），没有样式时样式 ID 为 None。
+    """
+    with zipfile.ZipFile(path_or_stream) as package, package.open(_DOCUMENT_PART) as stream:
+        index = 0
+        for _, element in etree.iterparse(stream, events=('end',), tag=(_W_P, _W_TBL, _W_SDT)):
+            parent = element.getparent()
+            if parent is None or parent.tag != _W_BODY:
+                continue  # 表格中的段落随表格一起清除
+            if element.tag == _W_P:
+                yield (index, *_paragraph_content(element))
+                index += 1
+            parent.remove(element)  # 已处理完的顶层元素直接移除，树中始终只有当前元素
+
+
+# ============ 自动批改 ============
+
+GRADE_REPORT_NAME = '批改结果.json'
+
+# 查找题目时，除试卷本身的段落间隔外允许学生额外插入的段落数（空行、另起段落作答）
+GRADE_SEARCH_WINDOW = 20
+
+# 题目之外的 IR 事件输出的段落数（标题含副标题和空行）
+_EVENT_PARAGRAPHS = {'title': 3, 'section': 1, 'header': 1}
+
+# 作答位置：下划线、空括号；选择题的选项行
+_RESPONSE_SLOT = re.compile(r'_{3,}|（\s*）|\(\s+\)')
+_CHOICE_OPTIONS = re.compile(r'^\s*A\.\s.*\bB\.\s')
+
+# 比较答案时忽略的标点、括号、箭头和残留的下划线
+_ANSWER_SEPARATORS = re.compile(r'[\s,，.。!！?？;；:：→_"“”()（）]+')
+
+# 缩写展开为完整形式后比较（doesn't 与 does not 等价）；'s 只展开代词和疑问词后的，
+# 名词所有格保持不变
+_CONTRACTIONS = [
+    (re.compile(r"\bwon't\b"), 'will not'),
+    (re.compile(r"\bshan't\b"), 'shall not'),
+    (re.compile(r"\bcan't\b|\bcannot\b"), 'can not'),
+    (re.compile(r"n't\b"), ' not'),
+    (re.compile(r"'m\b"), ' am'),
+    (re.compile(r"'re\b"), ' are'),
+    (re.compile(r"'ve\b"), ' have'),
+    (re.compile(r"'ll\b"), ' will'),
+    (re.compile(r"\b(he|she|it|that|there|here|what|where|who|how|when|why)'s\b"), r'\1 is'),
+    (re.compile(r"\blet's\b"), 'let us'),
+]
 
-def main():
-    """生成所有练习题文档"""
-    import os
 
-    # 获取脚本所在目录
-    script_dir = os.path.dirname(os.path.abspath(__file__))
+def normalize_response(text):
+    """比较用的答案形式：小写，缩写展开，标点和空白统一为单个空格"""
+    text = text.lower().replace('’', "'")
+    for pattern, expansion in _CONTRACTIONS:
+        text = pattern.sub(expansion, text)
+    return _ANSWER_SEPARATORS.sub(' ', text).strip()
+
+
+def _matches(response, key):
+    """一空的作答是否正确；标准答案中用 ' / ' 分隔的多个答案任一即可"""
+    given = normalize_response(response)
+    return any(given == normalize_response(alternative)
+               for alternative in (key, *key.split(' / ')))
+
+
+def is_correct(responses, keys):
+    """作答是否正确：responses 为各作答位置的文字，keys 为每空的标准答案
+
+    只有一个标准答案时与全部作答连起来比较（一个短语分写在几个空里）；
+    否则逐空比较，空数不一致按错误计。
+    """
+    if not responses:
+        return False
+    if len(keys) == 1:
+        responses = [' '.join(responses)]
+    return len(responses) == len(keys) and all(map(_matches, responses, keys))
+
+
+def _has_response_slot(paragraphs):
+    return any(_RESPONSE_SLOT.search(text) or _CHOICE_OPTIONS.match(text)
+               for text in paragraphs)
+
+
+def grading_items(events):
+    """从 IR 提取可自动批改的题目：[(题目 ID, 题目段落文字, 每空的标准答案, 与上一题的段落间隔)]
+
+    有标准答案（规格中的 blanks）、并且有作答位置（下划线、空括号或选项行）
+    的题目才自动批改；写作、知识点讲解等题目跳过。
+    """
+    keys = {}
+    for event in events:
+        if event[0] == 'answers':
+            keys.update((item_id, tuple(blank_keys)) for item_id, _, blank_keys in event[2]
+                        if blank_keys is not None)
+    items, gap = [], 0
+    for event in events:
+        if event[0] not in ('item', 'text'):
+            gap += _EVENT_PARAGRAPHS.get(event[0], 0)
+            continue
+        paragraphs = [paragraph[0] for paragraph in event[-1] if paragraph is not None]
+        if event[0] == 'item' and event[1] in keys and _has_response_slot(paragraphs):
+            items.append((event[1], paragraphs, keys[event[1]], gap))
+            gap = len(event[-1]) - len(paragraphs)  # 题目内的空行
+        else:
+            gap += len(event[-1])
+    return items
+
+
+@functools.lru_cache(maxsize=64)
+def paper_grading_items(day, version, seed=None):
+    """某份试卷（含随机变体）的可批改题目，同一试卷只构建一次"""
+    return grading_items(paper_ir(day, version, seed))
+
+
+@functools.lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def _response_pattern(text):
+    """题目段落 -> 匹配作答后段落的正则：作答位置和段落末尾追加的文字都捕获为作答"""
+    literals = [r'\s*'.join(map(re.escape, piece.split())) for piece in _RESPONSE_SLOT.split(text)]
+    return re.compile(r'^\s*' + r'\s*(.*?)\s*'.join(literals) + r'\s*(.*?)\s*$', re.S)
+
+
+def item_responses(paragraphs, submission, start, gap=0):
+    """从 start 起在学生文档段落中依次查找题目段落（gap 为试卷中与上一题的段落间隔）
+
+    返回 (作答文字列表, 下一次查找的位置)；题目段落找不到时返回 (None, start)。
+    """
+    responses, cursor = [], start
+    for text in paragraphs:
+        pattern = _response_pattern(text)
+        end = min(cursor + gap + GRADE_SEARCH_WINDOW, len(submission))
+        gap = 0
+        for index in range(cursor, end):
+            match = pattern.match(submission[index])
+            if match:
+                responses.extend(group for group in match.groups() if group.strip(' _'))
+                cursor = index + 1
+                break
+        else:
+            return None, start
+    return responses, cursor
+
+
+def read_paragraph_texts(path):
+    """学生文档的正文段落文字（流式读取，不构建 python-docx 对象模型）"""
+    return [text for _, _, text in iter_docx_paragraphs(path)]
+
+
+def grade_paragraphs(submission, day, version, seed=None):
+    """按学生文档的段落文字批改，返回 题目 ID -> {'response', 'answer', 'correct'}
+
+    找不到题目（学生删改了题目文字）时 response 为 None，按错误计；
+    逐空批改的题目，各空的作答和标准答案用 '；' 连接。
+    """
+    results, cursor = {}, 0
+    for item_id, paragraphs, keys, gap in paper_grading_items(day, version, seed):
+        responses, cursor = item_responses(paragraphs, submission, cursor, gap)
+        separator = ' ' if len(keys) == 1 else '；'
+        results[item_id] = {'response': None if responses is None else separator.join(responses),
+                            'answer': '；'.join(keys), 'correct': is_correct(responses, keys)}
+    return results
+
+
+def grade_submission(path, day, version, seed=None):
+    """批改一份学生文档，返回 题目 ID -> {'response', 'answer', 'correct'}"""
+    return grade_paragraphs(read_paragraph_texts(path), day, version, seed)
+
+
+def parse_submission_name(name):
+    """标准试卷文件名 第{天}天_{主题}_{版本}[_{学生}].docx -> (天数, 版本, 学生)
+
+    不是试卷文件名时返回 None；没有学生部分时学生为 None。
+    """
+    stem, ext = os.path.splitext(name)
+    if ext != '.docx':
+        return None
+    for day, topic, _ in DAY_DOCS:
+        prefix = f'第{day}天_{topic}_'
+        if stem.startswith(prefix):
+            version, _, student = stem[len(prefix):].partition('_')
+            if version in VERSIONS:
+                return day, version, student or None
+    return None
+
+
+def find_submissions(directory):
+    """查找待批改的学生文档，返回 [(学生, 路径, 天数, 版本, 种子)]
+
+    变体索引（*_变体索引.json）中登记的文件按其中的种子批改；其余文件按
+    文件名 第{天}天_{主题}_{版本}[_{学生}].docx 识别为标准试卷。
+    """
+    names = sorted(os.listdir(directory))
+    indexed = {}
+    for name in names:
+        if name.endswith('_变体索引.json'):
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                index = json.load(f)
+            for student, entry in index['students'].items():
+                indexed[entry['file']] = (student, index['day'], index['version'], entry['seed'])
+    submissions = []
+    for name in names:
+        if name in indexed:
+            student, day, version, seed = indexed[name]
+        else:
+            parsed = parse_submission_name(name)
+            if parsed is None:
+                continue
+            day, version, student = parsed
+            seed = None
+            student = student or os.path.splitext(name)[0]
+        submissions.append((student, os.path.join(directory, name), day, version, seed))
+    return submissions
+
+
+def _grade_task(task):
+    """进程池任务，返回 (批改结果, 错误信息)"""
+    _, path, day, version, seed = task
+    try:
+        return grade_submission(path, day, version, seed), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def grade_directory(directory, jobs=1):
+    """并行批改目录中的学生文档，返回 (报告, 失败列表)
+
+    报告包含每份试卷的逐题结果、每个学生的总分和每道题的正确人数。
+    """
+    submissions = find_submissions(directory)
+    if jobs > 1 and len(submissions) > 1:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=jobs, initializer=_init_worker,
+                initargs=(fragment_cache.maxsize, fragment_cache.directory,
+                          list(_bank_sources))) as pool:
+            outcomes = list(pool.map(_grade_task, submissions,
+                                     chunksize=max(1, len(submissions) // (jobs * 8))))
+    else:
+        outcomes = [_grade_task(task) for task in submissions]
+
+    papers, students, items, failed = [], {}, {}, []
+    for (student, path, day, version, seed), (results, error) in zip(submissions, outcomes):
+        filename = os.path.basename(path)
+        if error:
+            failed.append((filename, error))
+            continue
+        score = sum(result['correct'] for result in results.values())
+        papers.append({'student': student, 'file': filename, 'day': day, 'version': version,
+                       'seed': seed, 'score': score, 'total': len(results), 'items': results})
+        totals = students.setdefault(student, {'score': 0, 'total': 0})
+        totals['score'] += score
+        totals['total'] += len(results)
+        for item_id, result in results.items():
+            counts = items.setdefault(item_id, {'correct': 0, 'total': 0})
+            counts['correct'] += result['correct']
+            counts['total'] += 1
+    return {'papers': papers, 'students': students, 'items': items}, failed
+
+
+def report_digest(report):
+    """批改结果的摘要：由每份试卷的学生、文件、种子和逐题对错决定，用于识别重复计入"""
+    h = hashlib.sha256()
+    for paper in report['papers']:
+        h.update(f'{paper["student"]}\0{paper["file"]}\0{paper["day"]}\0{paper["version"]}\0'
+                 f'{paper["seed"]}\0'.encode('utf-8'))
+        h.update(''.join(f'{item_id}\0{result["correct"]:d}\0'
+                         for item_id, result in paper['items'].items()).encode('utf-8'))
+    return h.hexdigest()
+
+
+def add_to_error_book(path, report):
+    """把批改结果计入错题本并输出结果"""
+    book = ErrorBook(path)
+    try:
+        added = book.add_report(report)
+    finally:
+        book.close()
+    print(f'已计入错题本: {path}' if added else f'该批改结果已计入过错题本: {path}')
+
+
+def run_grading(args):
+    """--grade 批改模式"""
+    start = time.perf_counter()
+    report, failed = grade_directory(args.grade, args.jobs)
+    elapsed = time.perf_counter() - start
+    report_path = args.grade_report or os.path.join(args.grade, GRADE_REPORT_NAME)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    for filename, error in failed:
+        print(f'批改失败: {filename}\n{error}')
+    papers = report['papers']
+    score = sum(paper['score'] for paper in papers)
+    total = sum(paper['total'] for paper in papers)
+    print(f'已批改 {len(papers)} 份试卷，正确率 {score / total if total else 0:.1%}，'
+          f'用时 {elapsed:.1f} 秒')
+    print(f'批改结果: {report_path}')
+    if args.error_book:
+        add_to_error_book(args.error_book, report)
+    if args.cube:
+        add_to_cube(args.cube, report, args.classes)
+    return 1 if failed else 0
+
+
+def _first_alternative(key):
+    return key.split(' / ')[0]
+
+
+# 自检中模拟学生的另一种写法：把完整形式写成缩写
+_CONTRACTED = [
+    (re.compile(r'\bwill not\b', re.I), "won't"),
+    (re.compile(r'\bcan ?not\b', re.I), "can't"),
+    (re.compile(r'\b(do|does|did|is|are|was|were) not\b', re.I), r"\1n't"),
+    (re.compile(r'\bI am\b'), "I'm"),
+    (re.compile(r'\b(what|where|who|how|he|she|it) is\b', re.I), r"\1's"),
+]
 
-    versions = ['简洁版', '完整版', '充实版']
 
-    print('开始生成英语练习题文档...\n')
+def _student_alternative(key):
+    """与标准答案文字不同、但应判对的作答：取最后一个可选答案，并改用缩写"""
+    text = key.split(' / ')[-1]
+    for pattern, contraction in _CONTRACTED:
+        text = pattern.sub(contraction, text)
+    return text
+
+
+def answered_paragraphs(day, version, fill=_first_alternative):
+    """按标准答案作答后的试卷段落文字（批改自检用）
+
+    试卷先生成 Word 文档再读回段落，与批改学生文档的路径相同；每空填
+    fill(标准答案)（默认第一个可选答案），只有一个标准答案时按词分填到各空
+    （词数与空数不同时填在第一个空里），没有作答位置的选择题把答案写在
+    选项行末尾。
+    """
+    doc = new_document()
+    render_paper(paper_ir(day, version), doc)
+    buf = io.BytesIO()
+    doc.save(buf)
+    submission = read_paragraph_texts(buf)
+    cursor = 0
+    for _, paragraphs, keys, _ in paper_grading_items(day, version):
+        start = submission.index(paragraphs[0], cursor)
+        cursor = start + len(paragraphs)
+        fills = [fill(key) for key in keys]
+        slots = sum(len(_RESPONSE_SLOT.findall(text)) for text in paragraphs)
+        if slots == 0:
+            submission[cursor - 1] += '  ' + ' '.join(fills)
+            continue
+        words = normalize_response(fills[0]).split()
+        if len(fills) == 1 and len(words) == slots:
+            fills = words  # 一个短语分写在几个空里
+        fills += [''] * (slots - len(fills))
+        for index in range(start, cursor):
+            submission[index] = _RESPONSE_SLOT.sub(lambda _: fills.pop(0), submission[index])
+    return submission
+
+
+def check_grading():
+    """批改自检，返回问题列表（空列表表示通过）
+
+    检查有作答位置的块都给出了标准答案（blanks）或标记了 gradable: False，
+    并且每天每个版本的试卷按标准答案作答、以及换一种写法作答（只写改正句、
+    使用缩写等与标准答案文字不同的形式）后全部判对。
+    """
+    problems = []
+    for day, spec in DAY_SPECS.items():
+        for block in spec['blocks']:
+            if 'section' in block or 'blanks' in block or block.get('gradable', True) is False:
+                continue
+            if any(event[0] == 'item' and _has_response_slot(
+                    [paragraph[0] for paragraph in event[-1] if paragraph is not None])
+                   for event in _build_block(block, len(VERSIONS) - 1)):
+                problems.append(f'第{day}天 {block["number"]}、{block["key"]}: '
+                                '有作答位置，但没有 blanks 也没有标记 gradable: False')
+        for version in VERSIONS:
+            for fill in (_first_alternative, _student_alternative):
+                results = grade_paragraphs(answered_paragraphs(day, version, fill), day, version)
+                problems.extend(f'第{day}天 {version} {item_id}: 作答 {result["response"]!r}，'
+                                f'标准答案 {result["answer"]!r}'
+                                for item_id, result in results.items() if not result['correct'])
+    return problems
+
+
+def run_grading_check():
+    """--check-grading 批改自检模式"""
+    problems = check_grading()
+    for problem in problems:
+        print(problem)
+    if problems:
+        print(f'批改自检发现 {len(problems)} 个问题')
+        return 1
+    print(f'批改自检通过: {len(DAY_SPECS) * len(VERSIONS)} 份试卷按标准答案及其他写法作答全部判对')
+    return 0
+
+
+# ============ 错题本 ============
+
+ERROR_BOOK_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    item_id TEXT NOT NULL UNIQUE,
+    day INTEGER NOT NULL,
+    section TEXT,
+    knowledge_point TEXT,
+    category TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS errors (
+    student INTEGER NOT NULL,
+    item INTEGER NOT NULL,
+    wrong INTEGER NOT NULL,
+    attempts INTEGER NOT NULL,
+    last_correct INTEGER NOT NULL,
+    PRIMARY KEY (student, item)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS reports (
+    digest TEXT PRIMARY KEY,
+    papers INTEGER NOT NULL
+);
+'''
+
+# 错题类型（与第10天“我的错题统计”一致）
+ERROR_CATEGORIES = ('词汇类', '语法类', '阅读类')
+
+_CHINESE_DIGITS = '零一二三四五六七八九'
+
+
+def chinese_number(n):
+    """1-99 的中文数字（大题编号）"""
+    tens, ones = divmod(n, 10)
+    if tens == 0:
+        return _CHINESE_DIGITS[ones]
+    return f'{_CHINESE_DIGITS[tens] if tens > 1 else ""}十{_CHINESE_DIGITS[ones] if ones else ""}'
+
+
+@functools.lru_cache(maxsize=None)
+def item_sources():
+    """题库名 -> (天数, 所在大题, 题目块, 块的次序)；短文题按各篇的题库名登记"""
+    sources = {}
+    for day, spec in DAY_SPECS.items():
+        for order, block in enumerate(spec['blocks']):
+            if block.get('kind', 'items') not in ('items', 'groups', 'passages') or 'number' not in block:
+                continue
+            label = f'{block["number"]}、{block["key"]}'
+            for name in [block['bank']] if 'bank' in block else block.get('banks', []):
+                sources[name] = (day, label, block, (day, order))
+    return sources
+
+
+@functools.lru_cache(maxsize=None)
+def _knowledge_point_fields():
+    return {name: field for name, (_, field, _) in bank_metadata().items()}
+
+
+def item_order(item_id):
+    """题目在试卷中的先后次序（按天、大题、题库中的位置）"""
+    name, _, position = item_id.partition(':')
+    return item_sources()[name][3], name, tuple(map(int, position.split('.')))
+
+
+def item_fields(item_id):
+    """题目 ID 对应的题库条目（普通题 题库:位置，分组题 题库:组.题，短文题 篇名:题）"""
+    name, _, position = item_id.partition(':')
+    kind = item_sources()[name][2].get('kind', 'items')
+    if kind == 'groups':
+        group, question = map(int, position.split('.'))
+        return _bank(name)[group][1][question]
+    if kind == 'passages':
+        return _bank(name)['questions'][int(position)]
+    return _bank(name)[int(position)]
+
+
+def item_knowledge_point(item_id):
+    """题目考查的知识点：答案模板括号里的规则说明（如“不规则变化”），没有时为 None"""
+    field = _knowledge_point_fields().get(item_id.partition(':')[0])
+    if field is None:
+        return None
+    fields = item_fields(item_id)
+    return fields[field] if field < len(fields) else None
+
+
+def error_category(day, section):
+    """错题类型：按题目所在的天和大题归入词汇类、语法类或阅读类"""
+    section = section or ''
+    if day == 8 or '阅读' in section or '完形' in section:
+        return '阅读类'
+    if day == 2 or any(word in section for word in ('词汇', '短语', '复数')):
+        return '词汇类'
+    return '语法类'
+
+
+class ErrorBook:
+    """SQLite 错题本
+
+    学生名和题目 ID 各登记一次，错题记录只存整数键和计数：每个学生只记录
+    做错过的题目（累计做错次数、作答次数、最近一次是否做对）。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(ERROR_BOOK_SCHEMA)
+        self._students = dict(self._conn.execute('SELECT name, id FROM students'))
+        self._items = dict(self._conn.execute('SELECT item_id, id FROM items'))
+
+    def close(self):
+        self._conn.close()
+
+    def _student_key(self, name):
+        key = self._students.get(name)
+        if key is None:
+            key = self._students[name] = self._conn.execute(
+                'INSERT INTO students (name) VALUES (?)', (name,)).lastrowid
+        return key
+
+    def _item_key(self, item_id, day):
+        key = self._items.get(item_id)
+        if key is None:
+            section = item_sources()[item_id.partition(':')[0]][1]
+            point = item_knowledge_point(item_id)
+            key = self._items[item_id] = self._conn.execute(
+                'INSERT INTO items (item_id, day, section, knowledge_point, category) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (item_id, day, section, point, error_category(day, section))).lastrowid
+        return key
+
+    def add_report(self, report):
+        """把一次批改结果（grade_directory 的报告）计入错题本
+
+        做错的题目累计次数；做对的题目只更新已有记录（之前做错过的题）。
+        只记录能重新出题的题库题目（写作等自定义题目不计入）。
+        同一份结果重复加入时忽略，返回是否加入。
+        """
+        digest = report_digest(report)
+        with self._conn:
+            if self._conn.execute('SELECT 1 FROM reports WHERE digest = ?', (digest,)).fetchone():
+                return False
+            sources = item_sources()
+            wrong, right = [], []
+            for paper in report['papers']:
+                student = self._student_key(paper['student'])
+                for item_id, result in paper['items'].items():
+                    if item_id.partition(':')[0] not in sources:
+                        continue
+                    if not result['correct']:
+                        wrong.append((student, self._item_key(item_id, paper['day'])))
+                    elif item_id in self._items:
+                        right.append((student, self._items[item_id]))
+            self._conn.executemany(
+                'INSERT INTO errors VALUES (?, ?, 1, 1, 0) ON CONFLICT (student, item) DO UPDATE '
+                'SET wrong = wrong + 1, attempts = attempts + 1, last_correct = 0', wrong)
+            self._conn.executemany(
+                'UPDATE errors SET attempts = attempts + 1, last_correct = 1 '
+                'WHERE student = ? AND item = ?', right)
+            self._conn.execute('INSERT INTO reports VALUES (?, ?)', (digest, len(report['papers'])))
+        return True
+
+    def weak_items(self, student=None):
+        """薄弱题目：做错过、且最近一次仍未做对的题目
+
+        返回 学生 -> [(题目 ID, 天数, 大题, 知识点, 错题类型, 做错次数)]，按题目在试卷中的次序排列。
+        """
+        sql = ('SELECT s.name, i.item_id, i.day, i.section, i.knowledge_point, i.category, e.wrong '
+               'FROM errors e JOIN students s ON s.id = e.student JOIN items i ON i.id = e.item '
+               'WHERE e.last_correct = 0')
+        params = ()
+        if student is not None:
+            sql += ' AND s.name = ?'
+            params = (student,)
+        weak = {}
+        for name, *row in self._conn.execute(sql + ' ORDER BY s.name', params):
+            weak.setdefault(name, []).append(tuple(row))
+        for rows in weak.values():
+            rows.sort(key=lambda row: item_order(row[0]))
+        return weak
+
+
+def _add_item_groups(events, item_ids, number=0):
+    """按原大题分组输出题目（item_ids 已按试卷次序排列），返回最后一个大题编号
+
+    每组一个大题，题号从 1 起；短文题先给出短文，分组题先给出该组的短语，
+    同一篇/组只给一次。
+    """
+    for (day, section), group in itertools.groupby(
+            item_ids, key=lambda item_id: item_sources()[item_id.partition(':')[0]][:2]):
+        number += 1
+        label = chinese_number(number)
+        events.append(('header', label, f'第{day}天 {section}'))
+        answers, context = [], None
+        for i, item_id in enumerate(group, 1):
+            name, _, position = item_id.partition(':')
+            block = item_sources()[name][2]
+            fields = item_fields(item_id)
+            kind = block.get('kind')
+            if kind == 'passages' and context != name:
+                context = name
+                text = _bank(name)
+                _text(events, [Plain(f'【{text["title"]}】'),
+                               *[line for line in text['passage'].split('\n') if line.strip()],
+                               BLANK])
+            elif kind == 'groups' and context != position.split('.')[0]:
+                context = position.split('.')[0]
+                _text(events, [Plain(block['group'].format(_bank(name)[int(context)][0]))])
+            events.append(('item', item_id, i, _format_item(block['item'], fields, i)))
+            answers.append(_answer_entry(block, item_id, fields, i))
+        events.append(('answers', f'{label}、第{day}天 {section}', answers))
+    return number
+
+
+def remediation_paper(student, weak):
+    """学生的错题重练试卷 IR：只含该学生的薄弱题目，按错题类型分部分、按原大题分组"""
+    events = [('paper', None, '错题重练'),
+              ('title', '小学六年级英语错题重练', f'{student} · 共 {len(weak)} 题')]
+    categories = collections.Counter(row[4] for row in weak)
+    points = collections.Counter()
+    for _, _, _, point, _, wrong in weak:
+        if point:
+            points[point] += wrong
+    _text(events, [Plain('我的错题统计：'),
+                   *[f'{category}错误：{categories[category]} 题' for category in ERROR_CATEGORIES],
+                   *([Plain('薄弱知识点：'),
+                      '、'.join(f'{point}（错 {n} 次）' for point, n in points.most_common(5))]
+                     if points else []),
+                   BLANK])
+
+    part = number = 0
+    for category in ERROR_CATEGORIES:
+        item_ids = [row[0] for row in weak if row[4] == category]
+        if not item_ids:
+            continue
+        part += 1
+        events.append(('section', f'第{chinese_number(part)}部分：{category}错题'))
+        number = _add_item_groups(events, item_ids, number)
+    return events
+
+
+def remediation_filename(student, backend='docx'):
+    return f'错题重练_{safe_filename(student)}{document_extension(backend)}'
+
+
+def generate_remediation(student, weak, output_path, backend='ooxml', reproducible=False):
+    """生成一份错题重练试卷"""
+    doc = new_document(backend=backend, output_path=output_path)
+    render_paper(remediation_paper(student, weak), doc)
+    save_document(doc, output_path, reproducible)
+
+
+def _remediation_task(task):
+    """进程池任务，返回错误信息（成功时为 None）"""
+    try:
+        generate_remediation(*task)
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+
+def run_remediation(args):
+    """--remediation 模式：按错题本为每个学生生成错题重练试卷"""
+    start = time.perf_counter()
+    book = ErrorBook(args.error_book)
+    try:
+        weak = book.weak_items(args.student)
+    finally:
+        book.close()
+    os.makedirs(args.output_dir, exist_ok=True)
+    backend = 'ooxml' if args.backend == 'stream' else args.backend
+    new_document()
+    configure_fragment_cache(args.fragment_cache_size, args.fragment_cache_dir)
+    tasks = [(student, rows, os.path.join(args.output_dir, remediation_filename(student, backend)),
+              backend, args.reproducible)
+             for student, rows in weak.items()]
+    if args.jobs > 1 and len(tasks) > 1:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=args.jobs, initializer=_init_worker,
+                initargs=(fragment_cache.maxsize, fragment_cache.directory,
+                          list(_bank_sources))) as pool:
+            errors = list(pool.map(_remediation_task, tasks,
+                                   chunksize=max(1, len(tasks) // (args.jobs * 8))))
+    else:
+        errors = [_remediation_task(task) for task in tasks]
+    failed = [(task[0], error) for task, error in zip(tasks, errors) if error]
+    for student, error in failed:
+        print(f'生成失败: {student}\n{error}')
+    print(f'已生成 {len(tasks) - len(failed)} 份错题重练试卷，'
+          f'用时 {time.perf_counter() - start:.1f} 秒')
+    return 1 if failed else 0
+
+
+# 专项练习的查询条件（BankDatabase.select 的参数）：条件名 -> 类型
+SELECT_FIELDS = {'bank': str, 'day': int, 'section': str, 'knowledge_point': str,
+                 'difficulty': int, 'limit': int}
+
+
+def parse_select(values):
+    """--select 条件=值 的列表 -> select() 的参数"""
+    filters = {}
+    for value in values or []:
+        field, sep, text = value.partition('=')
+        if not sep or field not in SELECT_FIELDS:
+            raise ValueError(f'--select 应为 条件=值（条件为 {"/".join(SELECT_FIELDS)}）: {value}')
+        try:
+            filters[field] = SELECT_FIELDS[field](text)
+        except ValueError:
+            raise ValueError(f'--select {field} 应为整数: {text}') from None
+    return filters
+
+
+def selected_items(db, filters):
+    """按条件从题库数据库查询题目，返回能出题的题目 ID（按试卷次序）
+
+    分组题的数据库条目是整组，展开为组内各题；没有答案模板的题库（如阅读技巧）不出题。
+    """
+    item_ids = []
+    for name, position, fields in db.select(**filters):
+        source = item_sources().get(name)
+        if source is None or 'answer' not in source[2]:
+            continue
+        if source[2].get('kind') == 'groups':
+            item_ids.extend(f'{name}:{position}.{question}' for question in range(len(fields[1])))
+        else:
+            item_ids.append(f'{name}:{position}')
+    return sorted(item_ids, key=item_order)
+
+
+def selection_paper(item_ids, description):
+    """专项练习试卷 IR：按查询条件选出的题目，按原大题分组"""
+    events = [('paper', None, '专项练习'),
+              ('title', '小学六年级英语专项练习', f'{description} · 共 {len(item_ids)} 题')]
+    _add_item_groups(events, item_ids)
+    return events
+
+
+def run_selection(args, db):
+    """--select 模式：按条件从 --bank-db 查询题目，生成一份专项练习到 --output-dir"""
+    filters = parse_select(args.select)
+    start = time.perf_counter()
+    item_ids = selected_items(db, filters)
+    if not item_ids:
+        print('没有符合条件的题目')
+        return 1
+    description = '，'.join(args.select)
+    backend = 'ooxml' if args.backend == 'stream' else args.backend
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(
+        args.output_dir, f'专项练习_{safe_filename(description)}{document_extension(backend)}')
+    doc = new_document(backend=backend, output_path=output_path)
+    render_paper(selection_paper(item_ids, description), doc)
+    save_document(doc, output_path, args.reproducible)
+    print(f'已生成: {output_path}（{len(item_ids)} 题，用时 {time.perf_counter() - start:.2f} 秒）')
+    return 0
+
+
+# ============ 成绩分析 ============
+
+# 成绩分析的维度：题目按这些属性归类，维度值 -> 每个班级的（作答次数, 做错次数）
+CUBE_DIMENSIONS = ('day', 'section', 'category', 'knowledge_point', 'rule', 'item')
+
+# 名单中没有班级的学生
+UNASSIGNED_CLASS = '未分班'
+
+# 第10天“常见错误总结”的规则 -> 归入该规则的大题/知识点关键词
+ERROR_RULE_KEYWORDS = {
+    '动词第三人称单数': ('第三人称单数', 'do/does', 'Does', '动词变形', '动词形式'),
+    '动词过去式': ('过去式', '过去时'),
+    '介词用法': ('介词', 'in/on/at'),
+    '人称代词': ('人称代词', '主格', '宾格'),
+    '物主代词': ('物主代词',),
+    '名词复数': ('名词单复数', '单复数同形'),
+    'there be 句型': ('there be',),
+    '特殊疑问句': ('疑问词', '特殊疑问'),
+}
+
 
-    # 生成第2天文档
-    for version in versions:
-        filename = f'第2天_词汇基础_{version}.docx'
-        output_path = os.path.join(script_dir, filename)
-        generate_day2_doc(version, output_path)
-
-    # 生成第3天文档
-    for version in versions:
-        filename = f'第3天_句型基础_{version}.docx'
-        output_path = os.path.join(script_dir, filename)
-        generate_day3_doc(version, output_path)
-
-    # 生成第4天文档
-    for version in versions:
-        filename = f'第4天_特殊疑问句与情景交际_{version}.docx'
-        output_path = os.path.join(script_dir, filename)
-        generate_day4_doc(version, output_path)
-
-    # 生成第5天文档
-    for version in versions:
-        filename = f'第5天_语法专项_一般现在时_{version}.docx'
-        output_path = os.path.join(script_dir, filename)
-        generate_day5_doc(version, output_path)
-
-    # 生成第6天文档
-    for version in versions:
-        filename = f'第6天_语法专项_一般过去时与将来时_{version}.docx'
-        output_path = os.path.join(script_dir, filename)
-        generate_day6_doc(version, output_path)
-
-    # 生成第7天文档
-    for version in versions:
-        filename = f'第7天_语法专项_介词代词名词单复数_{version}.docx'
-        output_path = os.path.join(script_dir, filename)
-        generate_day7_doc(version, output_path)
-
-    # 生成第8天文档
-    for version in versions:
-        filename = f'第8天_阅读专项_完形填空与阅读理解_{version}.docx'
-        output_path = os.path.join(script_dir, filename)
-        generate_day8_doc(version, output_path)
-
-    # 生成第9天文档
-    for version in versions:
-        filename = f'第9天_写作专项_审题句型书写_{version}.docx'
-        output_path = os.path.join(script_dir, filename)
-        generate_day9_doc(version, output_path)
-
-    # 生成第10天文档
-    for version in versions:
-        filename = f'第10天_综合模考与知识梳理_{version}.docx'
-        output_path = os.path.join(script_dir, filename)
-        generate_day10_doc(version, output_path)
+def load_classes(path):
+    """读取带班级的学生名单：CSV 每行 学生,班级，返回 学生 -> 班级"""
+    classes = {}
+    with open(path, encoding='utf-8-sig') as f:
+        for line in f:
+            student, _, rest = line.partition(',')
+            student = student.strip()
+            if student and not student.startswith('#'):
+                classes[student] = rest.split(',', 1)[0].strip() or UNASSIGNED_CLASS
+    return classes
+
+
+@functools.lru_cache(maxsize=None)
+def gradable_items():
+    """所有能批改的题库题目 ID，按题目在试卷中的次序"""
+    ids = []
+    for name, (_, _, block, _) in item_sources().items():
+        if not _block_gradable(block):
+            continue
+        bank = _bank(name)
+        kind = block.get('kind', 'items')
+        if kind == 'groups':
+            ids.extend(f'{name}:{group}.{question}'
+                       for group, (_, questions) in enumerate(bank)
+                       for question in range(len(questions)))
+        elif kind == 'passages':
+            ids.extend(f'{name}:{question}' for question in range(len(bank['questions'])))
+        else:
+            ids.extend(f'{name}:{position}' for position in range(len(bank)))
+    return tuple(sorted(ids, key=item_order))
+
+
+def item_rules(section, point):
+    """题目归入的第10天错误规则（可能有多条）"""
+    text = f'{section} {point or ""}'
+    return [rule for rule, keywords in ERROR_RULE_KEYWORDS.items()
+            if any(keyword in text for keyword in keywords)]
+
+
+@functools.lru_cache(maxsize=None)
+def cube_members():
+    """各维度的取值和每道题所属的取值：维度 -> (取值列表, 每道题的取值序号列表)"""
+    attributes = {dimension: [] for dimension in CUBE_DIMENSIONS}
+    for item_id in gradable_items():
+        day, label = item_sources()[item_id.partition(':')[0]][:2]
+        point = item_knowledge_point(item_id)
+        attributes['day'].append([f'第{day}天'])
+        attributes['section'].append([f'第{day}天 {label}'])
+        attributes['category'].append([error_category(day, label)])
+        attributes['knowledge_point'].append([point] if point else [])
+        attributes['rule'].append(item_rules(label, point))
+        attributes['item'].append([item_id])
+    members = {}
+    for dimension, values in attributes.items():
+        labels = list(dict.fromkeys(value for item_values in values for value in item_values))
+        index = {label: i for i, label in enumerate(labels)}
+        members[dimension] = (labels, [[index[value] for value in item_values]
+                                       for item_values in values])
+    return members
+
+
+@functools.lru_cache(maxsize=None)
+def cube_members_digest():
+    """题目与各维度取值对应关系的指纹；题库变化后保存的汇总结果作废"""
+    data = json.dumps([gradable_items(), cube_members()], ensure_ascii=False)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+
+
+class AnalyticsCube:
+    """按班级 × 题目累计作答次数和做错次数，并预先汇总到各维度
+
+    基础数据是 班级 × 题目 的计数；天、大题、错题类型、知识点、错误规则都是
+    题目的属性，汇总即按题目归类相加。新的批改结果只把增量加到基础数据和
+    各维度的汇总上，不重新扫描历史；汇总结果随基础数据一起保存，读取时
+    直接恢复。装有 NumPy 时计数保存在数组中，汇总为矩阵乘法；否则用字典
+    逐条累加，结果相同。
+    """
+
+    def __init__(self):
+        self.items = gradable_items()
+        self._item_index = {item_id: i for i, item_id in enumerate(self.items)}
+        self.members = cube_members()
+        self.classes = []
+        self._class_index = {}
+        self.reports = set()
+        if np is not None:
+            self._matrices = {}
+            for dimension, (labels, item_values) in self.members.items():
+                matrix = np.zeros((len(self.items), len(labels)), dtype=np.int64)
+                for item, values in enumerate(item_values):
+                    matrix[item, values] = 1
+                self._matrices[dimension] = matrix
+            self._counts = np.zeros((2, 0, len(self.items)), dtype=np.int64)
+            self._aggregates = {dimension: np.zeros((2, 0, len(labels)), dtype=np.int64)
+                                for dimension, (labels, _) in self.members.items()}
+        else:
+            self._counts = {}  # (班级, 题目) -> [作答次数, 做错次数]
+            self._aggregates = {dimension: {} for dimension in CUBE_DIMENSIONS}
+
+    def _class_key(self, name):
+        key = self._class_index.get(name)
+        if key is None:
+            key = self._class_index[name] = len(self.classes)
+            self.classes.append(name)
+            if np is not None:
+                pad = ((0, 0), (0, 1), (0, 0))
+                self._counts = np.pad(self._counts, pad)
+                self._aggregates = {dimension: np.pad(aggregate, pad)
+                                    for dimension, aggregate in self._aggregates.items()}
+        return key
+
+    def add(self, delta):
+        """累加增量 {(班级序号, 题目序号): [作答次数, 做错次数]}"""
+        if not delta:
+            return
+        if np is not None:
+            keys = np.array(list(delta), dtype=np.intp)
+            change = np.zeros_like(self._counts)
+            change[:, keys[:, 0], keys[:, 1]] = np.array(list(delta.values()), dtype=np.int64).T
+            self._counts += change
+            for dimension, matrix in self._matrices.items():
+                self._aggregates[dimension] += change @ matrix
+            return
+        for key, (total, wrong) in delta.items():
+            counts = self._counts.setdefault(key, [0, 0])
+            counts[0] += total
+            counts[1] += wrong
+            cls, item = key
+            for dimension, (_, item_values) in self.members.items():
+                aggregate = self._aggregates[dimension]
+                for value in item_values[item]:
+                    counts = aggregate.setdefault((cls, value), [0, 0])
+                    counts[0] += total
+                    counts[1] += wrong
+
+    def _restore(self, counts, aggregates):
+        """直接填入保存的基础数据和汇总结果（均为 {(班级序号, 序号): [作答次数, 做错次数]}）"""
+        if np is None:
+            self._counts = {key: list(value) for key, value in counts.items()}
+            self._aggregates = {dimension: {key: list(value) for key, value in values.items()}
+                                for dimension, values in aggregates.items()}
+            return
+        for target, values in ((self._counts, counts),
+                               *((self._aggregates[dimension], values)
+                                 for dimension, values in aggregates.items())):
+            if values:
+                keys = np.array(list(values), dtype=np.intp)
+                target[:, keys[:, 0], keys[:, 1]] = np.array(list(values.values()),
+                                                             dtype=np.int64).T
+
+    def _aggregate_entries(self, dimension):
+        """某维度的汇总结果：[(班级序号, 取值序号, 作答次数, 做错次数)]"""
+        aggregate = self._aggregates[dimension]
+        if np is None:
+            return [(cls, value, total, wrong)
+                    for (cls, value), (total, wrong) in aggregate.items() if total]
+        classes, values = np.nonzero(aggregate[0])
+        return list(zip(classes.tolist(), values.tolist(),
+                        aggregate[0, classes, values].tolist(),
+                        aggregate[1, classes, values].tolist()))
+
+    def add_report(self, report, classes=None):
+        """计入一次批改结果；classes 为 学生 -> 班级。重复的结果忽略，返回是否计入"""
+        digest = report_digest(report)
+        if digest in self.reports:
+            return False
+        classes = classes or {}
+        delta = {}
+        for paper in report['papers']:
+            cls = self._class_key(classes.get(paper['student'], UNASSIGNED_CLASS))
+            for item_id, result in paper['items'].items():
+                item = self._item_index.get(item_id)
+                if item is None:
+                    continue
+                counts = delta.setdefault((cls, item), [0, 0])
+                counts[0] += 1
+                counts[1] += not result['correct']
+        self.add(delta)
+        self.reports.add(digest)
+        return True
+
+    def _matching_items(self, filters):
+        """满足 {维度: 取值} 条件的题目序号"""
+        wanted = []
+        for dimension, value in filters.items():
+            labels, item_values = self.members[dimension]
+            if value not in labels:
+                return []
+            wanted.append((item_values, labels.index(value)))
+        return [item for item in range(len(self.items))
+                if all(index in item_values[item] for item_values, index in wanted)]
+
+    def query(self, dimension, filters=None):
+        """按维度汇总：取值 -> 班级 -> (做错次数, 作答次数)，只含有作答的项
+
+        filters 为 {维度: 取值} 的下钻条件（如 {'day': '第6天'}），没有条件时
+        直接读取预先汇总的结果。
+        """
+        labels, item_values = self.members[dimension]
+        result = {}
+        if np is not None:
+            if filters:
+                items = self._matching_items(filters)
+                aggregate = self._counts[:, :, items] @ self._matrices[dimension][items]
+            else:
+                aggregate = self._aggregates[dimension]
+            classes, values = np.nonzero(aggregate[0])
+            for cls, value, wrong, total in zip(classes.tolist(), values.tolist(),
+                                                aggregate[1, classes, values].tolist(),
+                                                aggregate[0, classes, values].tolist()):
+                result.setdefault(labels[value], {})[self.classes[cls]] = (wrong, total)
+            return result
+        if filters:
+            items = set(self._matching_items(filters))
+            aggregate = {}
+            for (cls, item), (total, wrong) in self._counts.items():
+                if item in items:
+                    for value in item_values[item]:
+                        counts = aggregate.setdefault((cls, value), [0, 0])
+                        counts[0] += total
+                        counts[1] += wrong
+        else:
+            aggregate = self._aggregates[dimension]
+        for (cls, value), (total, wrong) in aggregate.items():
+            if total:
+                result.setdefault(labels[value], {})[self.classes[cls]] = (wrong, total)
+        return result
+
+    def rule_report(self):
+        """第10天错误规则对各班级的影响：[(规则, 注意事项, [(班级, 错误率, 做错, 作答)])]，
+        班级按错误率从高到低排列"""
+        notes = {rule: note for rule, _, note in DAY10_ERROR_SUMMARY}
+        by_rule = self.query('rule')
+        report = []
+        for rule in ERROR_RULE_KEYWORDS:
+            rows = [(cls, wrong / total, wrong, total)
+                    for cls, (wrong, total) in by_rule.get(rule, {}).items()]
+            rows.sort(key=lambda row: row[1], reverse=True)
+            report.append((rule, notes.get(rule, ''), rows))
+        return report
+
+    def save(self, path):
+        """保存为 JSON：班级 -> 题目 ID -> [作答次数, 做错次数]，已计入的批改结果，
+        以及各维度的汇总结果（维度 -> 班级 -> 取值 -> [作答次数, 做错次数]）"""
+        counts = {}
+        if np is not None:
+            for cls, item in zip(*np.nonzero(self._counts[0])):
+                counts.setdefault(self.classes[cls], {})[self.items[item]] = [
+                    int(self._counts[0, cls, item]), int(self._counts[1, cls, item])]
+        else:
+            for (cls, item), value in self._counts.items():
+                counts.setdefault(self.classes[cls], {})[self.items[item]] = value
+        aggregates = {}
+        for dimension, (labels, _) in self.members.items():
+            by_class = aggregates[dimension] = {}
+            for cls, value, total, wrong in self._aggregate_entries(dimension):
+                by_class.setdefault(self.classes[cls], {})[labels[value]] = [total, wrong]
+        data = {'classes': self.classes, 'reports': sorted(self.reports), 'counts': counts,
+                'members': cube_members_digest(), 'aggregates': aggregates}
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """读取 save 保存的文件，文件不存在时返回空的分析数据
+
+        题库未变时直接恢复保存的汇总结果；题库变化（或旧版本保存的文件）
+        时由基础数据重新汇总。
+        """
+        cube = cls()
+        if not os.path.exists(path):
+            return cube
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        counts = {}
+        for name in data['classes']:
+            key = cube._class_key(name)
+            for item_id, value in data['counts'].get(name, {}).items():
+                item = cube._item_index.get(item_id)
+                if item is not None:
+                    counts[(key, item)] = value
+        if data.get('members') == cube_members_digest():
+            aggregates = {}
+            for dimension, (labels, _) in cube.members.items():
+                index = {label: i for i, label in enumerate(labels)}
+                aggregates[dimension] = {
+                    (cube._class_index[name], index[label]): value
+                    for name, by_label in data['aggregates'][dimension].items()
+                    for label, value in by_label.items()}
+            cube._restore(counts, aggregates)
+        else:
+            cube.add(counts)
+        cube.reports.update(data['reports'])
+        return cube
+
+
+def print_analysis(result, dimension, limit=None):
+    """按错误率从高到低输出汇总结果，每行为 全部班级 和各班级的错误率"""
+    rows = []
+    for label, by_class in result.items():
+        wrong = sum(counts[0] for counts in by_class.values())
+        total = sum(counts[1] for counts in by_class.values())
+        rows.append((wrong / total, label, wrong, total, by_class))
+    rows.sort(key=lambda row: row[0], reverse=True)
+    notes = {rule: note for rule, _, note in DAY10_ERROR_SUMMARY} if dimension == 'rule' else {}
+    for rate, label, wrong, total, by_class in rows[:limit]:
+        note = f'（{notes[label]}）' if label in notes else ''
+        classes = '  '.join(f'{cls} {counts[0] / counts[1]:.1%}'
+                            for cls, counts in sorted(by_class.items()))
+        print(f'{label}{note}  全部 {rate:.1%}（{wrong}/{total}）  {classes}')
+
+
+def parse_drill(values):
+    """--drill 维度=取值 的列表 -> {维度: 取值}"""
+    filters = {}
+    for value in values or []:
+        dimension, sep, label = value.partition('=')
+        if not sep or dimension not in CUBE_DIMENSIONS:
+            raise ValueError(f'--drill 应为 维度=取值（维度为 {"/".join(CUBE_DIMENSIONS)}）: {value}')
+        filters[dimension] = label
+    return filters
+
+
+def add_to_cube(path, report, classes_path=None):
+    """把批改结果计入成绩分析文件并输出结果"""
+    start = time.perf_counter()
+    cube = AnalyticsCube.load(path)
+    if cube.add_report(report, load_classes(classes_path) if classes_path else None):
+        cube.save(path)
+        print(f'已计入成绩分析: {path}（用时 {time.perf_counter() - start:.2f} 秒）')
+    else:
+        print(f'该批改结果已计入过成绩分析: {path}')
+
+
+def run_analysis(args):
+    """--analyze 模式：按维度（可下钻）输出各班级的错误率"""
+    filters = parse_drill(args.drill)
+    cube = AnalyticsCube.load(args.cube)
+    start = time.perf_counter()
+    if args.analyze == 'rule' and not filters:
+        for rule, note, rows in cube.rule_report():
+            classes = '  '.join(f'{cls} {rate:.1%}（{wrong}/{total}）'
+                                for cls, rate, wrong, total in rows)
+            print(f'{rule}（{note}）  {classes or "暂无作答"}')
+    else:
+        print_analysis(cube.query(args.analyze, filters), args.analyze, args.top)
+    print(f'查询用时 {(time.perf_counter() - start) * 1000:.1f} 毫秒')
+    return 0
+
+
+# ============ HTTP 生成服务 ============
+
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+HTML_CONTENT_TYPE = 'text/html; charset=utf-8'
+_PAPER_PATH = re.compile(r'^/(papers|preview)/day(\d+)/([^/]+)$')
+
+
+class PaperService:
+    """常驻内存的试卷生成服务：模板、题库和片段缓存保持预热，生成结果按 ETag 缓存
+
+    文档按可复现方式生成，相同输入总是得到相同字节，ETag 由输入计算即可作为强校验值。
+    """
+
+    def __init__(self, backend='ooxml', cache_size=256):
+        if backend not in ('docx', 'ooxml'):
+            raise ValueError(f'生成服务只支持 docx/ooxml 后端: {backend}')
+        self.backend = backend
+        self.cache_size = cache_size
+        self._papers = collections.OrderedDict()  # ETag -> 文档字节
+        self._lock = threading.Lock()
+        self._topics = {day: topic for day, topic, _ in DAY_DOCS}
+        # 各天的输入指纹启动时算好，请求时只需拼上版本和种子
+        self._inputs = {day: _digest(json.dumps(job_inputs(generate, backend, reproducible=True),
+                                                sort_keys=True))
+                        for day, _, generate in DAY_DOCS}
+        new_document(backend=backend)
+
+    def etag(self, day, version, seed=None):
+        return _digest(self._inputs[day], version, repr(seed), str(reproducible_timestamp()))[:32]
+
+    def filename(self, day, version, seed=None):
+        name = output_filename(day, self._topics[day], version)
+        return name if seed is None else name.replace('.docx', f'_{seed}.docx')
+
+    def render(self, day, version, seed=None):
+        """生成文档字节（不写文件，可复现）"""
+        doc = new_document(backend=self.backend)
+        render_spec(DAY_SPECS[day], version, doc, None if seed is None else random.Random(seed))
+        buf = io.BytesIO()
+        doc.save(buf)
+        return normalized_package_bytes(buf.getvalue())
+
+    def paper(self, day, version, seed=None):
+        """返回 (ETag, 文档字节)，命中缓存时不重新生成"""
+        etag = self.etag(day, version, seed)
+        with self._lock:
+            data = self._papers.get(etag)
+            if data is not None:
+                self._papers.move_to_end(etag)
+                return etag, data
+            # 片段缓存不是线程安全的，生成过程串行执行
+            data = self.render(day, version, seed)
+            self._papers[etag] = data
+            if len(self._papers) > self.cache_size:
+                self._papers.popitem(last=False)
+        return etag, data
+
+
+class PaperRequestHandler(http.server.BaseHTTPRequestHandler):
+    """GET /papers/day<天数>/<版本>[?seed=种子][&student=学生]
+
+    /preview/ 开头的同样路径返回流式渲染的 HTML 预览。
+    """
+
+    service = None  # PaperService，由 serve() 设置
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        match = _PAPER_PATH.match(urllib.parse.unquote(url.path))
+        if not match:
+            return self.send_error(404, 'expected /papers/day<N>/<version>')
+        kind, day, version = match.group(1), int(match.group(2)), match.group(3)
+        if day not in DAY_SPECS or version not in VERSIONS:
+            return self.send_error(404, 'unknown day or version')
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            seed = int(query['seed'][0]) if 'seed' in query else None
+        except ValueError:
+            return self.send_error(400, 'seed must be an integer')
+        if 'student' in query:
+            seed = variant_seed(seed or 0, query['student'][0])
+        if kind == 'preview':
+            return self.send_preview(day, version, seed)
+
+        etag = f'"{self.service.etag(day, version, seed)}"'
+        if etag in (tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        _, data = self.service.paper(day, version, seed)
+        filename = urllib.parse.quote(self.service.filename(day, version, seed))
+        self.send_response(200)
+        self.send_header('Content-Type', DOCX_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Content-Disposition', f"attachment; filename*=UTF-8''{filename}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_preview(self, day, version, seed):
+        """边渲染边发送 HTML 预览（不缓存，连接结束即表示输出完毕）"""
+        self.send_response(200)
+        self.send_header('Content-Type', HTML_CONTENT_TYPE)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        rng = None if seed is None else random.Random(seed)
+        for chunk in iter_paper_html(DAY_SPECS[day], version, rng):
+            self.wfile.write(chunk.encode('utf-8'))
+            self.wfile.flush()
+
+
+def parse_address(address):
+    """'8000' 或 'host:8000' -> (host, port)"""
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def serve(address, backend='ooxml'):
+    """启动 HTTP 生成服务，直到 Ctrl+C"""
+    handler = type('Handler', (PaperRequestHandler,), {'service': PaperService(backend)})
+    server = http.server.ThreadingHTTPServer(parse_address(address), handler)
+    host, port = server.server_address[:2]
+    print(f'生成服务已启动: http://{host}:{port}/papers/day7/完整版?seed=1')
+    print(f'HTML 预览: http://{host}:{port}/preview/day7/完整版?seed=1')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+# ============ 常驻进程 ============
+
+DAEMON_SOCKET_ENV = 'EXERCISES_DAEMON_SOCKET'
+
+# 常驻进程里不能再嵌套启动的模式
+_DAEMON_REJECTED = ('--daemon', '--serve')
+
+
+def daemon_socket_path():
+    """常驻进程的 Unix 套接字路径（exercises_client.py 中有相同的约定）
+
+    默认放在 $XDG_RUNTIME_DIR 下；没有时放在临时目录下本用户私有（0700）的
+    子目录里，不使用共享临时目录中可以被其他用户抢先创建的固定文件名。
+    """
+    path = os.environ.get(DAEMON_SOCKET_ENV)
+    if path:
+        return path
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'generate_exercises.sock')
+    return os.path.join(tempfile.gettempdir(), f'generate_exercises-{os.getuid()}',
+                        'daemon.sock')
+
+
+def _check_socket_dir(directory):
+    """套接字所在目录必须是当前用户的私有目录，或设置了粘滞位的公共目录（如 /tmp）
+
+    否则其他用户可以删除、替换其中的套接字；不满足时抛出 PermissionError。
+    """
+    st = os.stat(directory)
+    if st.st_mode & stat.S_ISVTX:
+        return  # 粘滞位：其他用户不能删除或改名本用户的文件
+    if st.st_uid != os.getuid() or st.st_mode & 0o022:
+        raise PermissionError(f'套接字目录不是当前用户的私有目录: {directory}')
+
+
+def recv_message(conn):
+    """读取客户端的请求：一行 JSON"""
+    chunks = []
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if chunk.endswith(b'\n'):
+            break
+    return json.loads(b''.join(chunks).decode('utf-8'))
+
+
+def send_message(conn, message, payload=b''):
+    """回复：一行 JSON，payload 字段为随后原样发送的标准输出字节数"""
+    message = dict(message, payload=len(payload))
+    conn.sendall(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n' + payload)
+
+
+def handle_daemon_request(argv, cwd):
+    """在常驻进程内执行一次命令行调用，返回 (退出码, 标准输出字节, 标准错误)
+
+    调用在客户端的工作目录下执行；--banks 等选项替换的题库，以及剖析、内存
+    统计和片段缓存的设置在调用结束后恢复，不影响后续调用。
+    """
+    global _profiler, _memory, fragment_cache
+    # 标准输出按字节收集：--dump-ir - 直接写 sys.stdout.buffer
+    out = io.TextIOWrapper(io.BytesIO(), encoding='utf-8', write_through=True)
+    err = io.StringIO()
+    if any(arg.split('=')[0] in _DAEMON_REJECTED for arg in argv):
+        return 2, b'', '常驻进程不支持 --daemon/--serve\n'
+    saved_banks = {name: value for name, value in globals().items() if _BANK_NAME.match(name)}
+    saved_sources = list(_bank_sources)
+    saved_state = (_profiler, _memory, fragment_cache)
+    saved_cwd = os.getcwd()
+    try:
+        os.chdir(cwd)
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                code = main(argv)
+            except SystemExit as exc:  # argparse 报错或 --help
+                code = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+            except Exception:
+                traceback.print_exc()
+                code = 1
+    finally:
+        os.chdir(saved_cwd)
+        globals().update(saved_banks)
+        _bank_sources[:] = saved_sources
+        if _memory is not None and _memory is not saved_state[1]:
+            _memory.close()
+        if fragment_cache is not saved_state[2]:
+            fragment_cache.flush()
+        _profiler, _memory, fragment_cache = saved_state
+    return code, out.buffer.getvalue(), err.getvalue()
+
+
+def run_daemon(path=None):
+    """常驻进程：预加载模板与题库，在 Unix 套接字上逐个执行客户端转发的命令行
+
+    脚本文件被修改后，下一个请求会收到 stale 回复，常驻进程随即退出，
+    客户端改为本进程内生成。
+    """
+    path = path or daemon_socket_path()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    try:
+        _check_socket_dir(directory)
+    except PermissionError as exc:
+        print(exc)
+        return 1
+    if os.path.lexists(path) and os.lstat(path).st_uid != os.getuid():
+        print(f'套接字路径被其他用户占用: {path}')
+        return 1
+    if os.path.lexists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            print(f'常驻进程已在运行: {path}')
+            return 1
+        except OSError:
+            os.unlink(path)  # 上次异常退出留下的套接字文件
+        finally:
+            probe.close()
+
+    # 预热：模板、OOXML 静态部件和构建清单用到的指纹
+    new_document()
+    new_document(backend='ooxml')
+    for _, _, generate in DAY_DOCS:
+        job_inputs(generate, 'docx')
+    source_mtime = os.stat(__file__).st_mtime_ns
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o177)  # 套接字创建时即为 0600，不留其他用户可连接的窗口
+    try:
+        server.bind(path)
+    finally:
+        os.umask(umask)
+    server.listen(16)
+    print(f'常驻进程已启动: {path}')
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                request = recv_message(conn)
+                if request.get('shutdown'):
+                    send_message(conn, {'exit': 0, 'stderr': ''}, '常驻进程已退出\n'.encode('utf-8'))
+                    break
+                if os.stat(__file__).st_mtime_ns != source_mtime:
+                    send_message(conn, {'stale': True})
+                    break
+                code, out, err = handle_daemon_request(request['argv'], request['cwd'])
+                send_message(conn, {'exit': code, 'stderr': err}, out)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+    return 0
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='生成小学六年级英语练习题 Word 文档')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                        help='并行生成的进程数（默认 CPU 核数）')
+    parser.add_argument('--backend', choices=['docx', 'ooxml', 'stream', 'pdf', 'html'],
+                        default='docx',
+                        help='输出后端（默认 docx；pdf 直接输出 PDF，需要 reportlab；html 输出网页）')
+    parser.add_argument('--output-dir', default=os.path.dirname(os.path.abspath(__file__)),
+                        help='输出目录（默认脚本所在目录）')
+    parser.add_argument('--reproducible', action='store_true',
+                        help='输出字节级可复现的文档（固定 zip 元数据和文档时间）')
+    parser.add_argument('--multi-tier', action='store_true',
+                        help='同一天的三个版本只选题一次，小版本复用充实版已渲染的段落（需要 ooxml 或 stream 后端）')
+    parser.add_argument('--fragment-cache-size', type=int, default=FRAGMENT_CACHE_SIZE,
+                        help='段落片段内存缓存容量，0 表示不缓存（ooxml/stream 后端）')
+    parser.add_argument('--fragment-cache-dir', metavar='DIR',
+                        help='段落片段磁盘缓存目录（跨运行和工作进程共享，按渲染代码指纹失效；默认不启用）')
+    parser.add_argument('--cache-stats', action='store_true',
+                        help='输出段落片段缓存的命中统计')
+    parser.add_argument('--banks', metavar='SNAPSHOT',
+                        help='从题库快照文件读取题库（代替模块内的题库常量）')
+    parser.add_argument('--compile-banks', metavar='SNAPSHOT',
+                        help='把模块内的题库编译成快照文件后退出')
+    parser.add_argument('--bank-db', metavar='DB',
+                        help='从 SQLite 题库数据库读取题库（代替模块内的题库常量）')
+    parser.add_argument('--compile-bank-db', metavar='DB',
+                        help='把模块内的题库写入 SQLite 数据库后退出')
+    parser.add_argument('--select', action='append', metavar='FIELD=VALUE',
+                        help='按条件从 --bank-db 查询题目，生成一份专项练习到 --output-dir 后退出；'
+                             '条件为 bank/day/section/knowledge_point/difficulty（最高难度 1-3）/limit，'
+                             '可重复指定（如 --select day=6 --select knowledge_point=不规则变化）')
+    parser.add_argument('--roster', metavar='FILE',
+                        help='按学生名单批量生成随机变体（每行一个学生，需要 --day）')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='变体的基础随机种子（默认 0）')
+    parser.add_argument('--day', type=int, choices=sorted(DAY_SPECS),
+                        help='变体模式生成哪一天的试卷')
+    parser.add_argument('--version', choices=VERSIONS, default='完整版',
+                        help='变体模式的版本（默认 完整版）')
+    parser.add_argument('--student',
+                        help='与 --dump-ir 一起使用：输出该学生的变体（种子由 --seed 推导）；'
+                             '与 --remediation 一起使用：只生成该学生的错题重练试卷')
+    parser.add_argument('--dump-ir', metavar='PATH',
+                        help='输出 --day/--version 试卷的中间表示后退出（需要 --day，- 为标准输出）')
+    parser.add_argument('--render-ir', metavar='PATH',
+                        help='按中间表示文件生成文档后退出（输出到 --output-dir）')
+    parser.add_argument('--grade', metavar='DIR',
+                        help='批改目录中学生作答后的文档（按变体索引或文件名确定试卷）后退出')
+    parser.add_argument('--check-grading', action='store_true',
+                        help='批改自检：检查每天每个版本的试卷按标准答案作答能全部判对后退出')
+    parser.add_argument('--grade-report', metavar='PATH',
+                        help=f'批改结果 JSON 路径（默认 DIR/{GRADE_REPORT_NAME}）')
+    parser.add_argument('--error-book', metavar='DB',
+                        help='错题本数据库：与 --grade 一起使用时把批改结果计入错题本')
+    parser.add_argument('--cube', metavar='PATH',
+                        help='成绩分析文件（JSON）：与 --grade 一起使用时把批改结果计入分析')
+    parser.add_argument('--classes', metavar='FILE',
+                        help='带班级的学生名单（CSV：学生,班级），计入成绩分析时按班级汇总')
+    parser.add_argument('--add-report', metavar='REPORT',
+                        help='把已有的批改结果 JSON 计入 --error-book 和/或 --cube 后退出')
+    parser.add_argument('--remediation', action='store_true',
+                        help='按 --error-book 为每个学生（或 --student）生成错题重练试卷'
+                             '到 --output-dir 后退出')
+    parser.add_argument('--analyze', choices=CUBE_DIMENSIONS,
+                        help='按维度输出 --cube 中各班级的错误率后退出'
+                             '（rule 为第10天常见错误规则对各班级的影响）')
+    parser.add_argument('--drill', action='append', metavar='DIMENSION=VALUE',
+                        help='与 --analyze 一起使用：只统计该维度取该值的题目，可重复指定'
+                             '（如 --drill day=第6天）')
+    parser.add_argument('--top', type=int, metavar='N',
+                        help='与 --analyze 一起使用：只输出错误率最高的 N 项')
+    parser.add_argument('--profile', nargs='?', const='trace.json', metavar='TRACE',
+                        help='记录各阶段和各小节耗时，输出分项表并写出 Chrome trace'
+                             '（默认 trace.json）')
+    parser.add_argument('--memory', metavar='REPORT',
+                        help='统计每个任务的内存（tracemalloc 与 RSS 峰值），写出 JSON 报告')
+    parser.add_argument('--serve', metavar='[HOST:]PORT',
+                        help='启动 HTTP 生成服务，例如 GET /papers/day7/完整版?seed=1'
+                             '（stream 后端按 ooxml 处理）')
+    parser.add_argument('--daemon', nargs='?', const='', metavar='SOCKET',
+                        help='作为常驻进程运行，接收 exercises_client.py 转发的命令'
+                             '（默认套接字见 EXERCISES_DAEMON_SOCKET）')
+    parser.add_argument('--force', action='store_true',
+                        help='忽略构建清单，重新生成所有文档')
+    parser.add_argument('--explain', action='store_true',
+                        help='输出每个文档重新生成或跳过的原因')
+    args = parser.parse_args(argv)
+    if args.multi_tier and args.backend not in ('ooxml', 'stream'):
+        parser.error('--multi-tier 需要 --backend ooxml 或 --backend stream')
+    if args.remediation and not args.error_book:
+        parser.error('--remediation 需要 --error-book')
+    if args.add_report and not (args.error_book or args.cube):
+        parser.error('--add-report 需要 --error-book 或 --cube')
+    if args.analyze and not args.cube:
+        parser.error('--analyze 需要 --cube')
+    if args.select and not args.bank_db:
+        parser.error('--select 需要 --bank-db')
+    try:
+        parse_select(args.select)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        parse_drill(args.drill)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.backend == 'pdf' and pdf_canvas is None:
+        parser.error('--backend pdf 需要安装 reportlab: pip install reportlab')
+    if (args.roster or args.dump_ir) and args.day is None:
+        parser.error('--roster/--dump-ir 需要 --day')
+    return args
+
+
+def run_jobs(jobs, args):
+    """执行生成任务（多进程时每个任务一个结果，子进程崩溃也记为失败）"""
+    if args.jobs <= 1 or len(jobs) <= 1:
+        return [func(*func_args) for func, func_args, _ in jobs]
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=args.jobs, initializer=_init_worker,
+            initargs=(args.fragment_cache_size, args.fragment_cache_dir, list(_bank_sources),
+                      bool(args.profile), bool(args.memory))) as pool:
+        futures = [pool.submit(func, *func_args) for func, func_args, _ in jobs]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception:  # 子进程异常退出
+                results.append(('', traceback.format_exc(), {}, [], None))
+    return results
+
+
+def main(argv=None):
+    """生成所有练习题文档（输入未变化的文档会被跳过）"""
+    args = parse_args(argv)
+    enable_profiling(bool(args.profile))
+    enable_memory_tracking(bool(args.memory))
+    if args.compile_banks:
+        compile_bank_snapshot(args.compile_banks)
+        print(f'已生成题库快照: {args.compile_banks}')
+        return 0
+    if args.compile_bank_db:
+        compile_bank_db(args.compile_bank_db)
+        print(f'已生成题库数据库: {args.compile_bank_db}')
+        return 0
+    if args.banks:
+        # 工作进程由 initializer 按 _bank_sources 重新加载
+        use_bank_snapshot(args.banks)
+    if args.bank_db:
+        db = use_bank_db(args.bank_db)
+        if args.select:
+            return run_selection(args, db)
+    if args.roster:
+        return run_variants(args)
+    if args.grade:
+        return run_grading(args)
+    if args.check_grading:
+        return run_grading_check()
+    if args.add_report:
+        with open(args.add_report, encoding='utf-8') as f:
+            report = json.load(f)
+        if args.error_book:
+            add_to_error_book(args.error_book, report)
+        if args.cube:
+            add_to_cube(args.cube, report, args.classes)
+        return 0
+    if args.analyze:
+        return run_analysis(args)
+    if args.remediation:
+        return run_remediation(args)
+    if args.daemon is not None:
+        return run_daemon(args.daemon or None)
+    if args.serve:
+        configure_fragment_cache(args.fragment_cache_size, args.fragment_cache_dir)
+        return serve(args.serve, 'docx' if args.backend == 'docx' else 'ooxml')
+    if args.dump_ir:
+        seed = variant_seed(args.seed, args.student) if args.student else None
+        write_paper_ir(paper_ir(args.day, args.version, seed), args.dump_ir)
+        return 0
+    if args.render_ir:
+        name = (os.path.splitext(os.path.basename(args.render_ir))[0]
+                + document_extension(args.backend))
+        os.makedirs(args.output_dir, exist_ok=True)
+        render_ir_file(args.render_ir, os.path.join(args.output_dir, name),
+                       args.backend, args.reproducible)
+        return 0
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_path = os.path.join(args.output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    print('开始生成英语练习题文档...\n')
 
+    # 每个任务：(任务函数, 参数, 成功后写入清单的 文件名 -> 输入指纹)
+    jobs = []
+    for day, topic, generate in DAY_DOCS:
+        inputs = job_inputs(generate, args.backend, args.reproducible)
+        paths, entries, stale = {}, {}, []
+        for version in VERSIONS:
+            filename = output_filename(day, topic, version, args.backend)
+            paths[version] = os.path.join(args.output_dir, filename)
+            entries[filename] = dict(inputs, version=version)
+            reason = '--force' if args.force else rebuild_reason(
+                manifest.get(filename), entries[filename], paths[version])
+            if args.explain:
+                print(f'{filename}: {reason or "输入未变化，跳过"}')
+            if reason:
+                stale.append(version)
+        if args.multi_tier and stale:
+            # 一次渲染全部版本
+            jobs.append((run_tiers_job, (DAY_SPECS[day], paths, args.backend, args.reproducible),
+                         entries))
+            continue
+        for version in stale:
+            filename = os.path.basename(paths[version])
+            jobs.append((run_job, (generate, version, paths[version],
+                                   args.backend, args.reproducible),
+                         {filename: entries[filename]}))
+    if args.explain:
+        print()
+
+    # 预先解析模板，fork 出的子进程直接继承缓存
+    with profile_span('warmup'):
+        new_document()
+    configure_fragment_cache(args.fragment_cache_size, args.fragment_cache_dir)
+    with profile_span('jobs'):
+        results = run_jobs(jobs, args)
+
+    failed = []
+    built = 0
+    cache_stats = collections.Counter()
+    profile_events = []
+    memory_jobs = []
+    for (_, _, entries), (log, error, stats, spans, memory) in zip(jobs, results):
+        cache_stats.update(stats)
+        profile_events.extend(spans)
+        if memory is not None:
+            memory_jobs.append((list(entries), memory))
+        print(log, end='')
+        if error:
+            print(f'生成失败: {", ".join(entries)}\n{error}')
+            failed.extend(entries)
+        else:
+            manifest.update(entries)
+            built += len(entries)
+    if built:  # 全部失败（或全部跳过）时清单不变
+        save_manifest(manifest_path, manifest)
+
+    if args.cache_stats:
+        lookups = sum(cache_stats.values())
+        hit_rate = (cache_stats['hits'] + cache_stats['disk_hits']) / lookups if lookups else 0.0
+        print(f'\n片段缓存: 内存命中 {cache_stats["hits"]}，磁盘命中 {cache_stats["disk_hits"]}，'
+              f'未命中 {cache_stats["misses"]}，命中率 {hit_rate:.1%}')
+
+    if args.profile:
+        profile_events.extend(take_profile_events())
+        print('\n耗时分项（毫秒）：')
+        print(profile_table(profile_events))
+        write_chrome_trace(args.profile, profile_events)
+        print(f'\nChrome trace 已写出: {args.profile}')
+
+    if args.memory:
+        report = write_memory_report(args.memory, memory_jobs)
+        print('\n内存（KB）：   Python 峰值   文档持有    RSS 峰值')
+        for documents, memory in sorted(memory_jobs, key=lambda job: -job[1]['traced_peak_kb']):
+            print(f'{memory["traced_peak_kb"]:>20.1f} {memory["held_kb"]:>10.1f} '
+                  f'{memory["peak_rss_kb"] or 0:>11}  {", ".join(documents)}')
+        print(f'\n最大 RSS 峰值 {report["max_peak_rss_kb"]} KB，内存报告已写出: {args.memory}')
+
+    skipped = len(DAY_DOCS) * len(VERSIONS) - built - len(failed)
+    if skipped:
+        print(f'\n{skipped} 个文档输入未变化，已跳过（使用 --force 强制重新生成）')
+    if failed:
+        print(f'\n{len(failed)} 个文档生成失败')
+        return 1
     print('\n所有文档生成完成！')
+    return 0
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())